@@ -35,8 +35,11 @@ def create_app(config_name=None):
     app.register_blueprint(admin.bp)
     app.register_blueprint(user.bp)
     
+    from app.services.search_service import get_search_index
+    
     with app.app_context():
         db.create_all()
+        get_search_index().create_table()
         from app.models.user import User
         admin = User.query.filter_by(email=app.config['ADMIN_EMAIL']).first()
         if not admin:
@@ -1,5 +1,11 @@
 from app.models.user import User
-from app.models.place import Place, Review
+from app.models.place import Place, Review, ReviewVote, PlaceTag, PlaceFeature, PlaceHours
 from app.models.itinerary import Itinerary, ChatSession
+from app.models.table_version import TableVersion
+from app.models.place_cluster import PlaceCluster
+from app.models.stored_file import StoredFile
+from app.models.geocode_cache import GeocodeCache
+from app.models.travel_leg import TravelLeg
+from app.models.trending_state import TrendingState
 
-__all__ = ['User', 'Place', 'Review', 'Itinerary', 'ChatSession']
\ No newline at end of file
+__all__ = ['User', 'Place', 'Review', 'ReviewVote', 'PlaceTag', 'PlaceFeature', 'PlaceHours', 'Itinerary', 'ChatSession', 'TableVersion', 'PlaceCluster', 'StoredFile', 'GeocodeCache', 'TravelLeg', 'TrendingState']
\ No newline at end of file
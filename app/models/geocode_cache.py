@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+from sqlalchemy import update, insert, delete
+from app import db
+import json
+
+
+class GeocodeCache(db.Model):
+    """
+    Persisted Google geocoding answers, shared by all workers
+    
+    key is "addr:<normalized address>" or "latlng:<rounded lat>,<rounded lng>";
+    negative entries (ZERO_RESULTS) store a failure payload with a shorter
+    expiry.
+    """
+    
+    __tablename__ = 'geocode_cache'
+    
+    key = db.Column(db.String(400), primary_key=True)
+    payload = db.Column(db.Text, nullable=False)  # JSON result dict
+    is_negative = db.Column(db.Boolean, default=False, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @staticmethod
+    def lookup(key):
+        """
+        Cached result for a key
+        
+        Returns:
+            (result dict, seconds until expiry) or (None, 0) on a miss
+        """
+        row = db.session.query(GeocodeCache.payload, GeocodeCache.expires_at).filter(
+            GeocodeCache.key == key
+        ).first()
+        if row is None:
+            return None, 0
+        
+        remaining = (row.expires_at - datetime.utcnow()).total_seconds()
+        if remaining <= 0:
+            return None, 0
+        return json.loads(row.payload), remaining
+    
+    @staticmethod
+    def store(key, result, ttl, negative=False):
+        """Insert or refresh one entry on its own connection"""
+        cache = GeocodeCache.__table__
+        now = datetime.utcnow()
+        values = {
+            'payload': json.dumps(result, ensure_ascii=False),
+            'is_negative': negative,
+            'expires_at': now + timedelta(seconds=ttl),
+            'created_at': now
+        }
+        
+        with db.engine.begin() as connection:
+            updated = connection.execute(update(cache).where(cache.c.key == key).values(**values))
+            if updated.rowcount == 0:
+                connection.execute(insert(cache).values(key=key, **values))
+    
+    @staticmethod
+    def purge_expired():
+        """
+        Delete expired entries
+        
+        Returns:
+            Number of rows removed
+        """
+        cache = GeocodeCache.__table__
+        with db.engine.begin() as connection:
+            return connection.execute(delete(cache).where(cache.c.expires_at < datetime.utcnow())).rowcount
+    
+    def __repr__(self):
+        return f'<GeocodeCache {self.key}>'
@@ -0,0 +1,22 @@
+from sqlalchemy import event
+
+
+def _keep_previous_value(target, value, oldvalue, initiator):
+    pass
+
+
+def track_previous_values(*attributes):
+    """
+    Load the old value on assignment, even when the attribute was expired,
+    so after_update handlers can read it with previous_value
+    """
+    for attribute in attributes:
+        event.listen(attribute, 'set', _keep_previous_value, active_history=True)
+
+
+def previous_value(state, name):
+    """Value of an attribute before the pending change (current value if unchanged)"""
+    history = state.attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(state.obj(), name)
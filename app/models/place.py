@@ -1,11 +1,21 @@
 from datetime import datetime
+from sqlalchemy import bindparam, case, cast, event, func, inspect, insert, delete, select, update
+from sqlalchemy.orm import load_only, joinedload
 from app import db
+from app.models.table_version import TableVersion
+from app.utils.helpers import parse_labels
+from app.utils.geo import geohash_encode
+from app.utils.opening_hours import parse_opening_hours
+import json
 
 
 class Place(db.Model):
     """Place/Attraction model"""
     
     __tablename__ = 'places'
+    __table_args__ = (
+        db.Index('ix_places_category_trending', 'category', 'trending_score'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False, index=True)
@@ -20,6 +30,7 @@ class Place(db.Model):
     address = db.Column(db.String(300))
     latitude = db.Column(db.Float)
     longitude = db.Column(db.Float)
+    geohash = db.Column(db.String(12), index=True)  # derived from latitude/longitude
     
     # Contact
     phone = db.Column(db.String(20))
@@ -33,9 +44,11 @@ class Place(db.Model):
     # Media
     main_image = db.Column(db.String(300))
     images = db.Column(db.Text)  # JSON array of image URLs
+    image_variants = db.Column(db.Text)  # JSON {size: {format: url}} derived from main_image
     
-    # Ratings
-    rating = db.Column(db.Float, default=0.0)
+    # Ratings (rating = rating_sum / review_count, maintained incrementally)
+    rating = db.Column(db.Float, default=0.0, index=True)
+    rating_sum = db.Column(db.Integer, default=0, nullable=False)
     review_count = db.Column(db.Integer, default=0)
     
     # Tags and features
@@ -50,55 +63,386 @@ class Place(db.Model):
     is_featured = db.Column(db.Boolean, default=False)
     
     # Metadata
-    view_count = db.Column(db.Integer, default=0)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    view_count = db.Column(db.Integer, default=0, index=True)
+    # Forward-decayed view/review/favorite score, see TrendingService
+    trending_score = db.Column(db.Float, default=0.0, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     reviews = db.relationship('Review', backref='place', lazy='dynamic', cascade='all, delete-orphan')
     
-    def to_dict(self, include_reviews=False):
-        """Convert to dictionary"""
-        data = {
-            'id': self.id,
-            'name': self.name,
-            'slug': self.slug,
-            'category': self.category,
-            'description': self.description,
-            'short_description': self.short_description,
-            'address': self.address,
-            'latitude': self.latitude,
-            'longitude': self.longitude,
-            'phone': self.phone,
-            'email': self.email,
-            'website': self.website,
-            'price_range': self.price_range,
-            'estimated_cost': self.estimated_cost,
-            'main_image': self.main_image,
-            'images': self.images,
-            'rating': self.rating,
-            'review_count': self.review_count,
-            'tags': self.tags,
-            'features': self.features,
-            'opening_hours': self.opening_hours,
-            'is_featured': self.is_featured,
-            'view_count': self.view_count,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+    # Named projections for to_dict(fields=...) and load_options()
+    CARD_FIELDS = (
+        'id', 'name', 'slug', 'category', 'short_description', 'address',
+        'latitude', 'longitude', 'price_range', 'estimated_cost', 'main_image',
+        'image_variants', 'rating', 'review_count', 'is_featured', 'view_count'
+    )
+    DETAIL_FIELDS = (
+        'id', 'name', 'slug', 'category', 'description', 'short_description',
+        'address', 'latitude', 'longitude', 'phone', 'email', 'website',
+        'price_range', 'estimated_cost', 'main_image', 'image_variants', 'images',
+        'rating', 'review_count', 'tags', 'features', 'opening_hours', 'is_featured',
+        'view_count', 'created_at'
+    )
+    EXPORT_FIELDS = DETAIL_FIELDS + ('is_active', 'updated_at')
+    
+    PROJECTIONS = {
+        'card': CARD_FIELDS,
+        'detail': DETAIL_FIELDS,
+        'export': EXPORT_FIELDS
+    }
+    
+    @classmethod
+    def resolve_fields(cls, fields=None, default='detail'):
+        """
+        Resolve a projection name ("card") or a comma-separated field list
+        ("id,name,rating") into a tuple of serializable fields
+        
+        Unknown names are ignored; id is always included.
+        """
+        if not fields:
+            fields = default
+        
+        if isinstance(fields, str):
+            if fields in cls.PROJECTIONS:
+                return cls.PROJECTIONS[fields]
+            fields = [name.strip() for name in fields.split(',')]
+        
+        selected = tuple(name for name in cls.EXPORT_FIELDS if name in fields and name != 'id')
+        return ('id',) + selected
+    
+    @classmethod
+    def load_options(cls, fields):
+        """Query options that only fetch the columns needed for the given fields"""
+        return [load_only(*(getattr(cls, name) for name in fields))]
+    
+    def to_dict(self, include_reviews=False, fields=None):
+        """
+        Convert to dictionary
+        
+        Args:
+            include_reviews: Embed the latest reviews
+            fields: Fields to emit (see resolve_fields); defaults to DETAIL_FIELDS
+        """
+        if fields is None:
+            fields = self.DETAIL_FIELDS
+        
+        data = {}
+        for name in fields:
+            value = getattr(self, name)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            elif name == 'image_variants':
+                value = json.loads(value) if value else None
+            data[name] = value
         
         if include_reviews:
-            data['reviews'] = [review.to_dict() for review in self.reviews.limit(10)]
+            data['reviews'] = [review.to_dict() for review in Review.latest_for_place(self.id)]
         
         return data
     
+    @staticmethod
+    def adjust_rating(place_id, rating_delta, count_delta):
+        """
+        Apply a review change to the rating aggregates in a single UPDATE
+        
+        O(1) regardless of review count, and safe under concurrent writers
+        because the new values are computed by the database from the row.
+        """
+        places = Place.__table__
+        new_sum = func.coalesce(places.c.rating_sum, 0) + rating_delta
+        new_count = func.coalesce(places.c.review_count, 0) + count_delta
+        
+        db.session.execute(
+            update(places).where(places.c.id == place_id).values(
+                rating_sum=new_sum,
+                review_count=new_count,
+                rating=case(
+                    (new_count > 0, func.round(cast(new_sum, db.Float) / new_count, 1)),
+                    else_=0.0
+                )
+            )
+        )
+        TableVersion.bump(db.session.connection(), 'places')
+    
+    @staticmethod
+    def sync_labels(connection, place_id, tags, features):
+        """Rewrite the place_tags / place_features rows of one place"""
+        for model, column, value in ((PlaceTag, 'tag', tags), (PlaceFeature, 'feature', features)):
+            table = model.__table__
+            connection.execute(delete(table).where(table.c.place_id == place_id))
+            
+            rows = [{'place_id': place_id, column: label} for label in parse_labels(value)]
+            if rows:
+                connection.execute(insert(table), rows)
+    
+    @staticmethod
+    def rebuild_label_index(batch_size=1000):
+        """
+        Backfill place_tags / place_features from the JSON columns
+        
+        Returns:
+            Number of places processed
+        """
+        rows = db.session.query(Place.id, Place.tags, Place.features).yield_per(batch_size)
+        
+        count = 0
+        with db.engine.begin() as connection:
+            connection.execute(delete(PlaceTag.__table__))
+            connection.execute(delete(PlaceFeature.__table__))
+            
+            tag_rows, feature_rows = [], []
+            for place_id, tags, features in rows:
+                tag_rows.extend({'place_id': place_id, 'tag': label} for label in parse_labels(tags))
+                feature_rows.extend({'place_id': place_id, 'feature': label} for label in parse_labels(features))
+                count += 1
+                
+                if len(tag_rows) + len(feature_rows) >= batch_size:
+                    if tag_rows:
+                        connection.execute(insert(PlaceTag.__table__), tag_rows)
+                    if feature_rows:
+                        connection.execute(insert(PlaceFeature.__table__), feature_rows)
+                    tag_rows, feature_rows = [], []
+            
+            if tag_rows:
+                connection.execute(insert(PlaceTag.__table__), tag_rows)
+            if feature_rows:
+                connection.execute(insert(PlaceFeature.__table__), feature_rows)
+        
+        return count
+    
+    @staticmethod
+    def ensure_label_index():
+        """Backfill the label tables once if they are empty but places have tags"""
+        if db.session.query(PlaceTag.query.exists()).scalar() or \
+                db.session.query(PlaceFeature.query.exists()).scalar():
+            return
+        
+        has_labels = db.session.query(
+            Place.query.filter((Place.tags != None) | (Place.features != None)).exists()
+        ).scalar()
+        if has_labels:
+            Place.rebuild_label_index()
+    
+    @staticmethod
+    def sync_hours(connection, place_id, opening_hours):
+        """Rewrite the place_hours intervals of one place"""
+        table = PlaceHours.__table__
+        connection.execute(delete(table).where(table.c.place_id == place_id))
+        
+        rows = [
+            {'place_id': place_id, 'day': day, 'start_minute': start, 'end_minute': end}
+            for day, start, end in parse_opening_hours(opening_hours)
+        ]
+        if rows:
+            connection.execute(insert(table), rows)
+    
+    @staticmethod
+    def rebuild_hours_index(batch_size=1000):
+        """
+        Backfill place_hours from Place.opening_hours
+        
+        Returns:
+            Number of places with parseable hours
+        """
+        rows = db.session.query(Place.id, Place.opening_hours).filter(
+            Place.opening_hours != None
+        ).yield_per(batch_size)
+        
+        count = 0
+        with db.engine.begin() as connection:
+            connection.execute(delete(PlaceHours.__table__))
+            
+            batch = []
+            for place_id, opening_hours in rows:
+                intervals = parse_opening_hours(opening_hours)
+                if intervals:
+                    count += 1
+                batch.extend(
+                    {'place_id': place_id, 'day': day, 'start_minute': start, 'end_minute': end}
+                    for day, start, end in intervals
+                )
+                if len(batch) >= batch_size:
+                    connection.execute(insert(PlaceHours.__table__), batch)
+                    batch = []
+            
+            if batch:
+                connection.execute(insert(PlaceHours.__table__), batch)
+        
+        return count
+    
+    @staticmethod
+    def ensure_hours_index():
+        """Backfill place_hours once if it is empty but places have opening hours"""
+        if db.session.query(PlaceHours.query.exists()).scalar():
+            return
+        
+        has_hours = db.session.query(
+            Place.query.filter(Place.opening_hours != None, Place.opening_hours != '').exists()
+        ).scalar()
+        if has_hours:
+            Place.rebuild_hours_index()
+    
+    @staticmethod
+    def open_at_clause(day, minute):
+        """
+        Filter for places open at a weekday/minute (see parse_open_at)
+        
+        Resolved by an index range scan on place_hours (day, start_minute);
+        places without structured hours do not match.
+        """
+        hours = PlaceHours.__table__
+        return Place.id.in_(
+            select(hours.c.place_id).where(
+                hours.c.day == day,
+                hours.c.start_minute <= minute,
+                hours.c.end_minute > minute
+            )
+        )
+    
+    def update_geohash(self):
+        """Recompute the geohash cell from latitude/longitude"""
+        if self.latitude is None or self.longitude is None:
+            self.geohash = None
+        else:
+            self.geohash = geohash_encode(self.latitude, self.longitude)
+    
+    @staticmethod
+    def ensure_geohashes(batch_size=1000):
+        """Fill geohash for places that have coordinates but no cell yet"""
+        places = Place.__table__
+        rows = db.session.query(Place.id, Place.latitude, Place.longitude).filter(
+            Place.geohash == None,
+            Place.latitude != None,
+            Place.longitude != None
+        ).all()
+        
+        if not rows:
+            return 0
+        
+        stmt = update(places).where(places.c.id == bindparam('b_id')).values(
+            geohash=bindparam('b_geohash'),
+            updated_at=places.c.updated_at
+        )
+        with db.engine.begin() as connection:
+            for start in range(0, len(rows), batch_size):
+                connection.execute(stmt, [
+                    {'b_id': place_id, 'b_geohash': geohash_encode(lat, lng)}
+                    for place_id, lat, lng in rows[start:start + batch_size]
+                ])
+        
+        return len(rows)
+    
     def __repr__(self):
         return f'<Place {self.name}>'
 
 
+class PlaceTag(db.Model):
+    """Normalized place tag, kept in sync with Place.tags"""
+    
+    __tablename__ = 'place_tags'
+    __table_args__ = (
+        db.Index('ix_place_tags_tag_place', 'tag', 'place_id'),
+    )
+    
+    place_id = db.Column(db.Integer, db.ForeignKey('places.id', ondelete='CASCADE'), primary_key=True)
+    tag = db.Column(db.String(100), primary_key=True)
+    
+    def __repr__(self):
+        return f'<PlaceTag {self.place_id}:{self.tag}>'
+
+
+class PlaceFeature(db.Model):
+    """Normalized place feature, kept in sync with Place.features"""
+    
+    __tablename__ = 'place_features'
+    __table_args__ = (
+        db.Index('ix_place_features_feature_place', 'feature', 'place_id'),
+    )
+    
+    place_id = db.Column(db.Integer, db.ForeignKey('places.id', ondelete='CASCADE'), primary_key=True)
+    feature = db.Column(db.String(100), primary_key=True)
+    
+    def __repr__(self):
+        return f'<PlaceFeature {self.place_id}:{self.feature}>'
+
+
+class PlaceHours(db.Model):
+    """Weekly opening interval parsed from Place.opening_hours (minutes since midnight)"""
+    
+    __tablename__ = 'place_hours'
+    __table_args__ = (
+        db.Index('ix_place_hours_day_start', 'day', 'start_minute', 'end_minute', 'place_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    place_id = db.Column(db.Integer, db.ForeignKey('places.id', ondelete='CASCADE'), nullable=False, index=True)
+    day = db.Column(db.SmallInteger, nullable=False)  # 0 = Monday
+    start_minute = db.Column(db.SmallInteger, nullable=False)
+    end_minute = db.Column(db.SmallInteger, nullable=False)  # exclusive, <= 1440
+    
+    def __repr__(self):
+        return f'<PlaceHours {self.place_id}: {self.day} {self.start_minute}-{self.end_minute}>'
+
+
+@event.listens_for(Place, 'before_insert')
+def _place_geohash_inserted(mapper, connection, target):
+    target.update_geohash()
+
+
+@event.listens_for(Place, 'before_update')
+def _place_geohash_updated(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.latitude.history.has_changes() or state.attrs.longitude.history.has_changes():
+        target.update_geohash()
+
+
+@event.listens_for(Place, 'after_insert')
+def _place_labels_inserted(mapper, connection, target):
+    Place.sync_labels(connection, target.id, target.tags, target.features)
+
+
+@event.listens_for(Place, 'after_update')
+def _place_labels_updated(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.tags.history.has_changes() or state.attrs.features.history.has_changes():
+        Place.sync_labels(connection, target.id, target.tags, target.features)
+
+
+@event.listens_for(Place, 'before_delete')
+def _place_labels_deleted(mapper, connection, target):
+    Place.sync_labels(connection, target.id, None, None)
+
+
+@event.listens_for(Place, 'after_insert')
+def _place_hours_inserted(mapper, connection, target):
+    if target.opening_hours:
+        Place.sync_hours(connection, target.id, target.opening_hours)
+
+
+@event.listens_for(Place, 'after_update')
+def _place_hours_updated(mapper, connection, target):
+    if inspect(target).attrs.opening_hours.history.has_changes():
+        Place.sync_hours(connection, target.id, target.opening_hours)
+
+
+@event.listens_for(Place, 'before_delete')
+def _place_hours_deleted(mapper, connection, target):
+    Place.sync_hours(connection, target.id, None)
+
+
 class Review(db.Model):
     """Review model"""
     
     __tablename__ = 'reviews'
+    __table_args__ = (
+        db.Index('uq_reviews_place_user', 'place_id', 'user_id', unique=True),
+        # Keyset orders of GET /api/places/<id>/reviews
+        db.Index('ix_reviews_place_created', 'place_id', 'created_at', 'id'),
+        db.Index('ix_reviews_place_helpful', 'place_id', 'helpful_count', 'id'),
+        db.Index('ix_reviews_place_rating', 'place_id', 'rating', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     place_id = db.Column(db.Integer, db.ForeignKey('places.id'), nullable=False)
@@ -108,12 +452,47 @@ class Review(db.Model):
     title = db.Column(db.String(200))
     content = db.Column(db.Text)
     
-    # Helpful votes
-    helpful_count = db.Column(db.Integer, default=0)
+    # Helpful votes (one ReviewVote per user, maintained by adjust_helpful)
+    helpful_count = db.Column(db.Integer, default=0, nullable=False)
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    @staticmethod
+    def query_with_user():
+        """Review query that loads each author in the same SELECT (no N+1)"""
+        from app.models.user import User
+        
+        return Review.query.options(
+            joinedload(Review.user).load_only(User.id, User.username)
+        )
+    
+    # ?sort= of the place review listing -> (column, descending)
+    SORTS = {
+        'newest': ('created_at', True),
+        'helpful': ('helpful_count', True),
+        'rating': ('rating', True)
+    }
+    
+    @staticmethod
+    def adjust_helpful(review_id, delta):
+        """Apply a helpful vote change with an atomic helpful_count + delta UPDATE"""
+        reviews = Review.__table__
+        db.session.execute(
+            update(reviews).where(reviews.c.id == review_id).values(
+                helpful_count=func.coalesce(reviews.c.helpful_count, 0) + delta,
+                updated_at=reviews.c.updated_at
+            )
+        )
+        TableVersion.bump(db.session.connection(), 'reviews')
+    
+    @staticmethod
+    def latest_for_place(place_id, limit=10):
+        """Newest reviews of a place with their authors, in one query"""
+        return Review.query_with_user().filter(
+            Review.place_id == place_id
+        ).order_by(Review.created_at.desc(), Review.id.desc()).limit(limit).all()
+    
     def to_dict(self):
         """Convert to dictionary"""
         return {
@@ -131,4 +510,23 @@ class Review(db.Model):
         }
     
     def __repr__(self):
-        return f'<Review {self.id} for Place {self.place_id}>'
\ No newline at end of file
+        return f'<Review {self.id} for Place {self.place_id}>'
+
+
+class ReviewVote(db.Model):
+    """One user's helpful vote on a review"""
+    
+    __tablename__ = 'review_votes'
+    
+    review_id = db.Column(db.Integer, db.ForeignKey('reviews.id', ondelete='CASCADE'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ReviewVote {self.user_id} -> {self.review_id}>'
+
+
+@event.listens_for(Review, 'before_delete')
+def _review_votes_deleted(mapper, connection, target):
+    votes = ReviewVote.__table__
+    connection.execute(delete(votes).where(votes.c.review_id == target.id))
\ No newline at end of file
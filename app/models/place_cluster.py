@@ -0,0 +1,206 @@
+from sqlalchemy import event, inspect, select, update, insert, delete, case, and_
+from app import db
+from app.models.place import Place
+from app.models.history import track_previous_values, previous_value
+
+
+class PlaceCluster(db.Model):
+    """
+    Pre-aggregated places per geohash cell, one row per cell and precision
+    
+    Used to serve map clusters without touching the places table. Rows are
+    kept up to date incrementally by the Place mapper events below.
+    """
+    
+    __tablename__ = 'place_clusters'
+    
+    # Geohash precisions maintained (1 = ~5000km cells ... 8 = ~38m cells)
+    PRECISIONS = tuple(range(1, 9))
+    
+    cell = db.Column(db.String(12), primary_key=True)
+    precision = db.Column(db.Integer, nullable=False, index=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    lat_sum = db.Column(db.Float, nullable=False, default=0.0)
+    lng_sum = db.Column(db.Float, nullable=False, default=0.0)
+    
+    # Best-rated place in the cell
+    top_place_id = db.Column(db.Integer)
+    top_score = db.Column(db.Float)
+    
+    @staticmethod
+    def add_place(connection, geohash, lat, lng, place_id, score):
+        """Count a place into every precision of its cell"""
+        clusters = PlaceCluster.__table__
+        score = score or 0.0
+        is_new_top = (clusters.c.top_place_id == None) | (clusters.c.top_score < score)
+        
+        for precision in PlaceCluster.PRECISIONS:
+            cell = geohash[:precision]
+            result = connection.execute(
+                update(clusters).where(clusters.c.cell == cell).values(
+                    count=clusters.c.count + 1,
+                    lat_sum=clusters.c.lat_sum + lat,
+                    lng_sum=clusters.c.lng_sum + lng,
+                    top_place_id=case((is_new_top, place_id), else_=clusters.c.top_place_id),
+                    top_score=case((is_new_top, score), else_=clusters.c.top_score)
+                )
+            )
+            if result.rowcount == 0:
+                connection.execute(insert(clusters).values(
+                    cell=cell, precision=precision, count=1,
+                    lat_sum=lat, lng_sum=lng,
+                    top_place_id=place_id, top_score=score
+                ))
+    
+    @staticmethod
+    def remove_place(connection, geohash, lat, lng, place_id):
+        """
+        Remove a place from every precision of its cell
+        
+        Cells the place used to lead pick their new top place straight from
+        the table, among the other places in the cell.
+        """
+        clusters = PlaceCluster.__table__
+        places = Place.__table__
+        cells = [geohash[:precision] for precision in PlaceCluster.PRECISIONS]
+        
+        led_cells = [row[0] for row in connection.execute(
+            select(clusters.c.cell).where(
+                clusters.c.cell.in_(cells),
+                clusters.c.top_place_id == place_id
+            )
+        )]
+        
+        connection.execute(
+            update(clusters).where(clusters.c.cell.in_(cells)).values(
+                count=clusters.c.count - 1,
+                lat_sum=clusters.c.lat_sum - lat,
+                lng_sum=clusters.c.lng_sum - lng
+            )
+        )
+        connection.execute(
+            delete(clusters).where(and_(clusters.c.cell.in_(cells), clusters.c.count <= 0))
+        )
+        
+        for cell in led_cells:
+            top = connection.execute(
+                select(places.c.id, places.c.rating).where(
+                    places.c.id != place_id,
+                    places.c.is_active == True,
+                    places.c.geohash >= cell,
+                    places.c.geohash < cell + '~'
+                ).order_by(places.c.rating.desc(), places.c.id).limit(1)
+            ).first()
+            connection.execute(
+                update(clusters).where(clusters.c.cell == cell).values(
+                    top_place_id=top[0] if top else None,
+                    top_score=(top[1] or 0.0) if top else None
+                )
+            )
+    
+    @staticmethod
+    def rebuild(batch_size=1000):
+        """
+        Recompute all clusters from the places table in one pass
+        
+        Returns:
+            Number of cells written
+        """
+        rows = db.session.query(
+            Place.id, Place.geohash, Place.latitude, Place.longitude, Place.rating
+        ).filter(
+            Place.is_active == True,
+            Place.geohash != None
+        ).order_by(Place.id).yield_per(batch_size)
+        
+        cells = {}
+        for place_id, geohash, lat, lng, rating in rows:
+            score = rating or 0.0
+            for precision in PlaceCluster.PRECISIONS:
+                cell = geohash[:precision]
+                entry = cells.get(cell)
+                if entry is None:
+                    cells[cell] = {
+                        'cell': cell, 'precision': precision, 'count': 1,
+                        'lat_sum': lat, 'lng_sum': lng,
+                        'top_place_id': place_id, 'top_score': score
+                    }
+                else:
+                    entry['count'] += 1
+                    entry['lat_sum'] += lat
+                    entry['lng_sum'] += lng
+                    if score > entry['top_score']:
+                        entry['top_place_id'] = place_id
+                        entry['top_score'] = score
+        
+        values = list(cells.values())
+        with db.engine.begin() as connection:
+            connection.execute(delete(PlaceCluster.__table__))
+            for start in range(0, len(values), batch_size):
+                connection.execute(insert(PlaceCluster.__table__), values[start:start + batch_size])
+        
+        return len(values)
+    
+    @staticmethod
+    def ensure():
+        """Build the clusters once if the table is empty but places are mapped"""
+        if db.session.query(PlaceCluster.query.exists()).scalar():
+            return
+        
+        has_places = db.session.query(
+            Place.query.filter(Place.is_active == True, Place.geohash != None).exists()
+        ).scalar()
+        if has_places:
+            PlaceCluster.rebuild()
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'cell': self.cell,
+            'count': self.count,
+            'latitude': self.lat_sum / self.count if self.count else None,
+            'longitude': self.lng_sum / self.count if self.count else None,
+            'top_place_id': self.top_place_id
+        }
+    
+    def __repr__(self):
+        return f'<PlaceCluster {self.cell} ({self.count})>'
+
+
+# Keep the old values so after_update can still tell which cell a
+# moved/deactivated place left
+track_previous_values(Place.geohash, Place.latitude, Place.longitude, Place.is_active)
+
+
+def _is_clustered(geohash, is_active, lat, lng):
+    return bool(geohash) and is_active is not False and lat is not None and lng is not None
+
+
+@event.listens_for(Place, 'after_insert')
+def _place_cluster_inserted(mapper, connection, target):
+    if _is_clustered(target.geohash, target.is_active, target.latitude, target.longitude):
+        PlaceCluster.add_place(connection, target.geohash, target.latitude, target.longitude,
+                               target.id, target.rating)
+
+
+@event.listens_for(Place, 'after_update')
+def _place_cluster_updated(mapper, connection, target):
+    state = inspect(target)
+    tracked = ('geohash', 'latitude', 'longitude', 'is_active', 'rating')
+    if not any(state.attrs[name].history.has_changes() for name in tracked):
+        return
+    
+    old = [previous_value(state, name) for name in ('geohash', 'is_active', 'latitude', 'longitude')]
+    if _is_clustered(*old):
+        PlaceCluster.remove_place(connection, old[0], old[2], old[3], target.id)
+    
+    if _is_clustered(target.geohash, target.is_active, target.latitude, target.longitude):
+        PlaceCluster.add_place(connection, target.geohash, target.latitude, target.longitude,
+                               target.id, target.rating)
+
+
+@event.listens_for(Place, 'before_delete')
+def _place_cluster_deleted(mapper, connection, target):
+    if _is_clustered(target.geohash, target.is_active, target.latitude, target.longitude):
+        PlaceCluster.remove_place(connection, target.geohash, target.latitude, target.longitude,
+                                  target.id)
@@ -0,0 +1,135 @@
+from datetime import datetime
+from collections import Counter
+from sqlalchemy import event, inspect, update
+from app import db
+from app.models.place import Place
+from app.models.history import track_previous_values, previous_value
+import json
+
+# Public URL prefix of content-addressed uploads
+MEDIA_URL_PREFIX = '/media/'
+
+
+class StoredFile(db.Model):
+    """
+    One uploaded blob, stored once under its SHA-256
+    
+    ref_count is the number of Place.main_image / Place.images references;
+    rows at zero are removed by FileStorage.collect_garbage after a grace
+    period.
+    """
+    
+    __tablename__ = 'stored_files'
+    
+    sha256 = db.Column(db.String(64), primary_key=True)
+    path = db.Column(db.String(300), nullable=False)  # relative to UPLOAD_FOLDER
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    @property
+    def url(self):
+        return MEDIA_URL_PREFIX + self.path
+    
+    @staticmethod
+    def hash_for_url(url):
+        """SHA-256 of a content-addressed upload URL, or None for anything else"""
+        if not url or not url.startswith(MEDIA_URL_PREFIX + 'objects/'):
+            return None
+        name = url.rsplit('/', 1)[-1].split('.', 1)[0]
+        return name if len(name) == 64 else None
+    
+    @staticmethod
+    def place_refs(main_image, images):
+        """Counter of stored-file hashes referenced by a place's image columns"""
+        urls = [main_image]
+        if images:
+            try:
+                parsed = json.loads(images)
+                urls.extend(parsed if isinstance(parsed, list) else [])
+            except (TypeError, ValueError):
+                pass
+        
+        return Counter(sha for sha in (StoredFile.hash_for_url(url) for url in urls) if sha)
+    
+    @staticmethod
+    def adjust_refs(connection, deltas):
+        """Apply {sha256: delta} reference changes in place"""
+        files = StoredFile.__table__
+        now = datetime.utcnow()
+        
+        for sha, delta in deltas.items():
+            if delta:
+                connection.execute(
+                    update(files).where(files.c.sha256 == sha).values(
+                        ref_count=files.c.ref_count + delta,
+                        updated_at=now
+                    )
+                )
+    
+    @staticmethod
+    def touch(connection, sha):
+        """
+        Restart the GC grace period of a file on an open connection
+        
+        Returns:
+            False when the row is gone (collected meanwhile)
+        """
+        files = StoredFile.__table__
+        result = connection.execute(
+            update(files).where(files.c.sha256 == sha).values(updated_at=datetime.utcnow())
+        )
+        return result.rowcount == 1
+    
+    @staticmethod
+    def recount():
+        """
+        Recompute every ref_count from the places table
+        
+        Returns:
+            Number of referenced files
+        """
+        counts = Counter()
+        rows = db.session.query(Place.main_image, Place.images).yield_per(1000)
+        for main_image, images in rows:
+            counts.update(StoredFile.place_refs(main_image, images))
+        
+        files = StoredFile.__table__
+        with db.engine.begin() as connection:
+            connection.execute(update(files).values(ref_count=0))
+            StoredFile.adjust_refs(connection, counts)
+        
+        return len(counts)
+    
+    def __repr__(self):
+        return f'<StoredFile {self.sha256[:12]} refs={self.ref_count}>'
+
+
+# Keep the old values so after_update can release them
+track_previous_values(Place.main_image, Place.images)
+
+
+@event.listens_for(Place, 'after_insert')
+def _place_files_inserted(mapper, connection, target):
+    StoredFile.adjust_refs(connection, StoredFile.place_refs(target.main_image, target.images))
+
+
+@event.listens_for(Place, 'after_update')
+def _place_files_updated(mapper, connection, target):
+    state = inspect(target)
+    if not any(state.attrs[name].history.has_changes() for name in ('main_image', 'images')):
+        return
+    
+    old = StoredFile.place_refs(previous_value(state, 'main_image'), previous_value(state, 'images'))
+    new = StoredFile.place_refs(target.main_image, target.images)
+    
+    deltas = Counter(new)
+    deltas.subtract(old)
+    StoredFile.adjust_refs(connection, deltas)
+
+
+@event.listens_for(Place, 'before_delete')
+def _place_files_deleted(mapper, connection, target):
+    released = StoredFile.place_refs(target.main_image, target.images)
+    StoredFile.adjust_refs(connection, {sha: -count for sha, count in released.items()})
@@ -0,0 +1,71 @@
+from datetime import datetime
+from sqlalchemy import event, update, insert
+from sqlalchemy.orm import Session
+from app import db
+
+
+class TableVersion(db.Model):
+    """Write counter per table, bumped on every change (used for ETags)"""
+    
+    __tablename__ = 'table_versions'
+    
+    # Tables whose writes are tracked
+    VERSIONED_TABLES = ('places', 'reviews', 'users', 'itineraries')
+    
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @staticmethod
+    def bump(connection, *names):
+        """Increment the version of the given tables on an open connection"""
+        versions = TableVersion.__table__
+        now = datetime.utcnow()
+        
+        for name in names:
+            result = connection.execute(
+                update(versions).where(versions.c.name == name).values(
+                    version=versions.c.version + 1,
+                    updated_at=now
+                )
+            )
+            if result.rowcount == 0:
+                connection.execute(
+                    insert(versions).values(name=name, version=1, updated_at=now)
+                )
+    
+    @staticmethod
+    def get_versions(names):
+        """
+        Get current versions
+        
+        Returns:
+            Dict of table name -> (version, updated_at); untouched tables are (0, None)
+        """
+        rows = db.session.query(
+            TableVersion.name, TableVersion.version, TableVersion.updated_at
+        ).filter(TableVersion.name.in_(names)).all()
+        
+        versions = {name: (0, None) for name in names}
+        for name, version, updated_at in rows:
+            versions[name] = (version, updated_at)
+        return versions
+    
+    def __repr__(self):
+        return f'<TableVersion {self.name}={self.version}>'
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_table_versions(session, flush_context):
+    """Bump versions for every tracked table touched by an ORM flush"""
+    changed = set()
+    
+    for obj in list(session.new) + list(session.deleted):
+        changed.add(getattr(obj, '__tablename__', None))
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            changed.add(getattr(obj, '__tablename__', None))
+    
+    changed &= set(TableVersion.VERSIONED_TABLES)
+    if changed:
+        TableVersion.bump(session.connection(), *sorted(changed))
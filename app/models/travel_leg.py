@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+from sqlalchemy import and_, bindparam, delete, insert
+from app import db
+import json
+
+
+class TravelLeg(db.Model):
+    """
+    Cached Google travel answer between two locations
+    
+    origin / destination are location cells (coordinates rounded to
+    LEG_CELL_PRECISION decimals, or "addr:<normalized address>"), hour_bucket
+    is the local departure-time bucket (-1 when the mode does not depend on
+    traffic) and waypoints is "" for a plain leg, "a|b" for a directions
+    request through via points or "opt:a|b" for an optimized route.
+    
+    Distance matrix elements only fill the distance / duration columns;
+    directions answers also keep the full result in route.
+    """
+    
+    __tablename__ = 'travel_legs'
+    
+    origin = db.Column(db.String(300), primary_key=True)
+    destination = db.Column(db.String(300), primary_key=True)
+    mode = db.Column(db.String(20), primary_key=True)
+    hour_bucket = db.Column(db.SmallInteger, primary_key=True)
+    waypoints = db.Column(db.String(1000), primary_key=True, default='')
+    
+    status = db.Column(db.String(30), nullable=False)  # Google element / route status
+    distance_m = db.Column(db.Integer)
+    duration_s = db.Column(db.Integer)
+    distance_text = db.Column(db.String(50))
+    duration_text = db.Column(db.String(50))
+    route = db.Column(db.Text)  # JSON directions result
+    
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    KEY_COLUMNS = ('origin', 'destination', 'mode', 'hour_bucket', 'waypoints')
+    VALUE_COLUMNS = ('status', 'distance_m', 'duration_s', 'distance_text', 'duration_text', 'route')
+    
+    @staticmethod
+    def lookup(origins, destinations, mode, hour_bucket, waypoints=''):
+        """
+        Unexpired legs for every origin x destination pair, in one query
+        
+        Returns:
+            Dict of key tuple -> (values dict, seconds until expiry)
+        """
+        now = datetime.utcnow()
+        rows = db.session.query(TravelLeg.__table__).filter(
+            TravelLeg.origin.in_(set(origins)),
+            TravelLeg.destination.in_(set(destinations)),
+            TravelLeg.mode == mode,
+            TravelLeg.hour_bucket == hour_bucket,
+            TravelLeg.waypoints == waypoints,
+            TravelLeg.expires_at > now
+        ).all()
+        
+        found = {}
+        for row in rows:
+            values = {name: getattr(row, name) for name in TravelLeg.VALUE_COLUMNS}
+            if values['route']:
+                values['route'] = json.loads(values['route'])
+            key = tuple(getattr(row, name) for name in TravelLeg.KEY_COLUMNS)
+            found[key] = (values, (row.expires_at - now).total_seconds())
+        return found
+    
+    @staticmethod
+    def store(entries):
+        """
+        Insert or replace legs on a separate connection
+        
+        Args:
+            entries: List of (key tuple, values dict, ttl seconds)
+        """
+        if not entries:
+            return
+        
+        legs = TravelLeg.__table__
+        now = datetime.utcnow()
+        rows = []
+        # Last answer wins for keys repeated in one batch
+        for key, (values, ttl) in {key: (values, ttl) for key, values, ttl in entries}.items():
+            row = dict(zip(TravelLeg.KEY_COLUMNS, key))
+            row.update({name: values.get(name) for name in TravelLeg.VALUE_COLUMNS})
+            if row['route'] is not None:
+                row['route'] = json.dumps(row['route'], ensure_ascii=False)
+            row['expires_at'] = now + timedelta(seconds=ttl)
+            row['created_at'] = now
+            rows.append(row)
+        
+        with db.engine.begin() as connection:
+            connection.execute(
+                delete(legs).where(and_(*[
+                    legs.c[name] == bindparam(f'k_{name}') for name in TravelLeg.KEY_COLUMNS
+                ])),
+                [{f'k_{name}': row[name] for name in TravelLeg.KEY_COLUMNS} for row in rows]
+            )
+            connection.execute(insert(legs), rows)
+    
+    @staticmethod
+    def purge_expired():
+        """
+        Delete expired legs
+        
+        Returns:
+            Number of rows removed
+        """
+        legs = TravelLeg.__table__
+        with db.engine.begin() as connection:
+            return connection.execute(delete(legs).where(legs.c.expires_at < datetime.utcnow())).rowcount
+    
+    def __repr__(self):
+        return f'<TravelLeg {self.origin} -> {self.destination} {self.mode}>'
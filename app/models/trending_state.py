@@ -0,0 +1,58 @@
+from datetime import datetime
+from sqlalchemy import select, update, insert
+from app import db
+
+
+class TrendingState(db.Model):
+    """
+    Origin of the forward-decay clock behind Place.trending_score (one row)
+    
+    Stored scores are expressed relative to epoch; TrendingService moves it
+    forward and rescales the scores before the exponent gets large.
+    """
+    
+    __tablename__ = 'trending_state'
+    
+    ROW_ID = 1
+    
+    id = db.Column(db.Integer, primary_key=True)
+    epoch = db.Column(db.DateTime, nullable=False)
+    
+    @staticmethod
+    def read(connection, lock=False):
+        """
+        Current epoch, created as now on first use
+        
+        With lock, the row is read FOR SHARE so a concurrent rebase waits for
+        this transaction (a no-op on SQLite, where writers are serialized).
+        """
+        state = TrendingState.__table__
+        query = select(state.c.epoch).where(state.c.id == TrendingState.ROW_ID)
+        if lock:
+            query = query.with_for_update(read=True)
+        
+        epoch = connection.execute(query).scalar()
+        if epoch is None:
+            epoch = datetime.utcnow()
+            connection.execute(insert(state).values(id=TrendingState.ROW_ID, epoch=epoch))
+        return epoch
+    
+    @staticmethod
+    def move(connection, old_epoch, new_epoch):
+        """
+        Compare-and-set the epoch on an open connection
+        
+        Returns:
+            False when another transaction moved it first
+        """
+        state = TrendingState.__table__
+        result = connection.execute(
+            update(state).where(
+                state.c.id == TrendingState.ROW_ID,
+                state.c.epoch == old_epoch
+            ).values(epoch=new_epoch)
+        )
+        return result.rowcount == 1
+    
+    def __repr__(self):
+        return f'<TrendingState epoch={self.epoch}>'
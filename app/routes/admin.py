@@ -3,9 +3,15 @@ from flask_login import login_required, current_user
 from app.models.user import User
 from app.models.place import Place
 from app.models.itinerary import Itinerary, ChatSession
+from app.utils.helpers import get_per_page, wants_cursor_pagination, keyset_paginate
+from app.utils.export import stream_export
+from app.services.import_service import PlaceImporter, read_rows
+from app.services.maps_service import get_maps_service
+from app.services.travel_estimator import get_travel_estimator
 from app import db
 from sqlalchemy import func
 from datetime import datetime, timedelta
+import io
 
 bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 
@@ -34,11 +40,16 @@ def get_dashboard():
         total_chat_sessions = ChatSession.query.count()
         
         # Recent activity
+        fields = Place.resolve_fields(request.args.get('fields'), default='card')
         recent_users = User.query.order_by(User.created_at.desc()).limit(5).all()
-        recent_places = Place.query.order_by(Place.created_at.desc()).limit(5).all()
+        recent_places = Place.query.options(*Place.load_options(fields)).order_by(
+            Place.created_at.desc()
+        ).limit(5).all()
         
-        # Popular places
-        popular_places = Place.query.order_by(Place.view_count.desc()).limit(10).all()
+        # Popular places (recent activity, not all-time views)
+        popular_places = Place.query.options(*Place.load_options(fields)).order_by(
+            Place.trending_score.desc(), Place.view_count.desc()
+        ).limit(10).all()
         
         # Places by category
         categories = db.session.query(
@@ -63,8 +74,8 @@ def get_dashboard():
                 'category_stats': category_stats
             },
             'recent_users': [user.to_dict() for user in recent_users],
-            'recent_places': [place.to_dict() for place in recent_places],
-            'popular_places': [place.to_dict() for place in popular_places]
+            'recent_places': [place.to_dict(fields=fields) for place in recent_places],
+            'popular_places': [place.to_dict(fields=fields) for place in popular_places]
         })
         
     except Exception as e:
@@ -77,7 +88,7 @@ def get_users():
     """Get all users"""
     try:
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
+        per_page = get_per_page(request, 20)
         search = request.args.get('search')
         
         query = User.query
@@ -91,6 +102,21 @@ def get_users():
                 )
             )
         
+        if wants_cursor_pagination(request):
+            try:
+                result = keyset_paginate(
+                    query, 'created_at:desc', User.created_at, User.id,
+                    after=request.args.get('after'), per_page=per_page
+                )
+            except ValueError:
+                return jsonify({'error': 'Cursor không hợp lệ'}), 400
+            
+            return jsonify({
+                'users': [user.to_dict() for user in result['items']],
+                'next_cursor': result['next_cursor'],
+                'has_more': result['has_more']
+            })
+        
         pagination = query.order_by(User.created_at.desc()).paginate(
             page=page, per_page=per_page, error_out=False
         )
@@ -195,19 +221,20 @@ def get_places_stats():
             })
         
         # Top rated places
-        top_rated = Place.query.filter_by(is_active=True).order_by(
-            Place.rating.desc()
-        ).limit(10).all()
+        fields = Place.resolve_fields(request.args.get('fields'), default='card')
+        top_rated = Place.query.filter_by(is_active=True).options(
+            *Place.load_options(fields)
+        ).order_by(Place.rating.desc()).limit(10).all()
         
         # Most viewed places
-        most_viewed = Place.query.filter_by(is_active=True).order_by(
-            Place.view_count.desc()
-        ).limit(10).all()
+        most_viewed = Place.query.filter_by(is_active=True).options(
+            *Place.load_options(fields)
+        ).order_by(Place.view_count.desc()).limit(10).all()
         
         return jsonify({
             'category_stats': stats,
-            'top_rated': [place.to_dict() for place in top_rated],
-            'most_viewed': [place.to_dict() for place in most_viewed]
+            'top_rated': [place.to_dict(fields=fields) for place in top_rated],
+            'most_viewed': [place.to_dict(fields=fields) for place in most_viewed]
         })
         
     except Exception as e:
@@ -220,7 +247,22 @@ def get_chat_sessions():
     """Get all chat sessions"""
     try:
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
+        per_page = get_per_page(request, 20)
+        
+        if wants_cursor_pagination(request):
+            try:
+                result = keyset_paginate(
+                    ChatSession.query, 'updated_at:desc', ChatSession.updated_at, ChatSession.id,
+                    after=request.args.get('after'), per_page=per_page
+                )
+            except ValueError:
+                return jsonify({'error': 'Cursor không hợp lệ'}), 400
+            
+            return jsonify({
+                'sessions': [session.to_dict() for session in result['items']],
+                'next_cursor': result['next_cursor'],
+                'has_more': result['has_more']
+            })
         
         pagination = ChatSession.query.order_by(
             ChatSession.updated_at.desc()
@@ -286,18 +328,61 @@ def get_analytics():
         return jsonify({'error': str(e)}), 500
 
 
-@bp.route('/export/places', methods=['GET'])
+@bp.route('/maps/stats', methods=['GET'])
 @admin_required
-def export_places():
-    """Export places data"""
+def get_maps_stats():
+    """Google Maps call counts, retries and latency per endpoint, and the travel estimator model (this worker)"""
     try:
-        places = Place.query.all()
+        return jsonify({
+            'endpoints': get_maps_service().get_stats(),
+            'travel_estimator': get_travel_estimator().model()
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/import/places', methods=['POST'])
+@admin_required
+def import_places():
+    """Import places from an NDJSON or CSV upload (file field or request body)"""
+    try:
+        upload = request.files.get('file')
+        stream = upload.stream if upload else request.stream
+        filename = upload.filename if upload else ''
         
-        data = []
-        for place in places:
-            data.append(place.to_dict())
+        fmt = request.args.get('format') or ('csv' if filename.lower().endswith('.csv') else 'ndjson')
+        if fmt not in ('ndjson', 'csv'):
+            return jsonify({'error': 'Định dạng không hỗ trợ (ndjson, csv)'}), 400
         
-        return jsonify({'places': data})
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        stats = PlaceImporter().run(read_rows(text, fmt))
+        
+        return jsonify({
+            'message': f"Đã nhập {stats['inserted']} địa điểm",
+            **stats
+        })
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/export/places', methods=['GET'])
+@admin_required
+def export_places():
+    """Export places data (?format=json|ndjson|csv, streamed)"""
+    try:
+        fields = Place.resolve_fields(request.args.get('fields'), default='export')
+        query = Place.query.options(*Place.load_options(fields)).order_by(Place.id)
+        
+        return stream_export(
+            query,
+            lambda place: place.to_dict(fields=fields),
+            fmt=request.args.get('format', 'json'),
+            root_key='places',
+            filename='places'
+        )
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -306,15 +391,17 @@ def export_places():
 @bp.route('/export/users', methods=['GET'])
 @admin_required
 def export_users():
-    """Export users data"""
+    """Export users data (?format=json|ndjson|csv, streamed)"""
     try:
-        users = User.query.all()
-        
-        data = []
-        for user in users:
-            data.append(user.to_dict())
-        
-        return jsonify({'users': data})
+        query = User.query.order_by(User.id)
+        
+        return stream_export(
+            query,
+            lambda user: user.to_dict(),
+            fmt=request.args.get('format', 'json'),
+            root_key='users',
+            filename='users'
+        )
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
@@ -1,9 +1,10 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, current_app
 from flask_login import current_user
 from app.services.ai_service import get_ai_service
 from app.services.itinerary_service import get_itinerary_service
 from app.models.itinerary import ChatSession
 from app.models.place import Place
+from app.utils.opening_hours import parse_open_at
 from app import db
 import json
 import uuid
@@ -99,7 +100,8 @@ def generate_itinerary():
             'budget': data.get('budget', 'medium'),
             'interests': data.get('interests', []),
             'location': data.get('location', 'Việt Nam'),
-            'start_date': data.get('start_date')
+            'start_date': data.get('start_date'),
+            'open_at': data.get('open_at')
         }
         
         # Get selected places if provided
@@ -150,8 +152,19 @@ def suggest_places():
         if criteria['category'] != 'all':
             query = query.filter_by(category=criteria['category'])
         
-        places = query.limit(50).all()
-        places_data = [p.to_dict() for p in places]
+        if data.get('open_at'):
+            try:
+                open_slot = parse_open_at(
+                    data['open_at'], current_app.config.get('TIMEZONE', 'Asia/Ho_Chi_Minh')
+                )
+            except ValueError:
+                return jsonify({'error': 'open_at không hợp lệ'}), 400
+            query = query.filter(Place.open_at_clause(*open_slot))
+        
+        # Card fields plus tags/features are enough for the prompt
+        fields = Place.CARD_FIELDS + ('tags', 'features')
+        places = query.options(*Place.load_options(fields)).limit(50).all()
+        places_data = [p.to_dict(fields=fields) for p in places]
         
         # Get AI suggestions
         ai_service = get_ai_service()
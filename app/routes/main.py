@@ -1,5 +1,6 @@
-from flask import Blueprint, render_template, jsonify
+from flask import Blueprint, render_template, jsonify, send_from_directory, current_app, abort
 from app.models.place import Place
+from app.utils.http_cache import etag_cached
 from app import db
 from sqlalchemy import func
 
@@ -42,7 +43,21 @@ def register():
     return render_template('register.html')
 
 
+@bp.route('/media/<path:filename>')
+def media(filename):
+    """Ảnh tải lên (đường dẫn theo nội dung, không bao giờ thay đổi)"""
+    if not filename.startswith(('objects/', 'derived/')):
+        abort(404)
+    
+    response = send_from_directory(
+        current_app.config['UPLOAD_FOLDER'], filename, max_age=31536000
+    )
+    response.cache_control.immutable = True
+    return response
+
+
 @bp.route('/api/stats')
+@etag_cached('places', 'users', 'itineraries')
 def get_stats():
     """Get system statistics"""
     try:
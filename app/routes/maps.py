@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from app.services.maps_service import get_maps_service
 
 bp = Blueprint('maps', __name__, url_prefix='/api/maps')
@@ -88,6 +88,10 @@ def get_distance_matrix():
         if not origins or not destinations:
             return jsonify({'error': 'Thiếu danh sách địa điểm'}), 400
         
+        limit = current_app.config.get('DISTANCE_MATRIX_MAX_LOCATIONS', 100)
+        if len(origins) > limit or len(destinations) > limit:
+            return jsonify({'error': f'Tối đa {limit} điểm đi và {limit} điểm đến'}), 400
+        
         maps_service = get_maps_service()
         result = maps_service.get_distance_matrix(origins, destinations, mode)
         
@@ -161,22 +165,43 @@ def calculate_route_cost():
 
 @bp.route('/optimize-route', methods=['POST'])
 def optimize_route():
-    """Optimize route for multiple destinations"""
+    """
+    Optimize the visiting order of places (or of each day of an itinerary)
+    
+    Solved locally from cached and estimated travel times; "exact": true
+    resolves the final route through Google.
+    """
     try:
-        data = request.get_json()
-        place_ids = data.get('place_ids', [])
-        start_location = data.get('start_location')
-        
-        if not place_ids:
-            return jsonify({'error': 'Thiếu danh sách địa điểm'}), 400
+        data = request.get_json() or {}
+        mode = data.get('mode', 'driving')
         
         from app.services.itinerary_service import get_itinerary_service
         itinerary_service = get_itinerary_service()
         
-        result = itinerary_service.optimize_route(place_ids, start_location)
+        if data.get('itinerary'):
+            result = itinerary_service.optimize_itinerary(data['itinerary'], mode)
+        else:
+            place_ids = data.get('place_ids', [])
+            if not place_ids:
+                return jsonify({'error': 'Thiếu danh sách địa điểm'}), 400
+            
+            try:
+                place_ids = [int(place_id) for place_id in place_ids]
+                visit_minutes = int(data['visit_minutes']) if data.get('visit_minutes') is not None else None
+            except (TypeError, ValueError):
+                return jsonify({'error': 'Dữ liệu không hợp lệ'}), 400
+            
+            result = itinerary_service.optimize_route(
+                place_ids,
+                data.get('start_location'),
+                mode=mode,
+                start_at=data.get('start_at'),
+                visit_minutes=visit_minutes,
+                exact=bool(data.get('exact'))
+            )
         
         if not result['success']:
-            return jsonify({'error': result.get('error')}), 500
+            return jsonify({'error': result.get('error')}), 400
         
         return jsonify(result)
         
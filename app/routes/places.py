@@ -1,80 +1,394 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_login import login_required, current_user
-from app.models.place import Place, Review
+from app.models.place import Place, Review, ReviewVote, PlaceTag, PlaceFeature
+from app.services.search_service import get_search_index
+from app.services.view_counter import get_view_counter
+from app.services.geo_service import get_geo_service
+from app.services.image_service import get_image_service
+from app.services.storage_service import get_file_storage
+from app.services.trending_service import get_trending_service
+from app.models.table_version import TableVersion
+from app.utils.helpers import get_per_page, wants_cursor_pagination, keyset_paginate, parse_labels, LRUCache
+from app.utils.helpers import validate_coordinates
+from app.utils.opening_hours import parse_open_at
+from app.utils.http_cache import etag_cached, compute_etag, is_not_modified, not_modified, with_cache_headers
 from app import db
-from sqlalchemy import or_, func
+from sqlalchemy import or_, func, false
+from sqlalchemy.exc import IntegrityError
 import os
 import json
-from werkzeug.utils import secure_filename
+import time
 
 bp = Blueprint('places', __name__, url_prefix='/api/places')
 
 
+def filter_by_labels(query, model, column, labels, match_all=True):
+    """
+    Restrict a Place query to places carrying the given tags/features
+    
+    Uses the (label, place_id) index on place_tags / place_features:
+    match_all=True requires every label (AND), otherwise any label (OR).
+    """
+    label_column = getattr(model, column)
+    matches = db.session.query(model.place_id).filter(label_column.in_(labels))
+    
+    if match_all and len(labels) > 1:
+        matches = matches.group_by(model.place_id).having(
+            func.count(func.distinct(label_column)) == len(labels)
+        )
+    
+    return query.filter(Place.id.in_(matches))
+
+
+def parse_label_args(name):
+    """Read ?tag=a&tag=b or ?tag=a,b into normalized labels"""
+    return parse_labels(','.join(request.args.getlist(name)))
+
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
 
 
+def parse_open_at_arg():
+    """
+    Resolve ?open_at= (now, "sat 20:00", ISO datetime...) into (weekday, minute)
+    
+    Returns None when absent; raises ValueError when unparseable.
+    """
+    value = request.args.get('open_at')
+    if not value:
+        return None
+    return parse_open_at(value, current_app.config.get('TIMEZONE', 'Asia/Ho_Chi_Minh'))
+
+
+def open_at_vary():
+    """ETag input for open_at: "now" means a different slot every minute"""
+    try:
+        return (parse_open_at_arg(),)
+    except ValueError:
+        return ()
+
+
+def trending_vary():
+    """ETag input for trending order: views reorder places without bumping the places version"""
+    return (int(time.time() // current_app.config.get('TRENDING_CACHE_SECONDS', 300)),)
+
+
+def place_list_vary():
+    """ETag inputs for the place list (open_at slot, trending time bucket)"""
+    vary = open_at_vary()
+    if request.args.get('sort_by') == 'trending':
+        vary += trending_vary()
+    return vary
+
+
+def apply_place_filters(query, open_slot=None):
+    """
+    Apply the /api/places filter parameters (category, featured, tag,
+    feature, search) to a Place query, plus the resolved open_at slot
+    
+    Returns:
+        (query, search_matches) - search_matches is the FTS subquery when a
+        full-text search is active, for relevance ordering
+    """
+    category = request.args.get('category')
+    search = request.args.get('search')
+    featured = request.args.get('featured', type=bool)
+    
+    if category:
+        query = query.filter_by(category=category)
+    
+    if featured is not None:
+        query = query.filter_by(is_featured=featured)
+    
+    # Tag / feature filters (?tag=biển&tag=ẩm thực&tag_mode=all|any)
+    match_all = request.args.get('tag_mode', 'all') != 'any'
+    tags = parse_label_args('tag')
+    if tags:
+        query = filter_by_labels(query, PlaceTag, 'tag', tags, match_all)
+    
+    features = parse_label_args('feature')
+    if features:
+        query = filter_by_labels(query, PlaceFeature, 'feature', features, match_all)
+    
+    if open_slot is not None:
+        query = query.filter(Place.open_at_clause(*open_slot))
+    
+    search_matches = None
+    if search:
+        search_index = get_search_index()
+        if search_index.is_available():
+            # Full-text index lookup (diacritic-insensitive, BM25 ranked)
+            search_matches = search_index.search_subquery(search)
+            if search_matches is not None:
+                query = query.join(search_matches, Place.id == search_matches.c.place_id)
+            else:
+                # Nothing searchable left after folding ("!!!"): no match
+                query = query.filter(false())
+        else:
+            search_term = f"%{search}%"
+            query = query.filter(
+                or_(
+                    Place.name.ilike(search_term),
+                    Place.description.ilike(search_term),
+                    Place.address.ilike(search_term)
+                )
+            )
+    
+    return query, search_matches
+
+
+# Facet counts per normalized filter set (keyed with the places version)
+FACET_FILTER_ARGS = ('category', 'featured', 'search', 'tag', 'feature', 'tag_mode')
+_facet_cache = LRUCache(max_size=512)
+
+
+def compute_facets(query, open_slot=None):
+    """
+    Count category, price_range and tag values over a filtered Place query
+    
+    Category and price range come from one GROUP BY over the filtered set;
+    tags from one join of place_tags against the same subquery.
+    """
+    key = tuple(
+        (name, tuple(sorted(request.args.getlist(name))))
+        for name in FACET_FILTER_ARGS if name in request.args
+    ) + (open_slot, TableVersion.get_versions(['places'])['places'][0])
+    
+    cached = _facet_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    filtered = query.with_entities(
+        Place.id.label('place_id'), Place.category, Place.price_range
+    ).order_by(None).subquery()
+    
+    rows = db.session.query(
+        filtered.c.category, filtered.c.price_range, func.count()
+    ).group_by(filtered.c.category, filtered.c.price_range).all()
+    
+    categories, price_ranges, total = {}, {}, 0
+    for category, price_range, count in rows:
+        categories[category] = categories.get(category, 0) + count
+        if price_range:
+            price_ranges[price_range] = price_ranges.get(price_range, 0) + count
+        total += count
+    
+    tag_count = func.count().label('tag_count')
+    tag_rows = db.session.query(PlaceTag.tag, tag_count).join(
+        filtered, PlaceTag.place_id == filtered.c.place_id
+    ).group_by(PlaceTag.tag).order_by(tag_count.desc(), PlaceTag.tag).limit(
+        current_app.config.get('FACET_TAG_LIMIT', 50)
+    ).all()
+    
+    facets = {
+        'total': total,
+        'category': categories,
+        'price_range': price_ranges,
+        'tags': {tag: count for tag, count in tag_rows}
+    }
+    
+    _facet_cache.set(key, facets)
+    return facets
+
+
 @bp.route('', methods=['GET'])
+@etag_cached('places', vary=place_list_vary)
 def get_places():
     """Lấy danh sách địa điểm"""
     try:
         # Query parameters
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', current_app.config['ITEMS_PER_PAGE'], type=int)
-        category = request.args.get('category')
-        search = request.args.get('search')
-        featured = request.args.get('featured', type=bool)
+        per_page = get_per_page(request, current_app.config['ITEMS_PER_PAGE'])
         sort_by = request.args.get('sort_by', 'created_at')
         order = request.args.get('order', 'desc')
+        fields = Place.resolve_fields(request.args.get('fields'))
+        with_facets = request.args.get('facets') in ('1', 'true')
         
-        # Base query
-        query = Place.query.filter_by(is_active=True)
+        try:
+            open_slot = parse_open_at_arg()
+        except ValueError:
+            return jsonify({'error': 'open_at không hợp lệ'}), 400
         
         # Filters
-        if category:
-            query = query.filter_by(category=category)
+        query, search_matches = apply_place_filters(Place.query.filter_by(is_active=True), open_slot)
+        facets = compute_facets(query, open_slot) if with_facets else None
         
-        if featured is not None:
-            query = query.filter_by(is_featured=featured)
+        # Only fetch the columns the projection needs
+        query = query.options(*Place.load_options(fields))
         
-        if search:
-            search_term = f"%{search}%"
-            query = query.filter(
-                or_(
-                    Place.name.ilike(search_term),
-                    Place.description.ilike(search_term),
-                    Place.address.ilike(search_term)
-                )
-            )
+        # Sorting (search results default to relevance)
+        if search_matches is not None and 'sort_by' not in request.args:
+            sort_by = 'relevance'
         
-        # Sorting
-        if sort_by == 'name':
-            sort_column = Place.name
-        elif sort_by == 'rating':
-            sort_column = Place.rating
-        elif sort_by == 'view_count':
-            sort_column = Place.view_count
+        if sort_by == 'relevance' and search_matches is not None:
+            sort_column = search_matches.c.rank
+            descending = False  # bm25: lower is better
         else:
-            sort_column = Place.created_at
-        
-        if order == 'asc':
-            query = query.order_by(sort_column.asc())
+            if sort_by == 'name':
+                sort_column = Place.name
+            elif sort_by == 'rating':
+                sort_column = Place.rating
+            elif sort_by == 'view_count':
+                sort_column = Place.view_count
+            elif sort_by == 'trending':
+                sort_column = Place.trending_score
+            else:
+                sort_by = 'created_at'
+                sort_column = Place.created_at
+            descending = order != 'asc'
+            
+        # Keyset pagination (opt-in): no COUNT(*), constant cost per page
+        if wants_cursor_pagination(request):
+            try:
+                result = keyset_paginate(
+                    query, f"{sort_by}:{'desc' if descending else 'asc'}",
+                    sort_column, Place.id,
+                    after=request.args.get('after'),
+                    per_page=per_page,
+                    descending=descending
+                )
+            except ValueError:
+                return jsonify({'error': 'Cursor không hợp lệ'}), 400
+            
+            response = {
+                'places': [place.to_dict(fields=fields) for place in result['items']],
+                'next_cursor': result['next_cursor'],
+                'has_more': result['has_more'],
+                'per_page': per_page
+            }
+            if facets is not None:
+                response['facets'] = facets
+            
+            return jsonify(response)
+        
+        if descending:
+            query = query.order_by(sort_column.desc(), Place.id.desc())
         else:
-            query = query.order_by(sort_column.desc())
+            query = query.order_by(sort_column.asc(), Place.id.asc())
         
         # Pagination
         pagination = query.paginate(page=page, per_page=per_page, error_out=False)
         
-        return jsonify({
-            'places': [place.to_dict() for place in pagination.items],
+        response = {
+            'places': [place.to_dict(fields=fields) for place in pagination.items],
             'total': pagination.total,
             'pages': pagination.pages,
             'current_page': page,
             'per_page': per_page
+        }
+        if facets is not None:
+            response['facets'] = facets
+        
+        return jsonify(response)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/facets', methods=['GET'])
+@etag_cached('places', vary=open_at_vary)
+def get_facets():
+    """Đếm số địa điểm theo category, price_range và tag cho bộ lọc hiện tại"""
+    try:
+        try:
+            open_slot = parse_open_at_arg()
+        except ValueError:
+            return jsonify({'error': 'open_at không hợp lệ'}), 400
+        
+        query, _ = apply_place_filters(Place.query.filter_by(is_active=True), open_slot)
+        return jsonify(compute_facets(query, open_slot))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/trending', methods=['GET'])
+@etag_cached('places', vary=trending_vary)
+def get_trending_places():
+    """Địa điểm đang thịnh hành (lượt xem, đánh giá, yêu thích gần đây)"""
+    try:
+        limit = min(
+            max(request.args.get('limit', 10, type=int), 1),
+            current_app.config.get('MAX_PER_PAGE', 100)
+        )
+        fields = Place.resolve_fields(request.args.get('fields'), default='card')
+        
+        places = get_trending_service().top(
+            category=request.args.get('category'),
+            limit=limit,
+            fields=fields
+        )
+        
+        return jsonify({'places': places, 'total': len(places)})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/nearby', methods=['GET'])
+@etag_cached('places')
+def get_nearby_places():
+    """Tìm địa điểm của hệ thống gần một vị trí (không gọi Google Maps)"""
+    try:
+        valid, lat, lng = validate_coordinates(request.args.get('lat'), request.args.get('lng'))
+        if not valid:
+            return jsonify({'error': 'Tọa độ không hợp lệ'}), 400
+        
+        radius = request.args.get('radius', 5000, type=float)
+        limit = min(
+            request.args.get('limit', 50, type=int),
+            current_app.config.get('MAX_PER_PAGE', 100)
+        )
+        fields = Place.resolve_fields(request.args.get('fields'), default='card')
+        
+        places = get_geo_service().nearby(
+            lat, lng,
+            radius_m=radius,
+            limit=max(limit, 1),
+            category=request.args.get('category'),
+            fields=fields
+        )
+        
+        return jsonify({
+            'places': places,
+            'total': len(places),
+            'center': {'lat': lat, 'lng': lng},
+            'radius': radius
         })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/clusters', methods=['GET'])
+@etag_cached('places')
+def get_place_clusters():
+    """Gom nhóm địa điểm theo ô lưới cho khung nhìn bản đồ"""
+    try:
+        try:
+            south, west, north, east = [float(value) for value in request.args.get('bbox', '').split(',')]
+        except ValueError:
+            return jsonify({'error': 'bbox phải có dạng south,west,north,east'}), 400
+        
+        valid_sw = validate_coordinates(south, west)[0]
+        valid_ne = validate_coordinates(north, east)[0]
+        if not (valid_sw and valid_ne) or south > north:
+            return jsonify({'error': 'bbox không hợp lệ'}), 400
+        
+        zoom = min(max(request.args.get('zoom', 12, type=int), 0), 22)
+        
+        result = get_geo_service().clusters(south, west, north, east, zoom)
         
+        return jsonify({
+            'clusters': result['clusters'],
+            'total': sum(cluster['count'] for cluster in result['clusters']),
+            'precision': result['precision'],
+            'zoom': zoom
+        })
+    
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -83,14 +397,27 @@ def get_places():
 def get_place(place_id):
     """Lấy chi tiết địa điểm"""
     try:
-        place = Place.query.get_or_404(place_id)
+        # Existence first, so an unknown id is a 404 and never a 304
+        row = db.session.query(Place.updated_at).filter_by(id=place_id).first()
+        if row is None:
+            return jsonify({'error': 'Không tìm thấy địa điểm'}), 404
+        last_modified = row.updated_at
         
-        # Increment view count
-        place.view_count += 1
-        db.session.commit()
+        # Buffer the view; increments are flushed to the DB in batches
+        get_view_counter().record(place_id)
         
-        return jsonify(place.to_dict(include_reviews=True))
+        # Conditional GET: answer 304 before loading and serializing the place
+        etag, _ = compute_etag(('places', 'reviews'))
+        if is_not_modified(etag, last_modified):
+            return not_modified(etag, last_modified)
         
+        fields = Place.resolve_fields(request.args.get('fields'))
+        place = Place.query.options(*Place.load_options(fields)).filter_by(id=place_id).first_or_404()
+        
+        return with_cache_headers(
+            jsonify(place.to_dict(include_reviews=True, fields=fields)), etag, last_modified
+        )
+    
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -112,23 +439,17 @@ def create_place():
                 return jsonify({'error': f'Thiếu trường {field}'}), 400
         
         # Create slug
-        from slugify import slugify
-        slug = slugify(data['name'])
-        
-        # Check if slug exists
-        counter = 1
-        original_slug = slug
-        while Place.query.filter_by(slug=slug).first():
-            slug = f"{original_slug}-{counter}"
-            counter += 1
+        from app.services.import_service import SlugAllocator
+        slug = SlugAllocator().allocate([data['name']])[0]
         
         # Geocode address
         from app.services.maps_service import get_maps_service
         maps_service = get_maps_service()
         geocode_result = maps_service.geocode(data['address'])
         
-        latitude = geocode_result['latitude'] if geocode_result else None
-        longitude = geocode_result['longitude'] if geocode_result else None
+        geocoded = geocode_result and geocode_result.get('success')
+        latitude = geocode_result['latitude'] if geocoded else None
+        longitude = geocode_result['longitude'] if geocoded else None
         
         # Create place
         place = Place(
@@ -152,22 +473,23 @@ def create_place():
         )
         
         # Handle file uploads
+        image_service = get_image_service()
         if 'main_image' in request.files:
             file = request.files['main_image']
             if file and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                upload_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-                file.save(upload_path)
-                place.main_image = f"/static/uploads/{filename}"
+                place.main_image = get_file_storage().store(file)
         
         db.session.add(place)
         db.session.commit()
         
+        if place.main_image:
+            image_service.schedule(place.id, place.main_image)
+        
         return jsonify({
             'message': 'Tạo địa điểm thành công',
             'place': place.to_dict()
         }), 201
-        
+    
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -193,13 +515,13 @@ def update_place(place_id):
             place.description = data['description']
         if 'short_description' in data:
             place.short_description = data['short_description']
-        if 'address' in data:
+        if 'address' in data and data['address'] != place.address:
             place.address = data['address']
-            # Re-geocode if address changed
+            # Re-geocode only when the address actually changed
             from app.services.maps_service import get_maps_service
             maps_service = get_maps_service()
             geocode_result = maps_service.geocode(data['address'])
-            if geocode_result:
+            if geocode_result.get('success'):
                 place.latitude = geocode_result['latitude']
                 place.longitude = geocode_result['longitude']
         
@@ -225,21 +547,27 @@ def update_place(place_id):
             place.is_active = data['is_active'].lower() == 'true'
         
         # Handle file upload
+        image_service = get_image_service()
+        new_image = False
         if 'main_image' in request.files:
             file = request.files['main_image']
             if file and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                upload_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-                file.save(upload_path)
-                place.main_image = f"/static/uploads/{filename}"
+                main_image = get_file_storage().store(file)
+                if main_image != place.main_image:
+                    place.main_image = main_image
+                    place.image_variants = None
+                    new_image = True
         
         db.session.commit()
         
+        if new_image:
+            image_service.schedule(place.id, place.main_image)
+        
         return jsonify({
             'message': 'Cập nhật thành công',
             'place': place.to_dict()
         })
-        
+    
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -260,12 +588,54 @@ def delete_place(place_id):
         db.session.commit()
         
         return jsonify({'message': 'Xóa địa điểm thành công'})
-        
+    
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
+@bp.route('/<int:place_id>/reviews', methods=['GET'])
+@etag_cached('reviews')
+def get_place_reviews(place_id):
+    """Danh sách đánh giá của địa điểm (?sort=newest|helpful|rating, phân trang bằng cursor)"""
+    try:
+        review_count = db.session.query(Place.review_count).filter_by(id=place_id).scalar()
+        if review_count is None:
+            return jsonify({'error': 'Không tìm thấy địa điểm'}), 404
+        
+        sort = request.args.get('sort', 'newest')
+        if sort not in Review.SORTS:
+            return jsonify({'error': 'sort phải là newest, helpful hoặc rating'}), 400
+        
+        column, descending = Review.SORTS[sort]
+        if sort == 'rating' and request.args.get('order') == 'asc':
+            descending = False
+        
+        # Each sort walks its (place_id, column, id) index; no COUNT / OFFSET
+        try:
+            result = keyset_paginate(
+                Review.query_with_user().filter(Review.place_id == place_id),
+                f"{sort}:{'desc' if descending else 'asc'}",
+                getattr(Review, column), Review.id,
+                after=request.args.get('after'),
+                per_page=get_per_page(request, 10),
+                descending=descending
+            )
+        except ValueError:
+            return jsonify({'error': 'Cursor không hợp lệ'}), 400
+        
+        return jsonify({
+            'reviews': [review.to_dict() for review in result['items']],
+            'total': review_count or 0,
+            'next_cursor': result['next_cursor'],
+            'has_more': result['has_more'],
+            'per_page': result['per_page']
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @bp.route('/<int:place_id>/reviews', methods=['POST'])
 @login_required
 def add_review(place_id):
@@ -275,32 +645,28 @@ def add_review(place_id):
         data = request.get_json()
         
         rating = data.get('rating')
-        if not rating or rating < 1 or rating > 5:
+        if not isinstance(rating, int) or rating < 1 or rating > 5:
             return jsonify({'error': 'Rating phải từ 1-5'}), 400
         
-        # Check if user already reviewed
-        existing_review = Review.query.filter_by(
-            place_id=place_id,
-            user_id=current_user.id
-        ).first()
-        
-        if existing_review:
-            return jsonify({'error': 'Bạn đã đánh giá địa điểm này'}), 400
-        
         review = Review(
-            place_id=place_id,
+            place_id=place.id,
             user_id=current_user.id,
             rating=rating,
             title=data.get('title'),
             content=data.get('content')
         )
         
+        # One review per user per place is enforced by a unique index
         db.session.add(review)
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({'error': 'Bạn đã đánh giá địa điểm này'}), 400
         
-        # Update place rating
-        avg_rating = db.session.query(func.avg(Review.rating)).filter_by(place_id=place_id).scalar()
-        place.rating = round(avg_rating, 1) if avg_rating else 0
-        place.review_count += 1
+        # Update place rating aggregates
+        Place.adjust_rating(place.id, rating, 1)
+        get_trending_service().record(place.id, 'review')
         
         db.session.commit()
         
@@ -308,13 +674,75 @@ def add_review(place_id):
             'message': 'Thêm đánh giá thành công',
             'review': review.to_dict()
         }), 201
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/<int:place_id>/reviews/<int:review_id>/helpful', methods=['POST'])
+@login_required
+def vote_review_helpful(place_id, review_id):
+    """Đánh dấu đánh giá là hữu ích (mỗi user một lần)"""
+    try:
+        author_id = db.session.query(Review.user_id).filter_by(id=review_id, place_id=place_id).scalar()
+        if author_id is None:
+            return jsonify({'error': 'Không tìm thấy đánh giá'}), 404
+        if author_id == current_user.id:
+            return jsonify({'error': 'Không thể bình chọn đánh giá của chính bạn'}), 400
+        
+        # One vote per user is enforced by the (review_id, user_id) primary key
+        db.session.add(ReviewVote(review_id=review_id, user_id=current_user.id))
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({'error': 'Bạn đã bình chọn đánh giá này'}), 400
+        
+        Review.adjust_helpful(review_id, 1)
+        db.session.commit()
         
+        return jsonify({
+            'message': 'Đã đánh dấu hữu ích',
+            'helpful_count': db.session.query(Review.helpful_count).filter_by(id=review_id).scalar()
+        })
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/<int:place_id>/reviews/<int:review_id>/helpful', methods=['DELETE'])
+@login_required
+def unvote_review_helpful(place_id, review_id):
+    """Bỏ đánh dấu hữu ích"""
+    try:
+        votes = ReviewVote.__table__
+        result = db.session.execute(votes.delete().where(
+            votes.c.review_id == review_id,
+            votes.c.user_id == current_user.id,
+            votes.c.review_id.in_(
+                db.session.query(Review.id).filter_by(id=review_id, place_id=place_id)
+            )
+        ))
+        
+        # Only a vote that actually existed takes the count back down
+        if result.rowcount:
+            Review.adjust_helpful(review_id, -1)
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Đã bỏ đánh dấu hữu ích',
+            'helpful_count': db.session.query(Review.helpful_count).filter_by(id=review_id).scalar() or 0
+        })
+    
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
 @bp.route('/categories', methods=['GET'])
+@etag_cached()
 def get_categories():
     """Lấy danh sách categories"""
     categories = {
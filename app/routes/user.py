@@ -4,6 +4,8 @@ from app.services.itinerary_service import get_itinerary_service
 from app.models.itinerary import Itinerary, ChatSession
 from app.models.place import Place, Review
 from app.models.user import User
+from app.services.trending_service import get_trending_service
+from app.utils.helpers import get_per_page, wants_cursor_pagination, keyset_paginate
 from app import db
 import json
 
@@ -123,7 +125,7 @@ def get_itineraries():
     """Lấy danh sách lịch trình đã lưu"""
     try:
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
+        per_page = get_per_page(request, 10)
         status = request.args.get('status')
         
         query = Itinerary.query.filter_by(user_id=current_user.id)
@@ -131,6 +133,21 @@ def get_itineraries():
         if status:
             query = query.filter_by(status=status)
         
+        if wants_cursor_pagination(request):
+            try:
+                result = keyset_paginate(
+                    query, 'created_at:desc', Itinerary.created_at, Itinerary.id,
+                    after=request.args.get('after'), per_page=per_page
+                )
+            except ValueError:
+                return jsonify({'error': 'Cursor không hợp lệ'}), 400
+            
+            return jsonify({
+                'itineraries': [itinerary.to_dict() for itinerary in result['items']],
+                'next_cursor': result['next_cursor'],
+                'has_more': result['has_more']
+            })
+        
         pagination = query.order_by(Itinerary.created_at.desc()).paginate(
             page=page, per_page=per_page, error_out=False
         )
@@ -207,10 +224,26 @@ def get_reviews():
     """Lấy danh sách reviews của user"""
     try:
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        
-        pagination = Review.query.filter_by(user_id=current_user.id).order_by(
-            Review.created_at.desc()
+        per_page = get_per_page(request, 10)
+        
+        if wants_cursor_pagination(request):
+            try:
+                result = keyset_paginate(
+                    Review.query_with_user().filter_by(user_id=current_user.id),
+                    'created_at:desc', Review.created_at, Review.id,
+                    after=request.args.get('after'), per_page=per_page
+                )
+            except ValueError:
+                return jsonify({'error': 'Cursor không hợp lệ'}), 400
+            
+            return jsonify({
+                'reviews': [review.to_dict() for review in result['items']],
+                'next_cursor': result['next_cursor'],
+                'has_more': result['has_more']
+            })
+        
+        pagination = Review.query_with_user().filter_by(user_id=current_user.id).order_by(
+            Review.created_at.desc(), Review.id.desc()
         ).paginate(page=page, per_page=per_page, error_out=False)
         
         reviews = [review.to_dict() for review in pagination.items]
@@ -239,9 +272,19 @@ def update_review(review_id):
         data = request.get_json()
         
         if 'rating' in data:
-            review.rating = data['rating']
-        if 'comment' in data:
-            review.comment = data['comment']
+            rating = data['rating']
+            if not isinstance(rating, int) or rating < 1 or rating > 5:
+                return jsonify({'error': 'Rating phải từ 1-5'}), 400
+            
+            if rating != review.rating:
+                Place.adjust_rating(review.place_id, rating - review.rating, 0)
+                review.rating = rating
+        if 'title' in data:
+            review.title = data['title']
+        if 'content' in data:
+            review.content = data['content']
+        elif 'comment' in data:
+            review.content = data['comment']
         
         db.session.commit()
         
@@ -265,6 +308,7 @@ def delete_review(review_id):
             user_id=current_user.id
         ).first_or_404()
         
+        Place.adjust_rating(review.place_id, -review.rating, -1)
         db.session.delete(review)
         db.session.commit()
         
@@ -287,8 +331,11 @@ def get_favorites():
             favorite_ids = prefs.get('favorite_places', [])
             
             if favorite_ids:
-                places = Place.query.filter(Place.id.in_(favorite_ids)).all()
-                favorites = [place.to_dict() for place in places]
+                fields = Place.resolve_fields(request.args.get('fields'), default='card')
+                places = Place.query.options(*Place.load_options(fields)).filter(
+                    Place.id.in_(favorite_ids)
+                ).all()
+                favorites = [place.to_dict(fields=fields) for place in places]
         
         return jsonify({
             'favorites': favorites,
@@ -318,6 +365,7 @@ def add_favorite(place_id):
             favorite_ids.append(place_id)
             prefs['favorite_places'] = favorite_ids
             current_user.preferences = json.dumps(prefs, ensure_ascii=False)
+            get_trending_service().record(place_id, 'favorite')
             db.session.commit()
         
         return jsonify({
@@ -395,9 +443,9 @@ def dashboard():
         ).order_by(Itinerary.updated_at.desc()).limit(5).all()
         
         # Get recent reviews
-        recent_reviews = Review.query.filter_by(
+        recent_reviews = Review.query_with_user().filter_by(
             user_id=current_user.id
-        ).order_by(Review.created_at.desc()).limit(5).all()
+        ).order_by(Review.created_at.desc(), Review.id.desc()).limit(5).all()
         
         # Get recent chat sessions
         recent_chats = ChatSession.query.filter_by(
@@ -0,0 +1,170 @@
+from sqlalchemy import and_, or_
+from app.models.place import Place
+from app.models.place_cluster import PlaceCluster
+from app.utils.geo import (
+    geohash_cover, geohash_bbox_cells, precision_for_zoom, haversine_np, METERS_PER_DEGREE
+)
+from app.utils.helpers import chunk_list
+from app import db
+from typing import Dict, List, Optional
+import math
+import numpy as np
+
+
+class GeoService:
+    """Local geospatial queries over the Place table"""
+    
+    MAX_RADIUS_M = 200000
+    
+    # Upper bound on grid cells looked up for one viewport
+    MAX_CLUSTER_CELLS = 2000
+    CLUSTER_TOP_FIELDS = ('id', 'name', 'category', 'main_image', 'image_variants', 'rating')
+    
+    def nearby(self, lat: float, lng: float, radius_m: float = 5000,
+               limit: int = 50, category: Optional[str] = None,
+               fields=None) -> List[Dict]:
+        """
+        Find our own places within radius_m of a point, nearest first
+        
+        Candidates come from indexed range scans over the geohash cells
+        covering the search circle; exact distances are then computed with a
+        vectorized haversine over those candidates only.
+        
+        Args:
+            lat: Latitude of the search center
+            lng: Longitude of the search center
+            radius_m: Search radius in meters
+            limit: Maximum number of places
+            category: Optional category filter
+            fields: Place projection for the result (default: card)
+        
+        Returns:
+            List of place dicts with a distance_m key
+        """
+        radius_m = min(max(float(radius_m), 1.0), self.MAX_RADIUS_M)
+        fields = fields or Place.CARD_FIELDS
+        
+        query = db.session.query(Place.id, Place.latitude, Place.longitude).filter(
+            Place.is_active == True
+        )
+        if category:
+            query = query.filter(Place.category == category)
+        
+        cells = geohash_cover(lat, lng, radius_m)
+        if cells:
+            # Each cell is a contiguous range of the geohash index
+            query = query.filter(or_(*[
+                and_(Place.geohash >= cell, Place.geohash < cell + '~')
+                for cell in cells
+            ]))
+        else:
+            # Radius larger than any cell: fall back to a bounding box
+            dlat = radius_m / METERS_PER_DEGREE
+            dlng = radius_m / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+            query = query.filter(
+                Place.latitude.between(lat - dlat, lat + dlat),
+                Place.longitude.between(lng - dlng, lng + dlng)
+            )
+        
+        candidates = query.all()
+        if not candidates:
+            return []
+        
+        ids = np.fromiter((row[0] for row in candidates), dtype=np.int64, count=len(candidates))
+        lats = np.fromiter((row[1] for row in candidates), dtype=np.float64, count=len(candidates))
+        lngs = np.fromiter((row[2] for row in candidates), dtype=np.float64, count=len(candidates))
+        
+        distances = haversine_np(lat, lng, lats, lngs)
+        inside = np.nonzero(distances <= radius_m)[0]
+        order = inside[np.argsort(distances[inside], kind='stable')][:limit]
+        
+        if len(order) == 0:
+            return []
+        
+        place_ids = [int(place_id) for place_id in ids[order]]
+        places = Place.query.options(*Place.load_options(fields)).filter(
+            Place.id.in_(place_ids)
+        ).all()
+        by_id = {place.id: place for place in places}
+        
+        results = []
+        for index in order:
+            place = by_id.get(int(ids[index]))
+            if place is None:
+                continue
+            data = place.to_dict(fields=fields)
+            data['distance_m'] = round(float(distances[index]), 1)
+            results.append(data)
+        
+        return results
+
+    def clusters(self, south: float, west: float, north: float, east: float,
+                 zoom: int) -> Dict:
+        """
+        Aggregate our places into grid cells covering a map viewport
+        
+        Reads the pre-aggregated PlaceCluster rows for the geohash precision
+        that matches the zoom level, so the cost depends on the number of
+        visible cells rather than the number of places.
+        
+        Args:
+            south, west, north, east: Viewport bounds in degrees
+            zoom: Web-map zoom level
+        
+        Returns:
+            Dict with the precision used and a list of clusters
+            (count, centroid, top place)
+        """
+        if east < west:
+            # Viewport crossing the antimeridian
+            east += 360.0
+        
+        precision = precision_for_zoom(zoom, max(PlaceCluster.PRECISIONS))
+        cells = None
+        while precision >= 1:
+            cells = geohash_bbox_cells(south, west, north, east, precision,
+                                       self.MAX_CLUSTER_CELLS)
+            if cells is not None:
+                break
+            precision -= 1
+        
+        rows = []
+        for chunk in chunk_list(cells or [], 500):
+            rows.extend(PlaceCluster.query.filter(
+                PlaceCluster.cell.in_(chunk),
+                PlaceCluster.count > 0
+            ).all())
+        
+        top_ids = {row.top_place_id for row in rows if row.top_place_id}
+        top_places = {}
+        if top_ids:
+            fields = Place.resolve_fields(self.CLUSTER_TOP_FIELDS)
+            places = Place.query.options(*Place.load_options(fields)).filter(
+                Place.id.in_(top_ids)
+            ).all()
+            top_places = {place.id: place.to_dict(fields=fields) for place in places}
+        
+        clusters = []
+        for row in rows:
+            data = row.to_dict()
+            data['top_place'] = top_places.get(data.pop('top_place_id'))
+            clusters.append(data)
+        
+        clusters.sort(key=lambda cluster: cluster['count'], reverse=True)
+        return {'precision': precision, 'clusters': clusters}
+
+
+# Singleton instance
+_geo_service = None
+
+def get_geo_service() -> GeoService:
+    """
+    Get geo service instance
+    
+    Returns:
+        GeoService singleton instance
+    """
+    global _geo_service
+    if _geo_service is None:
+        _geo_service = GeoService()
+    return _geo_service
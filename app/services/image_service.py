@@ -0,0 +1,182 @@
+from flask import current_app
+from sqlalchemy import update
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps
+from app.models.place import Place
+from app.models.table_version import TableVersion
+from app.models.stored_file import MEDIA_URL_PREFIX
+from app.services.storage_service import get_file_storage, DERIVED_FOLDER
+from app import db
+from typing import Dict
+import atexit
+import json
+import os
+import threading
+
+# Saved format -> (Pillow format name, file extension)
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg')
+}
+
+
+def render_derivatives(source_path: str, output_dir: str, stem: str,
+                       sizes: Dict[str, int], quality: int) -> Dict[str, Dict[str, str]]:
+    """
+    Resize one image into every derivative size and format
+    
+    Runs in a worker process, so it only touches the filesystem. EXIF and
+    other metadata are dropped: the orientation is applied to the pixels
+    first and the derivatives are saved without an exif/icc payload.
+    
+    Returns:
+        {size_name: {format: filename}}
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'L'):
+            # Flatten transparency onto white (JPEG has no alpha)
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            rgba = image.convert('RGBA')
+            background.paste(rgba, mask=rgba.getchannel('A'))
+            image = background
+        else:
+            image = image.convert('RGB')
+        
+        results = {}
+        # Largest first so each step resizes from the closest bigger image
+        for name, max_edge in sorted(sizes.items(), key=lambda item: -item[1]):
+            if max(image.size) > max_edge:
+                image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            
+            results[name] = {}
+            for fmt, (pil_format, ext) in DERIVATIVE_FORMATS.items():
+                filename = f"{stem}_{name}.{ext}"
+                options = {'quality': quality}
+                if pil_format == 'JPEG':
+                    options.update(optimize=True, progressive=True)
+                else:
+                    options.update(method=4)
+                image.save(os.path.join(output_dir, filename), pil_format, **options)
+                results[name][fmt] = filename
+    
+    return results
+
+
+class ImageService:
+    """
+    Background derivative generation for place images
+    
+    Originals live in FileStorage; thumb/card/full derivatives (WebP + JPEG)
+    are rendered in a process pool and written to Place.image_variants when
+    done, so requests never wait on Pillow.
+    """
+    
+    def __init__(self):
+        self._executor = None
+        self._pid = None
+        self._app = None
+        self._lock = threading.Lock()
+    
+    def schedule(self, place_id: int, image_url: str):
+        """
+        Render derivatives for a place image in the background
+        
+        With IMAGE_WORKERS = 0 the work is done inline (tests, CLI); a
+        rendering error is logged, never raised, since the place is already
+        saved and keeps its original image.
+        
+        Returns:
+            False when there is no local file or inline rendering failed
+        """
+        source_path = get_file_storage().path_for_url(image_url)
+        if not source_path or not os.path.exists(source_path):
+            return False
+        
+        config = current_app.config
+        stem = os.path.splitext(os.path.basename(source_path))[0]
+        args = (
+            source_path,
+            os.path.join(config['UPLOAD_FOLDER'], DERIVED_FOLDER),
+            stem,
+            config.get('IMAGE_DERIVATIVES', {}),
+            config.get('IMAGE_QUALITY', 82)
+        )
+        
+        workers = config.get('IMAGE_WORKERS', 2)
+        if workers <= 0:
+            try:
+                self._store(place_id, image_url, render_derivatives(*args))
+            except Exception as e:
+                current_app.logger.error(f"Error rendering image for place {place_id}: {str(e)}")
+                return False
+            return True
+        
+        executor = self._ensure_executor(workers)
+        future = executor.submit(render_derivatives, *args)
+        future.add_done_callback(
+            lambda done: self._on_done(done, place_id, image_url)
+        )
+        return True
+    
+    def _on_done(self, future, place_id: int, image_url: str):
+        with self._app.app_context():
+            try:
+                self._store(place_id, image_url, future.result())
+            except Exception as e:
+                current_app.logger.error(f"Error rendering image for place {place_id}: {str(e)}")
+    
+    def _store(self, place_id: int, image_url: str, rendered: Dict[str, Dict[str, str]]):
+        """Save derivative URLs, unless the place got another image meanwhile"""
+        variants = {
+            name: {
+                fmt: f"{MEDIA_URL_PREFIX}{DERIVED_FOLDER}/{filename}"
+                for fmt, filename in formats.items()
+            }
+            for name, formats in rendered.items()
+        }
+        
+        places = Place.__table__
+        with db.engine.begin() as connection:
+            result = connection.execute(
+                update(places).where(
+                    places.c.id == place_id,
+                    places.c.main_image == image_url
+                ).values(image_variants=json.dumps(variants))
+            )
+            if result.rowcount:
+                TableVersion.bump(connection, 'places')
+    
+    def _ensure_executor(self, workers: int) -> ProcessPoolExecutor:
+        """Start the worker pool on first use in this process (safe across fork)"""
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._app = current_app._get_current_object()
+                self._pid = os.getpid()
+                self._executor = ProcessPoolExecutor(max_workers=workers)
+            return self._executor
+    
+    def shutdown(self):
+        """Wait for pending renders and stop the pool"""
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+# Singleton instance
+_image_service = None
+
+def get_image_service() -> ImageService:
+    """
+    Get image service instance
+    
+    Returns:
+        ImageService singleton instance
+    """
+    global _image_service
+    if _image_service is None:
+        _image_service = ImageService()
+        atexit.register(_image_service.shutdown)
+    return _image_service
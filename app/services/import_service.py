@@ -0,0 +1,306 @@
+from flask import current_app
+from sqlalchemy import and_, or_, insert
+from concurrent.futures import ThreadPoolExecutor
+from app.models.place import Place, PlaceTag, PlaceFeature, PlaceHours
+from app.models.place_cluster import PlaceCluster
+from app.models.stored_file import StoredFile
+from app.models.table_version import TableVersion
+from app.services.search_service import get_search_index
+from app.utils.helpers import create_slug, parse_labels, chunk_list
+from app.utils.geo import geohash_encode
+from app.utils.opening_hours import parse_opening_hours
+from app import db
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import csv
+import json
+import os
+
+# Columns accepted from an import row
+IMPORT_COLUMNS = (
+    'name', 'slug', 'category', 'description', 'short_description', 'address',
+    'latitude', 'longitude', 'phone', 'email', 'website', 'price_range',
+    'estimated_cost', 'main_image', 'images', 'tags', 'features',
+    'opening_hours', 'is_featured', 'is_active'
+)
+FLOAT_COLUMNS = ('latitude', 'longitude', 'estimated_cost')
+BOOL_COLUMNS = ('is_featured', 'is_active')
+JSON_COLUMNS = ('images', 'tags', 'features', 'opening_hours')
+
+
+class SlugAllocator:
+    """
+    Hands out unique Place slugs
+    
+    Existing slugs are fetched with one indexed range query per batch of new
+    base slugs ("pho" covers "pho", "pho-1", "pho-2", ...) instead of one
+    query per candidate.
+    """
+    
+    def __init__(self):
+        self._taken = set()
+        self._checked = set()
+    
+    def allocate(self, names: List[str]) -> List[str]:
+        """Unique slugs for names (or requested slugs), in order"""
+        bases = [create_slug(name or '') or 'dia-diem' for name in names]
+        self._load([base for base in set(bases) if base not in self._checked])
+        
+        slugs = []
+        for base in bases:
+            slug, counter = base, 1
+            while slug in self._taken:
+                slug = f"{base}-{counter}"
+                counter += 1
+            self._taken.add(slug)
+            slugs.append(slug)
+        return slugs
+    
+    def _load(self, bases: List[str]):
+        for chunk in chunk_list(bases, 100):
+            rows = db.session.query(Place.slug).filter(or_(*[
+                or_(Place.slug == base, and_(Place.slug > base + '-', Place.slug < base + '.'))
+                for base in chunk
+            ]))
+            self._taken.update(slug for (slug,) in rows)
+            self._checked.update(chunk)
+
+
+def read_rows(stream, fmt: str) -> Iterator[Dict]:
+    """
+    Parse an NDJSON or CSV text stream into dicts, one row at a time
+    
+    Blank NDJSON lines are skipped; malformed lines yield {'_error': ...}
+    so they are reported without aborting the import.
+    """
+    if fmt == 'csv':
+        for row in csv.DictReader(stream):
+            yield {key.strip(): value for key, value in row.items() if key}
+        return
+    
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+            yield row if isinstance(row, dict) else {'_error': f'Dòng {line_number}: không phải object'}
+        except ValueError:
+            yield {'_error': f'Dòng {line_number}: JSON không hợp lệ'}
+
+
+def normalize_row(raw: Dict) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    Coerce one import row into Place column values
+    
+    Returns:
+        (values, None) or (None, error message)
+    """
+    if raw.get('_error'):
+        return None, raw['_error']
+    
+    values = {}
+    for column in IMPORT_COLUMNS:
+        value = raw.get(column)
+        if value == '' or value is None:
+            continue
+        
+        if column in FLOAT_COLUMNS:
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                return None, f'{column} không hợp lệ: {value}'
+        elif column in BOOL_COLUMNS:
+            value = value if isinstance(value, bool) else str(value).strip().lower() in ('1', 'true', 'yes')
+        elif column in JSON_COLUMNS and isinstance(value, (list, dict)):
+            value = json.dumps(value, ensure_ascii=False)
+        else:
+            value = str(value).strip()
+        
+        values[column] = value
+    
+    for field in ('name', 'category'):
+        if not values.get(field):
+            return None, f'Thiếu trường {field}'
+    
+    has_lat, has_lng = 'latitude' in values, 'longitude' in values
+    if has_lat != has_lng:
+        return None, 'Thiếu latitude hoặc longitude'
+    if has_lat and not (-90 <= values['latitude'] <= 90 and -180 <= values['longitude'] <= 180):
+        return None, 'Tọa độ không hợp lệ'
+    
+    return values, None
+
+
+class PlaceImporter:
+    """
+    Bulk place import
+    
+    Rows are read lazily, geocoded only when they have an address but no
+    coordinates (concurrently, de-duplicated per batch), and inserted with
+    one executemany INSERT per batch. Derived structures that the Place
+    mapper events normally maintain (search index, tag/feature/hours
+    tables, table version) are updated per batch; map clusters and upload
+    reference counts are rebuilt once at the end.
+    
+    With a checkpoint file, progress (rows committed, geocode results) is
+    saved after every batch and a rerun resumes where the last one stopped.
+    """
+    
+    def __init__(self, batch_size: Optional[int] = None, concurrency: Optional[int] = None,
+                 checkpoint_path: Optional[str] = None):
+        config = current_app.config
+        self.batch_size = batch_size or config.get('IMPORT_BATCH_SIZE', 1000)
+        self.concurrency = concurrency or config.get('GEOCODE_CONCURRENCY', 8)
+        self.checkpoint_path = checkpoint_path
+        self.slugs = SlugAllocator()
+        self.checkpoint = self._load_checkpoint()
+        self.stats = {'inserted': 0, 'skipped': 0, 'geocoded': 0, 'resumed': 0, 'errors': []}
+    
+    def run(self, rows: Iterable[Dict]) -> Dict:
+        """
+        Import rows (dicts, e.g. from read_rows)
+        
+        Returns:
+            Summary with inserted / skipped / geocoded counts and the first errors
+        """
+        done = self.checkpoint['rows_done']
+        position = 0
+        batch = []
+        touches_files = False
+        
+        for raw in rows:
+            position += 1
+            if position <= done:
+                self.stats['resumed'] += 1
+                continue
+            
+            values, error = normalize_row(raw)
+            if error:
+                self._error(position, error)
+            else:
+                batch.append(values)
+                touches_files = touches_files or bool(
+                    StoredFile.place_refs(values.get('main_image'), values.get('images'))
+                )
+            
+            if len(batch) >= self.batch_size:
+                self._flush(batch, position)
+                batch = []
+        
+        self._flush(batch, position)
+        
+        if self.stats['inserted']:
+            PlaceCluster.rebuild()
+            if touches_files:
+                StoredFile.recount()
+        
+        return self.stats
+    
+    def _flush(self, batch: List[Dict], position: int):
+        """Geocode, insert and index one batch, then save the checkpoint"""
+        if batch:
+            self._geocode_missing(batch)
+            
+            slugs = self.slugs.allocate([values.get('slug') or values['name'] for values in batch])
+            for values, slug in zip(batch, slugs):
+                values['slug'] = slug
+                values.setdefault('is_active', True)
+                values.setdefault('is_featured', False)
+                values.setdefault('estimated_cost', 0.0)
+                if values.get('latitude') is not None and values.get('longitude') is not None:
+                    values['geohash'] = geohash_encode(values['latitude'], values['longitude'])
+            
+            self._insert(batch)
+        
+        self.checkpoint['rows_done'] = position
+        self._save_checkpoint()
+    
+    def _insert(self, batch: List[Dict]):
+        places = Place.__table__
+        columns = set().union(*batch)
+        params = [{column: values.get(column) for column in columns} for values in batch]
+        
+        with db.engine.begin() as connection:
+            ids = connection.execute(
+                insert(places).returning(places.c.id, sort_by_parameter_order=True),
+                params
+            ).scalars().all()
+            
+            get_search_index().index_rows(connection, [
+                (place_id, values['name'], values.get('address'), values.get('description'))
+                for place_id, values in zip(ids, batch) if values['is_active']
+            ])
+            
+            tag_rows, feature_rows, hour_rows = [], [], []
+            for place_id, values in zip(ids, batch):
+                tag_rows.extend({'place_id': place_id, 'tag': label} for label in parse_labels(values.get('tags')))
+                feature_rows.extend({'place_id': place_id, 'feature': label} for label in parse_labels(values.get('features')))
+                hour_rows.extend(
+                    {'place_id': place_id, 'day': day, 'start_minute': start, 'end_minute': end}
+                    for day, start, end in parse_opening_hours(values.get('opening_hours'))
+                )
+            if tag_rows:
+                connection.execute(insert(PlaceTag.__table__), tag_rows)
+            if feature_rows:
+                connection.execute(insert(PlaceFeature.__table__), feature_rows)
+            if hour_rows:
+                connection.execute(insert(PlaceHours.__table__), hour_rows)
+            
+            TableVersion.bump(connection, 'places')
+        
+        self.stats['inserted'] += len(ids)
+    
+    def _geocode_missing(self, batch: List[Dict]):
+        """Fill coordinates for rows that only have an address"""
+        cache = self.checkpoint['geocodes']
+        missing = {
+            values['address'] for values in batch
+            if 'latitude' not in values and values.get('address') and values['address'] not in cache
+        }
+        
+        if missing:
+            from app.services.maps_service import get_maps_service
+            app = current_app._get_current_object()
+            maps_service = get_maps_service()
+            
+            def geocode(address):
+                with app.app_context():
+                    result = maps_service.geocode(address)
+                if result and result.get('success'):
+                    return address, [result['latitude'], result['longitude']]
+                return address, None
+            
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                for address, location in executor.map(geocode, missing):
+                    cache[address] = location
+                    if location:
+                        self.stats['geocoded'] += 1
+        
+        for values in batch:
+            if 'latitude' in values or not values.get('address'):
+                continue
+            location = cache.get(values['address'])
+            if location:
+                values['latitude'], values['longitude'] = location
+    
+    def _error(self, position: int, message: str):
+        self.stats['skipped'] += 1
+        if len(self.stats['errors']) < 50:
+            self.stats['errors'].append({'row': position, 'error': message})
+    
+    def _load_checkpoint(self) -> Dict:
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            checkpoint.setdefault('geocodes', {})
+            checkpoint.setdefault('rows_done', 0)
+            return checkpoint
+        return {'rows_done': 0, 'geocodes': {}}
+    
+    def _save_checkpoint(self):
+        if not self.checkpoint_path:
+            return
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.checkpoint, f, ensure_ascii=False)
+        os.replace(tmp_path, self.checkpoint_path)
@@ -2,11 +2,59 @@ from flask import current_app
 from app.services.ai_service import get_ai_service
 from app.models.itinerary import Itinerary
 from app.models.place import Place
+from app.services.maps_service import get_maps_service
+from app.services.travel_estimator import parse_location
+from app.utils.opening_hours import parse_open_at, parse_opening_hours
+from app.utils.route_solver import RouteSolver, visit_start
+from app.utils.helpers import fold_diacritics
 from app import db
 from datetime import datetime, timedelta
+import copy
 import json
+import re
+import numpy as np
 from typing import List, Dict, Optional
 
+# Departure time of a day without a start time
+DAY_START_MINUTE = 8 * 60
+
+
+def parse_clock(value) -> Optional[int]:
+    """Minutes since midnight of "08:00" / "8h30", None when unparseable"""
+    match = re.match(r'^\s*(\d{1,2})\s*[:h.]\s*(\d{2})?\s*$', str(value or ''))
+    if not match or int(match.group(1)) > 23:
+        return None
+    return int(match.group(1)) * 60 + int(match.group(2) or 0)
+
+
+def format_clock(minutes: float) -> str:
+    """"HH:MM" of minutes since midnight (past midnight wraps)"""
+    minutes = int(round(minutes))
+    return f"{minutes // 60 % 24:02d}:{minutes % 60:02d}"
+
+
+def parse_duration_minutes(value, default: int = 60) -> int:
+    """Minutes of an activity duration ("2 giờ", "1h30", "45 phút", "1.5 hours")"""
+    text = fold_diacritics(str(value or ''))
+    hours = re.search(r'(\d+(?:[.,]\d+)?)\s*(?:gio|tieng|hours?|hrs?|h)\b', text)
+    minutes = re.search(r'(\d+)\s*(?:phut|minutes?|mins?|p|m)\b', text)
+    compact = re.search(r'(\d+)\s*h\s*(\d{1,2})\b', text)
+    if compact:
+        return int(compact.group(1)) * 60 + int(compact.group(2))
+    if not hours and not minutes:
+        return default
+    total = float(hours.group(1).replace(',', '.')) * 60 if hours else 0
+    total += int(minutes.group(1)) if minutes else 0
+    return max(1, int(round(total)))
+
+
+def day_windows(opening_hours, weekday: int) -> Optional[List[tuple]]:
+    """Opening ranges of one weekday; None when the hours are unknown, [] when closed"""
+    intervals = parse_opening_hours(opening_hours)
+    if not intervals:
+        return None
+    return [(start, end) for day, start, end in intervals if day == weekday]
+
 
 class ItineraryService:
     """Service for managing travel itineraries"""
@@ -25,8 +73,10 @@ class ItineraryService:
         Generate smart itinerary based on preferences and selected places
         
         Args:
-            preferences: User preferences (duration, budget, interests, location, start_date)
-            selected_places: List of place IDs user selected
+            preferences: User preferences (duration, budget, interests, location,
+                start_date, open_at)
+            selected_places: List of place IDs user selected; with open_at,
+                places closed at that time are left out
         
         Returns:
             Dict with success status and itinerary data
@@ -34,9 +84,21 @@ class ItineraryService:
         try:
             # Get selected places from database
             places_data = []
+            closed_places = []
             if selected_places:
-                places = Place.query.filter(Place.id.in_(selected_places)).all()
+                query = Place.query.filter(Place.id.in_(selected_places))
+                if preferences.get('open_at'):
+                    open_slot = parse_open_at(
+                        preferences['open_at'],
+                        current_app.config.get('TIMEZONE', 'Asia/Ho_Chi_Minh')
+                    )
+                    query = query.filter(Place.open_at_clause(*open_slot))
+                
+                places = query.all()
                 places_data = [self._place_to_dict(place) for place in places]
+                
+                found = {place.id for place in places}
+                closed_places = [place_id for place_id in selected_places if place_id not in found]
             
             # Build enhanced preferences with places
             enhanced_preferences = preferences.copy()
@@ -57,6 +119,9 @@ class ItineraryService:
             itinerary = result['itinerary']
             itinerary = self._enhance_itinerary(itinerary, preferences, places_data)
             
+            if preferences.get('open_at'):
+                itinerary['closed_places'] = closed_places
+            
             return {
                 'success': True,
                 'itinerary': itinerary
@@ -339,19 +404,328 @@ class ItineraryService:
             except:
                 return None
     
-    def optimize_route(self, itinerary_data: Dict) -> Dict:
+    def optimize_route(self, place_ids: List[int], start_location=None, mode: str = 'driving',
+                       start_at: Optional[str] = None, visit_minutes: Optional[int] = None,
+                       exact: bool = False) -> Dict:
+        """
+        Best visiting order for a set of places, solved in-process
+        
+        The cost matrix comes from cached Google legs and the local travel
+        estimator (no API call); with start_at, visits are also fitted into
+        the places' opening hours for that day. Only with exact=True is the
+        final order sent to Google for real travel times.
+        
+        Args:
+            place_ids: Places to visit
+            start_location: Optional "lat,lng", {'lat', 'lng'} or address to start from
+            mode: Travel mode
+            start_at: Departure time ("sat 08:00", ISO datetime, "now"); enables opening hours
+            visit_minutes: Time spent at each place (default DEFAULT_VISIT_MINUTES)
+            exact: Also resolve the optimized route through Google
+        
+        Returns:
+            Dict with success status, order and per-stop schedule
+        """
+        try:
+            unique_ids = list(dict.fromkeys(place_ids))
+            limit = current_app.config.get('ROUTE_OPTIMIZER_MAX_STOPS', 100)
+            if len(unique_ids) > limit:
+                return {
+                    'success': False,
+                    'error': f'Tối đa {limit} địa điểm mỗi lộ trình'
+                }
+            
+            rows = {row.id: row for row in self._route_places(unique_ids)}
+            stops = [self._route_stop(rows[place_id], visit_minutes) for place_id in unique_ids if place_id in rows]
+            skipped = [place_id for place_id in unique_ids if place_id not in rows]
+            
+            if not stops:
+                return {
+                    'success': False,
+                    'error': 'Không có địa điểm nào có tọa độ'
+                }
+            
+            start = None
+            if start_location:
+                start = self._resolve_start(start_location)
+                if start is None:
+                    return {
+                        'success': False,
+                        'error': 'Không xác định được điểm xuất phát'
+                    }
+            
+            weekday, start_minute = None, DAY_START_MINUTE
+            if start_at:
+                try:
+                    weekday, start_minute = parse_open_at(
+                        start_at, current_app.config.get('TIMEZONE', 'Asia/Ho_Chi_Minh')
+                    )
+                except ValueError:
+                    return {
+                        'success': False,
+                        'error': 'Thời gian bắt đầu không hợp lệ'
+                    }
+            
+            points = ([start] if start else []) + [(stop['lat'], stop['lng']) for stop in stops]
+            maps_service = get_maps_service()
+            matrix = maps_service.travel_matrix(points, mode)
+            
+            route = self._plan_route(
+                stops, matrix, start_minute, weekday, has_start=start is not None,
+                time_budget=current_app.config.get('ROUTE_OPTIMIZER_TIME_BUDGET', 0.3)
+            )
+            route.pop('order_index')
+            route.update({'success': True, 'mode': mode, 'skipped': skipped})
+            
+            if exact and len(points) > 1:
+                ordered = ([start] if start else []) + [
+                    (stop['lat'], stop['lng']) for stop in route['stops']
+                ]
+                route['travel'] = maps_service.calculate_travel_time(
+                    [{'lat': lat, 'lng': lng} for lat, lng in ordered], mode
+                )
+            
+            return route
+        
+        except Exception as e:
+            current_app.logger.error(f"Error optimizing route: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def optimize_itinerary(self, itinerary_data: Dict, mode: str = 'driving') -> Dict:
         """
-        Optimize travel route in itinerary
+        Reorder each day's located activities to cut travel time
+        
+        Activities without coordinates keep their position, and every slot
+        keeps its time, so the shape of each day (meals, breaks) is kept.
+        One offline matrix covers all days.
         
         Args:
-            itinerary_data: Itinerary with activities
+            itinerary_data: Itinerary with days / activities (coordinates from _enhance_itinerary)
+            mode: Travel mode
         
         Returns:
-            Optimized itinerary
+            Dict with success status and the reordered itinerary
         """
-        # TODO: Implement route optimization using Google Maps API
-        # For now, return as is
-        return itinerary_data
+        try:
+            # The matrix over all days is n x n: cap the stops before any work
+            day_activities = [len(day.get('activities') or []) for day in itinerary_data.get('days') or []]
+            day_limit = current_app.config.get('ROUTE_OPTIMIZER_MAX_STOPS_PER_DAY', 30)
+            limit = current_app.config.get('ROUTE_OPTIMIZER_MAX_STOPS', 100)
+            if any(count > day_limit for count in day_activities):
+                return {
+                    'success': False,
+                    'error': f'Tối đa {day_limit} hoạt động mỗi ngày'
+                }
+            if sum(day_activities) > limit:
+                return {
+                    'success': False,
+                    'error': f'Tối đa {limit} hoạt động mỗi lịch trình'
+                }
+            
+            itinerary = copy.deepcopy(itinerary_data)
+            days = itinerary.get('days') or []
+            preferences = itinerary.get('preferences') or {}
+            start_date = self._parse_date(preferences.get('start_date') or itinerary.get('start_date'))
+            
+            located = []
+            for day in days:
+                activities = day.get('activities') or []
+                located.append([
+                    (slot, activity) for slot, activity in enumerate(activities)
+                    if (activity.get('coordinates') or {}).get('lat') is not None
+                    and (activity.get('coordinates') or {}).get('lng') is not None
+                ])
+            
+            place_ids = {activity.get('place_id') for day in located for _, activity in day if activity.get('place_id')}
+            hours = {row.id: row.opening_hours for row in self._route_places(place_ids)}
+            
+            points = [
+                (float(activity['coordinates']['lat']), float(activity['coordinates']['lng']))
+                for day in located for _, activity in day
+            ]
+            if not points:
+                return {
+                    'success': True,
+                    'itinerary': itinerary
+                }
+            
+            distances, durations, cached = get_maps_service().travel_matrix(points, mode)
+            time_budget = current_app.config.get('ROUTE_OPTIMIZER_TIME_BUDGET', 0.3) / max(1, len(days))
+            
+            offset = 0
+            for number, (day, day_located) in enumerate(zip(days, located)):
+                indices = np.arange(offset, offset + len(day_located))
+                offset += len(day_located)
+                if len(day_located) < 2:
+                    continue
+                
+                stops = [
+                    {
+                        'place_id': activity.get('place_id'),
+                        'name': activity.get('activity') or activity.get('location'),
+                        'lat': points[index][0],
+                        'lng': points[index][1],
+                        'opening_hours': hours.get(activity.get('place_id')),
+                        'visit_minutes': parse_duration_minutes(activity.get('duration'))
+                    }
+                    for index, (_, activity) in zip(indices, day_located)
+                ]
+                
+                weekday = None
+                if start_date:
+                    weekday = (start_date + timedelta(days=int(day.get('day', number + 1)) - 1)).weekday()
+                start_minute = parse_clock(day_located[0][1].get('time'))
+                
+                block = np.ix_(indices, indices)
+                route = self._plan_route(
+                    stops, (distances[block], durations[block], cached[block]),
+                    DAY_START_MINUTE if start_minute is None else start_minute,
+                    weekday, has_start=False, time_budget=time_budget,
+                    initial=list(range(len(stops)))
+                )
+                
+                # Activities move between the located slots; slot times stay
+                activities = day['activities']
+                slots = [slot for slot, _ in day_located]
+                times = [activities[slot].get('time') for slot in slots]
+                moved = [day_located[node][1] for node in route['order_index']]
+                for slot, time_value, activity in zip(slots, times, moved):
+                    if time_value is not None:
+                        activity['time'] = time_value
+                    activities[slot] = activity
+                
+                day['route'] = {
+                    key: route[key] for key in (
+                        'total_distance', 'total_duration', 'original_duration', 'late_minutes', 'estimated_legs'
+                    )
+                }
+            
+            return {
+                'success': True,
+                'itinerary': itinerary
+            }
+        
+        except Exception as e:
+            current_app.logger.error(f"Error optimizing itinerary: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def _route_places(self, place_ids) -> List:
+        """id, name, coordinates and opening hours of places that have coordinates"""
+        if not place_ids:
+            return []
+        return db.session.query(
+            Place.id, Place.name, Place.latitude, Place.longitude, Place.opening_hours
+        ).filter(
+            Place.id.in_(list(place_ids)),
+            Place.latitude != None,
+            Place.longitude != None
+        ).all()
+    
+    def _route_stop(self, row, visit_minutes: Optional[int] = None) -> Dict:
+        return {
+            'place_id': row.id,
+            'name': row.name,
+            'lat': row.latitude,
+            'lng': row.longitude,
+            'opening_hours': row.opening_hours,
+            'visit_minutes': visit_minutes if visit_minutes is not None else current_app.config.get(
+                'DEFAULT_VISIT_MINUTES', 60
+            )
+        }
+    
+    def _resolve_start(self, location) -> Optional[tuple]:
+        """(lat, lng) of a start location, geocoding addresses"""
+        point = parse_location(location)
+        if point is not None:
+            return point
+        
+        result = get_maps_service().geocode(str(location))
+        if result.get('success'):
+            return result['latitude'], result['longitude']
+        return None
+    
+    def _plan_route(self, stops: List[Dict], matrix, start_minute: int, weekday: Optional[int],
+                    has_start: bool, time_budget: float, initial: Optional[List[int]] = None) -> Dict:
+        """
+        Solve one route and describe it
+        
+        Args:
+            stops: Stop dicts (place_id, name, lat, lng, opening_hours, visit_minutes)
+            matrix: (distances, durations, cached) over [start] + stops
+            start_minute: Departure minute
+            weekday: Day for opening hours, None to ignore them
+            has_start: Matrix node 0 is the starting point
+            time_budget: Solver seconds
+            initial: Current order of the stops, reported as original_duration
+        """
+        distances, durations, cached = matrix
+        first = 1 if has_start else 0
+        
+        windows = None
+        if weekday is not None:
+            windows = [None] * first + [day_windows(stop['opening_hours'], weekday) for stop in stops]
+        service = [0] * first + [stop['visit_minutes'] for stop in stops]
+        
+        solver = RouteSolver(durations, service, windows, start_minute, has_start)
+        initial_path = [node + first for node in initial] if initial is not None else None
+        result = solver.solve(time_budget, initial_path)
+        
+        path = [0] * first + result['order']
+        times = solver.schedule(path)
+        
+        route_stops = []
+        total_distance = total_duration = estimated = 0
+        for position in range(first, len(path)):
+            node = path[position]
+            stop = stops[node - first]
+            arrival, begin, departure = times[position]
+            entry = {
+                'place_id': stop['place_id'],
+                'name': stop['name'],
+                'lat': stop['lat'],
+                'lng': stop['lng'],
+                'arrival': format_clock(arrival),
+                'start': format_clock(begin),
+                'departure': format_clock(departure),
+                'travel_from_previous': None
+            }
+            if windows is not None:
+                entry['late_minutes'] = round(visit_start(arrival, windows[node], service[node])[1])
+            if position > 0:
+                previous = path[position - 1]
+                leg_distance = int(round(distances[previous, node]))
+                leg_duration = int(round(durations[previous, node]))
+                entry['travel_from_previous'] = {
+                    'distance': leg_distance,
+                    'duration': leg_duration,
+                    'estimated': not bool(cached[previous, node])
+                }
+                total_distance += leg_distance
+                total_duration += leg_duration
+                estimated += not cached[previous, node]
+            route_stops.append(entry)
+        
+        original = None
+        if initial_path is not None:
+            original = int(round(solver.evaluate([0] * first + initial_path)[1] * 60))
+        
+        return {
+            'order': [stop['place_id'] for stop in route_stops],
+            'order_index': [node - first for node in result['order']],
+            'stops': route_stops,
+            'total_distance': total_distance,
+            'total_duration': total_duration,
+            'original_duration': original,
+            'late_minutes': round(result['late']),
+            'estimated_legs': int(estimated),
+            'converged': result['converged']
+        }
     
     def estimate_detailed_cost(self, itinerary_data: Dict) -> Dict:
         """
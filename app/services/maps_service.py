@@ -1,36 +1,471 @@
 from flask import current_app
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from app.models.geocode_cache import GeocodeCache
+from app.models.travel_leg import TravelLeg
+from app.utils.helpers import LRUCache, normalize_address, chunk_list
+from app.services.travel_estimator import get_travel_estimator, parse_location
+from app.utils.opening_hours import local_now
 import requests
 from typing import Dict, List, Optional, Tuple
 import json
+import math
+import numpy as np
+import os
+import random
+import re
+import threading
+import time
+
+# Google statuses that mean "try again later" rather than a bad request
+RETRYABLE_STATUSES = ('OVER_QUERY_LIMIT', 'UNKNOWN_ERROR')
+RETRYABLE_HTTP_CODES = (429, 500, 502, 503, 504)
+
+# Route / element statuses that are answers (cached for the negative TTL), not failures
+NEGATIVE_ROUTE_STATUSES = ('ZERO_RESULTS', 'NOT_FOUND', 'MAX_ROUTE_LENGTH_EXCEEDED', 'MAX_DURATION_EXCEEDED')
+# Modes whose travel time depends on the departure hour
+TIME_DEPENDENT_MODES = ('driving', 'transit')
+
+# Google's per-request distance matrix limits: elements, and origins or
+# destinations
+MAX_MATRIX_ELEMENTS = 100
+MAX_MATRIX_SIDE = 25
+
+# Set in threads of the shared request pool, whose tasks must not wait on it
+_pool_thread = threading.local()
+
+_LATLNG_RE = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$')
+
+
+class EndpointStats:
+    """Thread-safe call count, error count and latency samples per endpoint"""
+    
+    def __init__(self, window: int = 500):
+        self._window = window
+        self._endpoints = {}
+        self._lock = threading.Lock()
+    
+    def record(self, endpoint: str, seconds: float, attempts: int, ok: bool):
+        with self._lock:
+            entry = self._endpoints.get(endpoint)
+            if entry is None:
+                entry = self._endpoints[endpoint] = {
+                    'calls': 0, 'errors': 0, 'retries': 0, 'total': 0.0, 'max': 0.0,
+                    'samples': deque(maxlen=self._window)
+                }
+            entry['calls'] += 1
+            entry['errors'] += 0 if ok else 1
+            entry['retries'] += attempts - 1
+            entry['total'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+            entry['samples'].append(seconds)
+    
+    def snapshot(self) -> Dict:
+        """Per-endpoint summary in milliseconds (percentiles over the recent window)"""
+        with self._lock:
+            items = [(name, dict(entry, samples=sorted(entry['samples']))) for name, entry in self._endpoints.items()]
+        
+        report = {}
+        for name, entry in items:
+            samples = entry['samples']
+            
+            def percentile(q):
+                return round(samples[min(int(q * len(samples)), len(samples) - 1)] * 1000, 1)
+            
+            report[name] = {
+                'calls': entry['calls'],
+                'errors': entry['errors'],
+                'retries': entry['retries'],
+                'avg_ms': round(entry['total'] / entry['calls'] * 1000, 1),
+                'p50_ms': percentile(0.5),
+                'p95_ms': percentile(0.95),
+                'max_ms': round(entry['max'] * 1000, 1)
+            }
+        return report
 
 
 class GoogleMapsService:
-    """Service for Google Maps API operations"""
+    """
+    Service for Google Maps API operations
+    
+    All calls go through one pooled requests.Session (keep-alive, so repeat
+    calls skip the TCP/TLS handshake) with connect/read timeouts and bounded
+    retries with jittered exponential backoff; latency is tracked per
+    endpoint.
+    """
     
     def __init__(self):
         self.api_key = None
         self.base_url = "https://maps.googleapis.com/maps/api"
+        self.session = None
+        self.timeout = (3.05, 10)
+        self.max_retries = 2
+        self.backoff_base = 0.25
+        self.backoff_max = 4.0
+        self.stats = EndpointStats()
+        self.cache_ttl = 30 * 86400
+        self.negative_ttl = 86400
+        self.reverse_precision = 4
+        self.leg_precision = 3
+        self.leg_bucket_hours = 3
+        self.leg_ttl = 7 * 86400
+        self.timezone = 'Asia/Ho_Chi_Minh'
+        self.concurrency = 20
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
         self._configure()
     
     def _configure(self):
         """Configure Google Maps API"""
         try:
-            self.api_key = current_app.config.get('GOOGLE_MAPS_API_KEY')
+            config = current_app.config
+            self.api_key = config.get('GOOGLE_MAPS_API_KEY')
             if not self.api_key:
                 current_app.logger.warning("GOOGLE_MAPS_API_KEY not configured")
+            
+            self.timeout = (config.get('MAPS_CONNECT_TIMEOUT', 3.05), config.get('MAPS_READ_TIMEOUT', 10))
+            self.max_retries = config.get('MAPS_MAX_RETRIES', 2)
+            self.backoff_base = config.get('MAPS_BACKOFF_BASE', 0.25)
+            self.backoff_max = config.get('MAPS_BACKOFF_MAX', 4.0)
+            pool_size = config.get('MAPS_POOL_SIZE', 20)
+            
+            self.cache_ttl = config.get('GEOCODE_CACHE_TTL', self.cache_ttl)
+            self.negative_ttl = config.get('GEOCODE_NEGATIVE_TTL', self.negative_ttl)
+            self.reverse_precision = config.get('GEOCODE_REVERSE_PRECISION', self.reverse_precision)
+            cache_size = config.get('GEOCODE_CACHE_SIZE', 10000)
+            
+            self.leg_precision = config.get('LEG_CELL_PRECISION', self.leg_precision)
+            self.leg_bucket_hours = max(1, config.get('LEG_BUCKET_HOURS', self.leg_bucket_hours))
+            self.leg_ttl = config.get('LEG_CACHE_TTL', self.leg_ttl)
+            self.timezone = config.get('TIMEZONE', self.timezone)
+            # More requests in flight than pooled connections would just queue
+            self.concurrency = max(1, min(config.get('MAPS_CONCURRENCY', self.concurrency), pool_size))
+            leg_cache_size = config.get('LEG_CACHE_SIZE', 50000)
         except Exception as e:
             current_app.logger.error(f"Error configuring Google Maps: {str(e)}")
+            pool_size, cache_size, leg_cache_size = 20, 10000, 50000
+        
+        self._geocode_cache = LRUCache(max_size=cache_size)
+        self._leg_cache = LRUCache(max_size=leg_cache_size)
+        
+        # Retries are handled in _get (they also cover Google's in-body statuses)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+    
+    def _get(self, endpoint: str, url: str, params: Dict) -> Dict:
+        """
+        GET a Maps API URL and return the decoded JSON body
+        
+        Connection errors, timeouts, 429/5xx answers and OVER_QUERY_LIMIT /
+        UNKNOWN_ERROR statuses are retried up to max_retries times, sleeping
+        a random 0..min(backoff_max, backoff_base * 2^attempt) seconds in
+        between (full jitter, so concurrent workers do not retry in step).
+        
+        Raises:
+            requests.RequestException: Last transport error once retries run out
+        """
+        started = time.monotonic()
+        attempt = 0
+        ok = False
+        
+        try:
+            while True:
+                attempt += 1
+                retry = attempt <= self.max_retries
+                try:
+                    response = self.session.get(url, params=params, timeout=self.timeout)
+                    if response.status_code >= 400:
+                        raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+                    
+                    data = response.json()
+                    if data.get('status') in RETRYABLE_STATUSES and retry:
+                        self._backoff(attempt)
+                        continue
+                    
+                    ok = data.get('status') in ('OK', 'ZERO_RESULTS', None)
+                    return data
+                
+                except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                    is_client_error = (
+                        isinstance(e, requests.HTTPError) and e.response is not None
+                        and e.response.status_code not in RETRYABLE_HTTP_CODES
+                    )
+                    # Transport errors quote the URL, which carries the API key
+                    message = self._redact(str(e))
+                    if not retry or is_client_error:
+                        raise type(e)(message) from e
+                    current_app.logger.warning(f"Maps {endpoint} attempt {attempt} failed: {message}")
+                    self._backoff(attempt)
+        finally:
+            self.stats.record(endpoint, time.monotonic() - started, attempt, ok)
+    
+    def _redact(self, text: str) -> str:
+        return text.replace(self.api_key, '***') if self.api_key else text
+    
+    def _backoff(self, attempt: int):
+        time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))))
+    
+    def _cached(self, key: Optional[str], fetch) -> Dict:
+        """
+        Serve a geocode result from the in-process LRU, then the
+        geocode_cache table, and only then from fetch()
+        
+        Successes are kept for GEOCODE_CACHE_TTL and ZERO_RESULTS for
+        GEOCODE_NEGATIVE_TTL; transient failures are not cached.
+        """
+        if not key:
+            return fetch()
+        
+        result = self._geocode_cache.get(key)
+        if result is not None:
+            return dict(result)
+        
+        try:
+            result, remaining = GeocodeCache.lookup(key)
+        except Exception as e:
+            current_app.logger.warning(f"Geocode cache read failed: {str(e)}")
+            result = None
+        if result is not None:
+            self._geocode_cache.set(key, result, ttl=remaining)
+            return dict(result)
+        
+        result = fetch()
+        if result.get('success'):
+            ttl, negative = self.cache_ttl, False
+        elif result.get('status') == 'ZERO_RESULTS':
+            ttl, negative = self.negative_ttl, True
+        else:
+            return result
+        
+        self._geocode_cache.set(key, result, ttl=ttl)
+        try:
+            GeocodeCache.store(key, result, ttl, negative)
+        except Exception as e:
+            # Another worker stored it first, or the database is busy: the LRU still has it
+            current_app.logger.warning(f"Geocode cache write failed: {str(e)}")
+        return dict(result)
+    
+    def address_key(self, address: str) -> Optional[str]:
+        normalized = normalize_address(address)
+        return f"addr:{normalized}" if normalized else None
+    
+    def coordinates_key(self, lat: float, lng: float) -> str:
+        digits = self.reverse_precision
+        return f"latlng:{float(lat):.{digits}f},{float(lng):.{digits}f}"
+    
+    def location_key(self, location: str) -> str:
+        """Leg cache cell of a "lat,lng" string (rounded to LEG_CELL_PRECISION) or an address"""
+        match = _LATLNG_RE.match(str(location))
+        if match:
+            digits = self.leg_precision
+            return f"{float(match.group(1)):.{digits}f},{float(match.group(2)):.{digits}f}"
+        return 'addr:' + normalize_address(location)
+    
+    def hour_bucket(self, mode: str) -> int:
+        """Local departure-hour bucket for traffic-dependent modes, -1 otherwise"""
+        if mode not in TIME_DEPENDENT_MODES:
+            return -1
+        return local_now(self.timezone).hour // self.leg_bucket_hours
+    
+    def _leg_ttl(self, status: str) -> int:
+        return self.leg_ttl if status == 'OK' else self.negative_ttl
+    
+    def _cached_legs(self, keys: List[Tuple]) -> Dict:
+        """
+        Leg values for the given keys from the LRU, then one table query for
+        the rest; keys that are in neither are absent from the result
+        """
+        found = {}
+        missing = []
+        for key in keys:
+            values = self._leg_cache.get(key)
+            if values is not None:
+                found[key] = values
+            else:
+                missing.append(key)
+        
+        if missing:
+            _, _, mode, bucket, waypoints = missing[0]
+            try:
+                rows = TravelLeg.lookup(
+                    [key[0] for key in missing], [key[1] for key in missing], mode, bucket, waypoints
+                )
+            except Exception as e:
+                current_app.logger.warning(f"Leg cache read failed: {str(e)}")
+                rows = {}
+            
+            for key in missing:
+                if key in rows:
+                    values, remaining = rows[key]
+                    self._leg_cache.set(key, values, ttl=remaining)
+                    found[key] = values
+        
+        return found
+    
+    def _store_legs(self, entries: List[Tuple]):
+        """Remember (key, values) pairs in the LRU and the travel_legs table"""
+        for key, values in entries:
+            self._leg_cache.set(key, values, ttl=self._leg_ttl(values['status']))
+        try:
+            TravelLeg.store([(key, values, self._leg_ttl(values['status'])) for key, values in entries])
+        except Exception as e:
+            current_app.logger.warning(f"Leg cache write failed: {str(e)}")
+    
+    def _cached_route(self, key: Tuple, fetch) -> Dict:
+        """Directions-style result for a leg key, served from the leg cache when it holds the full route"""
+        values = self._cached_legs([key]).get(key)
+        if values is not None and values.get('route') is not None:
+            return dict(values['route'])
+        
+        result = fetch()
+        status = 'OK' if result.get('success') else result.get('status')
+        if status != 'OK' and status not in NEGATIVE_ROUTE_STATUSES:
+            return result
+        
+        values = {'status': status, 'route': result}
+        if status == 'OK' and not key[4] and 'distance' in result:
+            values.update({
+                'distance_m': result['distance']['value'],
+                'distance_text': result['distance']['text'],
+                'duration_s': result['duration']['value'],
+                'duration_text': result['duration']['text']
+            })
+        self._store_legs([(key, values)])
+        return result
+    
+    @staticmethod
+    def _leg_values(element: Dict) -> Dict:
+        """Leg cache values of a distance matrix element"""
+        if element.get('status') != 'OK':
+            return {'status': element.get('status', 'UNKNOWN_ERROR')}
+        return {
+            'status': 'OK',
+            'distance_m': element['distance']['value'],
+            'distance_text': element['distance']['text'],
+            'duration_s': element['duration']['value'],
+            'duration_text': element['duration']['text']
+        }
+    
+    @staticmethod
+    def _leg_element(values: Dict) -> Dict:
+        """Distance matrix element rebuilt from leg cache values"""
+        if values.get('estimated'):
+            return values
+        if values['status'] != 'OK' or values.get('distance_m') is None:
+            return {'status': values['status']}
+        return {
+            'status': 'OK',
+            'distance': {'text': values['distance_text'], 'value': values['distance_m']},
+            'duration': {'text': values['duration_text'], 'value': values['duration_s']}
+        }
+    
+    @staticmethod
+    def _matrix_tiles(rows: List[int], columns: List[int]) -> List[Tuple[List[int], List[int]]]:
+        """
+        Split rows x columns into the fewest blocks Google accepts in one
+        request (at most MAX_MATRIX_SIDE per side, MAX_MATRIX_ELEMENTS cells)
+        """
+        if not rows or not columns:
+            return []
+        
+        best = None
+        for height in range(1, min(len(rows), MAX_MATRIX_SIDE) + 1):
+            width = min(len(columns), MAX_MATRIX_SIDE, MAX_MATRIX_ELEMENTS // height)
+            count = math.ceil(len(rows) / height) * math.ceil(len(columns) / width)
+            if best is None or count < best[0]:
+                best = (count, height, width)
+        
+        _, height, width = best
+        return [
+            (row_chunk, column_chunk)
+            for row_chunk in chunk_list(rows, height)
+            for column_chunk in chunk_list(columns, width)
+        ]
+    
+    def _cell_tiles(self, cells: List[Tuple[int, int]]) -> List[Tuple[List[int], List[int]]]:
+        """
+        Tiles covering exactly the given (row, column) cells, in order
+        
+        Rows missing the same columns share one block, so a new origin or
+        destination only costs its own row / column and no cell outside
+        cells is requested (or billed).
+        """
+        gaps = {}
+        for i, j in cells:
+            gaps.setdefault(i, []).append(j)
+        blocks = {}
+        for i, columns in gaps.items():
+            blocks.setdefault(tuple(columns), []).append(i)
+        return [
+            tile for columns, rows in blocks.items()
+            for tile in self._matrix_tiles(rows, list(columns))
+        ]
+    
+    def _executor(self) -> ThreadPoolExecutor:
+        """Request pool shared by every caller in this process (recreated after fork)"""
+        with self._pool_lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='maps')
+                self._pool_pid = os.getpid()
+            return self._pool
+    
+    def _map_concurrently(self, fn, items: List) -> List:
+        """
+        fn over items in order on the shared pool, each inside the app context
+        
+        At most MAPS_CONCURRENCY requests are in flight per process, however
+        many requests call this at once. Called from a pool thread it runs
+        inline, so a task never waits on the pool it occupies.
+        """
+        if len(items) <= 1 or getattr(_pool_thread, 'active', False):
+            return [fn(item) for item in items]
+        
+        app = current_app._get_current_object()
+        
+        def run(item):
+            _pool_thread.active = True
+            with app.app_context():
+                return fn(item)
+        
+        return list(self._executor().map(run, items))
+    
+    @staticmethod
+    def _estimate_block(origins: List[str], destinations: List[str], mode: str) -> Optional[List[List[Dict]]]:
+        """Estimated elements for origins x destinations, None unless all are coordinates"""
+        origin_points = [parse_location(origin) for origin in origins]
+        destination_points = [parse_location(destination) for destination in destinations]
+        if None in origin_points or None in destination_points:
+            return None
+        
+        estimator = get_travel_estimator()
+        return [
+            estimator.elements([point] * len(destination_points), destination_points, mode)
+            for point in origin_points
+        ]
+    
+    def get_stats(self) -> Dict:
+        """Per-endpoint call counts and latency of this worker process"""
+        return self.stats.snapshot()
     
     def geocode(self, address: str) -> Dict:
         """
         Convert address to coordinates (latitude, longitude)
         
+        Cached by normalized address (case, spacing and diacritics ignored).
+        
         Args:
             address: Address string
         
         Returns:
             Dict with lat, lng and formatted address
         """
+        return self._cached(self.address_key(address), lambda: self._geocode(address))
+    
+    def _geocode(self, address: str) -> Dict:
         try:
             if not self.api_key:
                 return {
@@ -44,8 +479,7 @@ class GoogleMapsService:
                 'key': self.api_key
             }
             
-            response = requests.get(url, params=params)
-            data = response.json()
+            data = self._get('geocode', url, params)
             
             if data['status'] == 'OK' and len(data['results']) > 0:
                 result = data['results'][0]
@@ -61,6 +495,7 @@ class GoogleMapsService:
             else:
                 return {
                     'success': False,
+                    'status': data['status'],
                     'error': f"Geocoding failed: {data['status']}"
                 }
                 
@@ -75,6 +510,8 @@ class GoogleMapsService:
         """
         Convert coordinates to address
         
+        Cached by coordinates rounded to GEOCODE_REVERSE_PRECISION decimals.
+        
         Args:
             lat: Latitude
             lng: Longitude
@@ -82,6 +519,9 @@ class GoogleMapsService:
         Returns:
             Dict with address information
         """
+        return self._cached(self.coordinates_key(lat, lng), lambda: self._reverse_geocode(lat, lng))
+    
+    def _reverse_geocode(self, lat: float, lng: float) -> Dict:
         try:
             if not self.api_key:
                 return {
@@ -95,8 +535,7 @@ class GoogleMapsService:
                 'key': self.api_key
             }
             
-            response = requests.get(url, params=params)
-            data = response.json()
+            data = self._get('reverse_geocode', url, params)
             
             if data['status'] == 'OK' and len(data['results']) > 0:
                 result = data['results'][0]
@@ -110,6 +549,7 @@ class GoogleMapsService:
             else:
                 return {
                     'success': False,
+                    'status': data['status'],
                     'error': f"Reverse geocoding failed: {data['status']}"
                 }
                 
@@ -132,9 +572,22 @@ class GoogleMapsService:
             waypoints: Optional list of waypoints
             mode: Travel mode (driving, walking, bicycling, transit)
         
+        Answers are cached per (origin cell, destination cell, mode,
+        departure-hour bucket, waypoints).
+        
         Returns:
             Dict with route information
         """
+        keys = [self.location_key(point) for point in waypoints or []]
+        key = (
+            self.location_key(origin), self.location_key(destination),
+            mode, self.hour_bucket(mode), '|'.join(keys)
+        )
+        return self._cached_route(key, lambda: self._get_directions(origin, destination, waypoints, mode))
+    
+    def _get_directions(self, origin: str, destination: str,
+                        waypoints: Optional[List[str]] = None,
+                        mode: str = 'driving') -> Dict:
         try:
             if not self.api_key:
                 return {
@@ -153,8 +606,7 @@ class GoogleMapsService:
             if waypoints:
                 params['waypoints'] = '|'.join(waypoints)
             
-            response = requests.get(url, params=params)
-            data = response.json()
+            data = self._get('directions', url, params)
             
             if data['status'] == 'OK' and len(data['routes']) > 0:
                 route = data['routes'][0]
@@ -178,6 +630,7 @@ class GoogleMapsService:
             else:
                 return {
                     'success': False,
+                    'status': data['status'],
                     'error': f"Directions failed: {data['status']}"
                 }
                 
@@ -198,9 +651,104 @@ class GoogleMapsService:
             destinations: List of destination addresses
             mode: Travel mode
         
+        Cells already in the leg cache are answered locally; only the
+        missing cells are requested from Google, split into tiles within
+        its per-request limits and fetched up to MAPS_CONCURRENCY at a time.
+        
         Returns:
             Dict with distance matrix
         """
+        try:
+            bucket = self.hour_bucket(mode)
+            origin_keys = [self.location_key(origin) for origin in origins]
+            destination_keys = [self.location_key(destination) for destination in destinations]
+            
+            legs = self._cached_legs(list({
+                (origin_key, destination_key, mode, bucket, '')
+                for origin_key in origin_keys for destination_key in destination_keys
+            }))
+            missing = [
+                (i, j)
+                for i, origin_key in enumerate(origin_keys)
+                for j, destination_key in enumerate(destination_keys)
+                if (origin_key, destination_key, mode, bucket, '') not in legs
+            ]
+            
+            tiles = self._cell_tiles(missing)
+            if len(tiles) > self.concurrency:
+                # Scattered gaps needing more than one wave of requests:
+                # their bounding block, if it takes fewer
+                bounding = self._matrix_tiles(sorted({i for i, _ in missing}), sorted({j for _, j in missing}))
+                if len(bounding) < len(tiles):
+                    tiles = bounding
+            
+            # Tiles go out concurrently and are merged back in order
+            results = self._map_concurrently(
+                lambda tile: self._get_distance_matrix(
+                    [origins[i] for i in tile[0]], [destinations[j] for j in tile[1]], mode
+                ),
+                tiles
+            )
+            
+            origin_addresses, destination_addresses = list(origins), list(destinations)
+            approximate = False
+            entries = []
+            failure = None
+            for (rows_needed, columns_needed), result in zip(tiles, results):
+                if not result['success']:
+                    estimates = self._estimate_block(
+                        [origins[i] for i in rows_needed], [destinations[j] for j in columns_needed], mode
+                    )
+                    if estimates is None:
+                        failure = failure or result
+                        continue
+                    # No key / quota exhausted: local estimates, not cached
+                    approximate = True
+                    for a, i in enumerate(rows_needed):
+                        for b, j in enumerate(columns_needed):
+                            legs[(origin_keys[i], destination_keys[j], mode, bucket, '')] = estimates[a][b]
+                    continue
+                
+                for a, i in enumerate(rows_needed):
+                    origin_addresses[i] = result['origins'][a]
+                    for b, j in enumerate(columns_needed):
+                        key = (origin_keys[i], destination_keys[j], mode, bucket, '')
+                        legs[key] = self._leg_values(result['rows'][a]['elements'][b])
+                        entries.append((key, legs[key]))
+                for b, j in enumerate(columns_needed):
+                    destination_addresses[j] = result['destinations'][b]
+            
+            # Tiles that did succeed are kept for the retry
+            if entries:
+                self._store_legs(entries)
+            if failure:
+                return failure
+            
+            return {
+                'success': True,
+                'origins': origin_addresses,
+                'destinations': destination_addresses,
+                'rows': [
+                    {'elements': [
+                        self._leg_element(legs[(origin_key, destination_key, mode, bucket, '')])
+                        for destination_key in destination_keys
+                    ]}
+                    for origin_key in origin_keys
+                ],
+                'cached_elements': len(origin_keys) * len(destination_keys) - len(missing),
+                'requests': len(tiles),
+                'approximate': approximate
+            }
+        
+        except Exception as e:
+            current_app.logger.error(f"Distance matrix error: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def _get_distance_matrix(self, origins: List[str], destinations: List[str],
+                             mode: str = 'driving') -> Dict:
         try:
             if not self.api_key:
                 return {
@@ -216,8 +764,7 @@ class GoogleMapsService:
                 'key': self.api_key
             }
             
-            response = requests.get(url, params=params)
-            data = response.json()
+            data = self._get('distance_matrix', url, params)
             
             if data['status'] == 'OK':
                 return {
@@ -275,8 +822,7 @@ class GoogleMapsService:
             if keyword:
                 params['keyword'] = keyword
             
-            response = requests.get(url, params=params)
-            data = response.json()
+            data = self._get('nearby_search', url, params)
             
             if data['status'] == 'OK':
                 return {
@@ -320,8 +866,7 @@ class GoogleMapsService:
                 'fields': 'name,formatted_address,geometry,rating,photos,opening_hours,website,formatted_phone_number,reviews'
             }
             
-            response = requests.get(url, params=params)
-            data = response.json()
+            data = self._get('place_details', url, params)
             
             if data['status'] == 'OK':
                 return {
@@ -354,6 +899,15 @@ class GoogleMapsService:
         Returns:
             Dict with optimized route
         """
+        keys = [self.location_key(point) for point in waypoints]
+        key = (
+            self.location_key(origin), self.location_key(destination),
+            'driving', self.hour_bucket('driving'), 'opt:' + '|'.join(keys)
+        )
+        return self._cached_route(key, lambda: self._optimize_route(origin, destination, waypoints))
+    
+    def _optimize_route(self, origin: str, destination: str,
+                        waypoints: List[str]) -> Dict:
         try:
             if not self.api_key:
                 return {
@@ -369,8 +923,7 @@ class GoogleMapsService:
                 'key': self.api_key
             }
             
-            response = requests.get(url, params=params)
-            data = response.json()
+            data = self._get('optimize_route', url, params)
             
             if data['status'] == 'OK' and len(data['routes']) > 0:
                 route = data['routes'][0]
@@ -383,6 +936,7 @@ class GoogleMapsService:
             else:
                 return {
                     'success': False,
+                    'status': data['status'],
                     'error': f"Route optimization failed: {data['status']}"
                 }
                 
@@ -393,12 +947,81 @@ class GoogleMapsService:
                 'error': str(e)
             }
     
-    def calculate_travel_time(self, places: List[Dict]) -> Dict:
+    def resolve_legs(self, pairs: List[Tuple[str, str]], mode: str = 'driving') -> List[Optional[Dict]]:
+        """
+        Distance matrix elements for a list of (origin, destination) legs
+        
+        Cached legs are answered locally. Only the missing legs are requested:
+        legs from one origin share a row, origins needing the same
+        destinations share a block, and the tiles go out concurrently up to
+        MAPS_CONCURRENCY at a time. A path of n new legs is billed n
+        elements, not the n x n matrix of its endpoints.
+        
+        Returns:
+            One element per pair, None where Google had no answer
+        """
+        bucket = self.hour_bucket(mode)
+        keys = [
+            (self.location_key(origin), self.location_key(destination), mode, bucket, '')
+            for origin, destination in pairs
+        ]
+        legs = self._cached_legs(list(set(keys)))
+        
+        # Distinct missing legs as (row, column) cells over their endpoints
+        wanted = {}
+        for key, pair in zip(keys, pairs):
+            if key not in legs:
+                wanted.setdefault(key, pair)
+        origins = {}
+        destinations = {}
+        for (origin_key, destination_key, _, _, _), (origin, destination) in wanted.items():
+            origins.setdefault(origin_key, origin)
+            destinations.setdefault(destination_key, destination)
+        origin_keys = list(origins)
+        destination_keys = list(destinations)
+        rows = {key: i for i, key in enumerate(origin_keys)}
+        columns = {key: j for j, key in enumerate(destination_keys)}
+        tiles = self._cell_tiles(sorted((rows[key[0]], columns[key[1]]) for key in wanted))
+        
+        results = self._map_concurrently(
+            lambda tile: self._get_distance_matrix(
+                [origins[origin_keys[i]] for i in tile[0]],
+                [destinations[destination_keys[j]] for j in tile[1]],
+                mode
+            ),
+            tiles
+        )
+        
+        entries = []
+        for (rows_needed, columns_needed), result in zip(tiles, results):
+            if not result['success']:
+                continue
+            for a, i in enumerate(rows_needed):
+                for b, j in enumerate(columns_needed):
+                    key = (origin_keys[i], destination_keys[j], mode, bucket, '')
+                    legs[key] = self._leg_values(result['rows'][a]['elements'][b])
+                    entries.append((key, legs[key]))
+        if entries:
+            self._store_legs(entries)
+        
+        elements = [self._leg_element(legs[key]) if key in legs else None for key in keys]
+        return [element if element and element.get('status') == 'OK' else None for element in elements]
+    
+    def calculate_travel_time(self, places: List[Dict], mode: str = 'driving',
+                              approximate: bool = False) -> Dict:
         """
-        Calculate total travel time between places
+        Calculate total travel time between consecutive places
+        
+        All legs are resolved in one batch (see resolve_legs), so a day costs
+        about one API round trip. Legs Google cannot answer, or every leg
+        with approximate=True or without an API key, come from the local
+        TravelEstimator; they are marked estimated and make the result
+        partial instead of silently disappearing from the totals.
         
         Args:
             places: List of places with lat, lng
+            mode: Travel mode
+            approximate: Skip Google and estimate every leg locally
         
         Returns:
             Dict with total time and distances
@@ -410,29 +1033,41 @@ class GoogleMapsService:
                     'error': 'Need at least 2 places'
                 }
             
+            if approximate or not self.api_key:
+                elements = [None] * (len(places) - 1)
+            else:
+                points = [f"{place['lat']},{place['lng']}" for place in places]
+                elements = self.resolve_legs(list(zip(points, points[1:])), mode)
+            
+            missing = [i for i, element in enumerate(elements) if element is None]
+            if missing:
+                estimates = get_travel_estimator().elements(
+                    [(places[i]['lat'], places[i]['lng']) for i in missing],
+                    [(places[i + 1]['lat'], places[i + 1]['lng']) for i in missing],
+                    mode
+                )
+                for i, estimate in zip(missing, estimates):
+                    elements[i] = estimate
+            
             total_distance = 0
             total_duration = 0
             segments = []
             
-            for i in range(len(places) - 1):
-                origin = f"{places[i]['lat']},{places[i]['lng']}"
-                destination = f"{places[i+1]['lat']},{places[i+1]['lng']}"
+            for i, element in enumerate(elements):
+                total_distance += element['distance']['value']
+                total_duration += element['duration']['value']
                 
-                result = self.get_directions(origin, destination)
-                
-                if result['success']:
-                    total_distance += result['distance']['value']
-                    total_duration += result['duration']['value']
-                    
-                    segments.append({
-                        'from': places[i].get('name', f"Place {i+1}"),
-                        'to': places[i+1].get('name', f"Place {i+2}"),
-                        'distance': result['distance'],
-                        'duration': result['duration']
-                    })
+                segments.append({
+                    'from': places[i].get('name', f"Place {i+1}"),
+                    'to': places[i+1].get('name', f"Place {i+2}"),
+                    'distance': element['distance'],
+                    'duration': element['duration'],
+                    'estimated': bool(element.get('estimated'))
+                })
             
             return {
                 'success': True,
+                'partial': any(segment['estimated'] for segment in segments),
                 'total_distance': {
                     'meters': total_distance,
                     'km': round(total_distance / 1000, 2)
@@ -452,6 +1087,43 @@ class GoogleMapsService:
                 'error': str(e)
             }
 
+    def travel_matrix(self, points: List[Tuple[float, float]], mode: str = 'driving') -> Tuple:
+        """
+        All-pairs travel matrix without any API call
+        
+        Cells come from the leg cache where Google has answered before and
+        from the local TravelEstimator everywhere else.
+        
+        Args:
+            points: (lat, lng) per location
+            mode: Travel mode
+        
+        Returns:
+            (distances m, durations s, cached mask), each an (n, n) array
+        """
+        distances, durations = get_travel_estimator().matrix(points, points, mode)
+        cached = np.zeros(distances.shape, dtype=bool)
+        
+        keys = [self.location_key(f"{lat},{lng}") for lat, lng in points]
+        bucket = self.hour_bucket(mode)
+        cells = sorted(set(keys))
+        legs = self._cached_legs([
+            (origin, destination, mode, bucket, '') for origin in cells for destination in cells
+            if origin != destination
+        ])
+        
+        for i, origin in enumerate(keys):
+            for j, destination in enumerate(keys):
+                values = legs.get((origin, destination, mode, bucket, ''))
+                if i != j and values and values['status'] == 'OK' and values.get('distance_m') is not None:
+                    distances[i, j] = values['distance_m']
+                    durations[i, j] = values['duration_s']
+                    cached[i, j] = True
+        
+        np.fill_diagonal(distances, 0)
+        np.fill_diagonal(durations, 0)
+        return distances, durations, cached
+
 
 # Singleton instance
 _maps_service = None
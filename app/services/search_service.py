@@ -0,0 +1,195 @@
+from flask import current_app
+from sqlalchemy import event, inspect, text, Integer, Float
+from app.models.place import Place
+from app.utils.helpers import fold_diacritics
+from app import db
+from typing import Dict, Optional
+import re
+
+
+class PlaceSearchIndex:
+    """SQLite FTS5 full-text index over places (diacritic-insensitive, BM25 ranked)"""
+    
+    TABLE = 'places_fts'
+    
+    # BM25 column weights: name, address, description
+    WEIGHTS = (10.0, 3.0, 1.0)
+    
+    BATCH_SIZE = 1000
+    
+    def is_available(self, connection=None) -> bool:
+        """FTS5 is only used on SQLite; other databases fall back to ILIKE"""
+        bind = connection if connection is not None else db.engine
+        return bind.dialect.name == 'sqlite'
+    
+    def create_table(self):
+        """
+        Create the FTS table if missing (schema only, fill it with rebuild)
+        
+        Called at app startup next to db.create_all(), which cannot create
+        virtual tables; existing databases get it from the migration.
+        """
+        if not self.is_available():
+            return
+        
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.TABLE} USING fts5("
+                    "name, address, description, "
+                    "tokenize = 'unicode61 remove_diacritics 2')"
+                ))
+        
+        except Exception as e:
+            current_app.logger.error(f"Error creating search index: {str(e)}")
+    
+    def rebuild(self) -> int:
+        """
+        Rebuild the whole index from the places table
+        
+        Returns:
+            Number of indexed places
+        """
+        if not self.is_available():
+            return 0
+        
+        rows = db.session.query(
+            Place.id, Place.name, Place.address, Place.description
+        ).filter(Place.is_active == True).yield_per(self.BATCH_SIZE)
+        
+        count = 0
+        with db.engine.begin() as connection:
+            connection.execute(text(f"DELETE FROM {self.TABLE}"))
+            
+            batch = []
+            for row in rows:
+                batch.append(self._index_params(row.id, row.name, row.address, row.description))
+                if len(batch) >= self.BATCH_SIZE:
+                    self._insert_batch(connection, batch)
+                    count += len(batch)
+                    batch = []
+            
+            if batch:
+                self._insert_batch(connection, batch)
+                count += len(batch)
+        
+        return count
+    
+    def index_place(self, connection, place: Place):
+        """Insert or replace a single place in the index"""
+        if not self.is_available(connection):
+            return
+        
+        self.remove_place(connection, place.id)
+        if place.is_active is not False:
+            self._insert_batch(connection, [
+                self._index_params(place.id, place.name, place.address, place.description)
+            ])
+    
+    def index_rows(self, connection, rows) -> int:
+        """
+        Add new places to the index in one batch (bulk imports bypass the
+        mapper events)
+        
+        Args:
+            rows: Iterable of (id, name, address, description)
+        """
+        if not self.is_available(connection):
+            return 0
+        
+        batch = [self._index_params(*row) for row in rows]
+        if batch:
+            self._insert_batch(connection, batch)
+        return len(batch)
+    
+    def remove_place(self, connection, place_id: int):
+        """Remove a place from the index"""
+        if not self.is_available(connection):
+            return
+        
+        connection.execute(
+            text(f"DELETE FROM {self.TABLE} WHERE rowid = :id"),
+            {'id': place_id}
+        )
+    
+    def build_match_query(self, search: str) -> Optional[str]:
+        """
+        Convert user input into an FTS5 MATCH expression
+        
+        Every word is folded and prefix-matched, all words must match:
+        "Hà Nội" -> '"ha"* "noi"*'
+        """
+        tokens = re.findall(r'\w+', fold_diacritics(search))
+        if not tokens:
+            return None
+        return ' '.join(f'"{token}"*' for token in tokens)
+    
+    def search_subquery(self, search: str):
+        """
+        Subquery of (place_id, rank) for places matching the search text
+        
+        Lower rank is a better match (FTS5 bm25 convention).
+        """
+        match = self.build_match_query(search)
+        if match is None:
+            return None
+        
+        weights = ', '.join(str(w) for w in self.WEIGHTS)
+        return text(
+            f"SELECT rowid AS place_id, bm25({self.TABLE}, {weights}) AS rank "
+            f"FROM {self.TABLE} WHERE {self.TABLE} MATCH :match"
+        ).bindparams(match=match).columns(place_id=Integer, rank=Float).subquery('search_matches')
+    
+    def _index_params(self, place_id, name, address, description) -> Dict:
+        return {
+            'id': place_id,
+            'name': fold_diacritics(name),
+            'address': fold_diacritics(address),
+            'description': fold_diacritics(description)
+        }
+    
+    def _insert_batch(self, connection, batch):
+        connection.execute(
+            text(
+                f"INSERT INTO {self.TABLE} (rowid, name, address, description) "
+                "VALUES (:id, :name, :address, :description)"
+            ),
+            batch
+        )
+
+
+# Singleton instance
+_search_index = None
+
+def get_search_index() -> PlaceSearchIndex:
+    """
+    Get place search index instance
+    
+    Returns:
+        PlaceSearchIndex singleton instance
+    """
+    global _search_index
+    if _search_index is None:
+        _search_index = PlaceSearchIndex()
+    return _search_index
+
+
+# Keep the index in sync with every ORM write to places
+_INDEXED_ATTRIBUTES = ('name', 'address', 'description', 'is_active')
+
+
+@event.listens_for(Place, 'after_insert')
+def _place_inserted(mapper, connection, target):
+    get_search_index().index_place(connection, target)
+
+
+@event.listens_for(Place, 'after_update')
+def _place_updated(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[attr].history.has_changes() for attr in _INDEXED_ATTRIBUTES):
+        get_search_index().index_place(connection, target)
+
+
+@event.listens_for(Place, 'after_delete')
+def _place_deleted(mapper, connection, target):
+    get_search_index().remove_place(connection, target.id)
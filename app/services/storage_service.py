@@ -0,0 +1,179 @@
+from flask import current_app
+from sqlalchemy import and_, delete, select
+from sqlalchemy.exc import IntegrityError
+from app.models.stored_file import StoredFile, MEDIA_URL_PREFIX
+from app import db
+from datetime import datetime, timedelta
+from typing import Optional
+import glob
+import hashlib
+import os
+import tempfile
+import time
+
+# Layout under UPLOAD_FOLDER
+OBJECTS_FOLDER = 'objects'
+DERIVED_FOLDER = 'derived'
+TMP_FOLDER = 'tmp'
+
+
+class FileStorage:
+    """
+    Content-addressed upload storage
+    
+    Each upload is streamed to a temp file while being hashed, then moved to
+    objects/<aa>/<bb>/<sha256>.<ext>. Identical bytes map to the same path,
+    so they are written once and their URL never changes meaning, which lets
+    clients cache it forever.
+    """
+    
+    CHUNK_SIZE = 64 * 1024
+    
+    def root(self) -> str:
+        return current_app.config['UPLOAD_FOLDER']
+    
+    def store(self, file) -> str:
+        """
+        Store an uploaded file (werkzeug FileStorage) and return its URL
+        
+        The file is registered with ref_count 0; saving it on a Place is what
+        takes the reference.
+        """
+        tmp_dir = os.path.join(self.root(), TMP_FOLDER)
+        os.makedirs(tmp_dir, exist_ok=True)
+        
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = file.stream.read(self.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    size += len(chunk)
+                    out.write(chunk)
+            
+            sha = digest.hexdigest()
+            existing = db.session.get(StoredFile, sha)
+            if existing is not None and os.path.exists(self.path_for(existing.path)):
+                # Same bytes as an earlier upload: restart its grace period,
+                # since the place taking the reference is not committed yet
+                with db.engine.begin() as connection:
+                    touched = StoredFile.touch(connection, sha)
+                if touched:
+                    return existing.url
+                # Collected meanwhile: store it again
+                existing = None
+            
+            relative = existing.path if existing is not None else self._object_path(sha, file.filename)
+            target = self.path_for(relative)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(tmp_path, target)
+            tmp_path = None
+            
+            if existing is None:
+                relative = self._register(sha, relative, size)
+            return MEDIA_URL_PREFIX + relative
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    
+    def path_for(self, relative: str) -> str:
+        """Filesystem path of a path relative to UPLOAD_FOLDER"""
+        return os.path.join(self.root(), relative)
+    
+    def path_for_url(self, url: Optional[str]) -> Optional[str]:
+        """Filesystem path of an upload URL (/media/... or legacy /static/uploads/...)"""
+        if not url:
+            return None
+        for prefix in (MEDIA_URL_PREFIX, '/static/uploads/'):
+            if url.startswith(prefix):
+                return self.path_for(url[len(prefix):])
+        return None
+    
+    def collect_garbage(self, grace_seconds: Optional[int] = None) -> int:
+        """
+        Delete files nobody has referenced for grace_seconds, with their derivatives
+        
+        The grace period covers uploads whose place has not been committed yet.
+        
+        Returns:
+            Number of files removed
+        """
+        if grace_seconds is None:
+            grace_seconds = current_app.config.get('UPLOAD_GC_GRACE_SECONDS', 86400)
+        cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+        
+        # Rows go first, guarded by ref_count, so a file a place referenced
+        # in the meantime is never removed; only deleted rows lose files
+        files = StoredFile.__table__
+        condition = and_(files.c.ref_count <= 0, files.c.updated_at < cutoff)
+        with db.engine.begin() as connection:
+            if connection.dialect.delete_returning:
+                removed = connection.execute(
+                    delete(files).where(condition).returning(files.c.sha256, files.c.path)
+                ).all()
+            else:
+                removed = connection.execute(
+                    select(files.c.sha256, files.c.path).where(condition).with_for_update()
+                ).all()
+                if removed:
+                    connection.execute(delete(files).where(
+                        files.c.sha256.in_([sha for sha, _ in removed]), condition
+                    ))
+        
+        cutoff_time = time.time() - grace_seconds
+        count = 0
+        for sha, relative in removed:
+            path = self.path_for(relative)
+            # Re-uploaded after its row was deleted: a fresh file, keep it
+            if os.path.exists(path) and os.path.getmtime(path) >= cutoff_time:
+                continue
+            paths = [path]
+            paths.extend(glob.glob(os.path.join(self.root(), DERIVED_FOLDER, f"{sha}_*")))
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+            count += 1
+        
+        return count
+    
+    def _object_path(self, sha: str, filename: Optional[str]) -> str:
+        ext = os.path.splitext(filename or '')[1].lower()
+        if ext == '.jpeg':
+            ext = '.jpg'
+        return '/'.join((OBJECTS_FOLDER, sha[:2], sha[2:4], sha + ext))
+    
+    def _register(self, sha: str, relative: str, size: int) -> str:
+        """Insert the StoredFile row; returns the path of the winning row on a race"""
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(StoredFile.__table__.insert().values(
+                    sha256=sha, path=relative, size=size, ref_count=0,
+                    created_at=datetime.utcnow(), updated_at=datetime.utcnow()
+                ))
+            return relative
+        except IntegrityError:
+            # Same bytes stored concurrently (possibly under another extension)
+            winner = db.session.get(StoredFile, sha, populate_existing=True)
+            if winner.path != relative:
+                os.remove(self.path_for(relative))
+            return winner.path
+
+
+# Singleton instance
+_file_storage = None
+
+def get_file_storage() -> FileStorage:
+    """
+    Get file storage instance
+    
+    Returns:
+        FileStorage singleton instance
+    """
+    global _file_storage
+    if _file_storage is None:
+        _file_storage = FileStorage()
+    return _file_storage
@@ -0,0 +1,216 @@
+from flask import current_app
+from sqlalchemy import select
+from app.models.travel_leg import TravelLeg
+from app.utils.geo import haversine_pairs
+from app import db
+from typing import Dict, List, Optional, Sequence, Tuple
+import copy
+import threading
+import time
+import numpy as np
+
+# Road-distance band centers (meters) of the speed curves; speeds are
+# interpolated in log-distance between them
+SPEED_BANDS_M = (500.0, 2000.0, 5000.0, 15000.0, 50000.0)
+
+# Starting point before any calibration (urban Vietnam)
+DEFAULT_MODEL = {
+    'driving': {'detour': 1.35, 'speeds_kmh': [10.0, 16.0, 24.0, 35.0, 55.0]},
+    'transit': {'detour': 1.4, 'speeds_kmh': [4.0, 8.0, 13.0, 20.0, 35.0]},
+    'bicycling': {'detour': 1.25, 'speeds_kmh': [9.0, 11.0, 12.0, 13.0, 14.0]},
+    'walking': {'detour': 1.25, 'speeds_kmh': [4.5, 4.5, 4.5, 4.5, 4.5]}
+}
+
+# Legs shorter than this in a straight line are dominated by the rounding
+# of cached cells and are left out of calibration
+MIN_CALIBRATION_STRAIGHT_M = 300.0
+
+
+class TravelEstimator:
+    """
+    Local distance / duration estimates from coordinates
+    
+    distance = great-circle distance x per-mode detour factor,
+    duration = distance / speed(distance) from a per-mode speed curve.
+    Everything is vectorized, so a full N x N matrix costs one NumPy pass.
+    The parameters are refitted from the Google answers in the travel leg
+    cache every TRAVEL_ESTIMATOR_RECALIBRATE_SECONDS.
+    """
+    
+    def __init__(self):
+        self._model = copy.deepcopy(DEFAULT_MODEL)
+        self._calibrated_at = None
+        self._lock = threading.Lock()
+    
+    def model(self) -> Dict:
+        """Current parameters per mode (with sample counts once calibrated)"""
+        with self._lock:
+            return copy.deepcopy(self._model)
+    
+    def matrix(self, origins: Sequence[Tuple[float, float]], destinations: Sequence[Tuple[float, float]],
+               mode: str = 'driving') -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Estimated road distances (m) and durations (s) for every origin x destination
+        
+        Returns:
+            (distances, durations), both float arrays of shape (len(origins), len(destinations))
+        """
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 2)
+        destinations = np.asarray(destinations, dtype=np.float64).reshape(-1, 2)
+        straight = haversine_pairs(
+            origins[:, 0:1], origins[:, 1:2], destinations[:, 0][None, :], destinations[:, 1][None, :]
+        )
+        return self._apply(straight, mode)
+    
+    def pairs(self, origins: Sequence[Tuple[float, float]], destinations: Sequence[Tuple[float, float]],
+              mode: str = 'driving') -> Tuple[np.ndarray, np.ndarray]:
+        """Element-wise estimates for origins[i] -> destinations[i]"""
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 2)
+        destinations = np.asarray(destinations, dtype=np.float64).reshape(-1, 2)
+        straight = haversine_pairs(origins[:, 0], origins[:, 1], destinations[:, 0], destinations[:, 1])
+        return self._apply(straight, mode)
+    
+    def _apply(self, straight: np.ndarray, mode: str) -> Tuple[np.ndarray, np.ndarray]:
+        self._maybe_recalibrate()
+        with self._lock:
+            params = self._model.get(mode) or self._model['driving']
+            detour = params['detour']
+            speeds = np.asarray(params['speeds_kmh'], dtype=np.float64) / 3.6
+        
+        distances = straight * detour
+        speed = np.interp(np.log(np.maximum(distances, 1.0)), np.log(SPEED_BANDS_M), speeds)
+        return distances, distances / speed
+    
+    def elements(self, origins: Sequence[Tuple[float, float]], destinations: Sequence[Tuple[float, float]],
+                 mode: str = 'driving') -> List[Dict]:
+        """Element-wise estimates shaped like distance matrix elements (marked estimated)"""
+        distances, durations = self.pairs(origins, destinations, mode)
+        return [estimate_element(distance, duration) for distance, duration in zip(distances, durations)]
+    
+    def calibrate(self, max_samples: int = 200000, min_samples: int = 20) -> Dict:
+        """
+        Refit detour factors and speed curves from cached OK legs
+        
+        Per mode, the detour factor is the median road / straight-line ratio
+        and each band's speed the median road speed of the legs nearest that
+        band; modes or bands with too few samples keep their current values.
+        
+        Returns:
+            Sample count per mode
+        """
+        legs = TravelLeg.__table__
+        rows = db.session.execute(
+            select(legs.c.mode, legs.c.origin, legs.c.destination, legs.c.distance_m, legs.c.duration_s).where(
+                legs.c.status == 'OK',
+                legs.c.waypoints == '',
+                legs.c.distance_m > 0,
+                legs.c.duration_s > 0,
+                ~legs.c.origin.like('addr:%'),
+                ~legs.c.destination.like('addr:%')
+            ).order_by(legs.c.created_at.desc()).limit(max_samples)
+        ).all()
+        
+        samples = {}
+        for mode, origin, destination, distance_m, duration_s in rows:
+            try:
+                lat1, lng1 = map(float, origin.split(','))
+                lat2, lng2 = map(float, destination.split(','))
+            except ValueError:
+                continue
+            samples.setdefault(mode, []).append((lat1, lng1, lat2, lng2, distance_m, duration_s))
+        
+        model = self.model()
+        counts = {}
+        log_bands = np.log(SPEED_BANDS_M)
+        edges = (log_bands[1:] + log_bands[:-1]) / 2
+        
+        for mode, values in samples.items():
+            data = np.asarray(values, dtype=np.float64)
+            straight = haversine_pairs(data[:, 0], data[:, 1], data[:, 2], data[:, 3])
+            usable = straight >= MIN_CALIBRATION_STRAIGHT_M
+            if usable.sum() < min_samples:
+                continue
+            
+            road, seconds = data[usable, 4], data[usable, 5]
+            params = model.setdefault(mode, copy.deepcopy(DEFAULT_MODEL['driving']))
+            # Road distance is never shorter than the straight line
+            params['detour'] = round(float(max(1.0, np.median(road / straight[usable]))), 3)
+            
+            band = np.searchsorted(edges, np.log(road))
+            speeds_kmh = road / seconds * 3.6
+            for index in range(len(SPEED_BANDS_M)):
+                in_band = speeds_kmh[band == index]
+                if len(in_band) >= max(5, min_samples // 4):
+                    params['speeds_kmh'][index] = round(float(np.median(in_band)), 2)
+            
+            params['samples'] = int(usable.sum())
+            counts[mode] = params['samples']
+        
+        with self._lock:
+            self._model = model
+            self._calibrated_at = time.monotonic()
+        return counts
+    
+    def _maybe_recalibrate(self):
+        """Refit when the configured interval has passed (first use included)"""
+        try:
+            interval = current_app.config.get('TRAVEL_ESTIMATOR_RECALIBRATE_SECONDS', 6 * 3600)
+        except RuntimeError:
+            # Outside an app context: keep the current model
+            return
+        if interval <= 0:
+            return
+        
+        with self._lock:
+            due = self._calibrated_at is None or time.monotonic() - self._calibrated_at >= interval
+            if due:
+                # Claim the refit so concurrent callers keep using the current model
+                self._calibrated_at = time.monotonic()
+        if not due:
+            return
+        
+        try:
+            self.calibrate()
+        except Exception as e:
+            current_app.logger.warning(f"Travel estimator calibration failed: {str(e)}")
+
+
+def estimate_element(distance_m: float, duration_s: float) -> Dict:
+    """Distance matrix element for an estimated leg"""
+    meters = int(round(distance_m))
+    seconds = int(round(duration_s))
+    return {
+        'status': 'OK',
+        'estimated': True,
+        'distance': {'text': f"~{meters / 1000:.1f} km", 'value': meters},
+        'duration': {'text': f"~{max(1, round(seconds / 60))} mins", 'value': seconds}
+    }
+
+
+def parse_location(location) -> Optional[Tuple[float, float]]:
+    """(lat, lng) of a "lat,lng" string or {'lat', 'lng'} dict, None for addresses"""
+    if isinstance(location, dict):
+        if location.get('lat') is None or location.get('lng') is None:
+            return None
+        return float(location['lat']), float(location['lng'])
+    try:
+        lat, lng = (float(part) for part in str(location).split(','))
+        return lat, lng
+    except ValueError:
+        return None
+
+
+# Singleton instance
+_travel_estimator = None
+
+def get_travel_estimator() -> TravelEstimator:
+    """
+    Get travel estimator instance
+    
+    Returns:
+        TravelEstimator singleton instance
+    """
+    global _travel_estimator
+    if _travel_estimator is None:
+        _travel_estimator = TravelEstimator()
+    return _travel_estimator
@@ -0,0 +1,168 @@
+from flask import current_app
+from sqlalchemy import update, func, bindparam
+from app.models.place import Place, Review
+from app.models.trending_state import TrendingState
+from app.utils.helpers import LRUCache
+from app import db
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import math
+
+# Stored scores grow by 2x per half-life after the epoch; once the epoch is
+# this many half-lives old it is moved forward and the scores are scaled
+# down to match, which keeps the exponent far from float overflow (~1024)
+REBASE_HALF_LIVES = 32
+
+
+class TrendingService:
+    """
+    Time-decayed popularity of places (forward decay)
+    
+    Instead of decaying every score as time passes, each event adds
+    weight * 2^((t - epoch) / half_life) to Place.trending_score. Older
+    events are then worth relatively less, and because all scores share
+    the same scale, ranking is a plain ORDER BY on the indexed column and
+    recording an event is a single atomic UPDATE ... SET score = score + n.
+    The epoch lives in TrendingState and is rebased periodically.
+    """
+    
+    def __init__(self):
+        self._top_cache = LRUCache(max_size=128)
+    
+    def half_life_seconds(self) -> float:
+        return current_app.config.get('TRENDING_HALF_LIFE_HOURS', 72) * 3600
+    
+    def epoch(self, connection) -> datetime:
+        """
+        Epoch to compute increments against inside a write transaction
+        
+        Rebases first when the epoch is REBASE_HALF_LIVES old: it moves by a
+        whole number of half-lives and every positive score is multiplied by
+        the matching power of two (exact, an indexed UPDATE), in the same
+        transaction as the caller's write.
+        """
+        epoch = TrendingState.read(connection, lock=True)
+        half_life = self.half_life_seconds()
+        half_lives = math.floor((datetime.utcnow() - epoch).total_seconds() / half_life)
+        if half_lives < REBASE_HALF_LIVES:
+            return epoch
+        
+        new_epoch = epoch + timedelta(seconds=half_lives * half_life)
+        if not TrendingState.move(connection, epoch, new_epoch):
+            # Another worker rebased meanwhile
+            return TrendingState.read(connection, lock=True)
+        
+        places = Place.__table__
+        connection.execute(
+            update(places).where(places.c.trending_score > 0).values(
+                trending_score=places.c.trending_score * math.ldexp(1.0, -half_lives),
+                updated_at=places.c.updated_at
+            )
+        )
+        self._top_cache.clear()
+        return new_epoch
+    
+    def increment(self, epoch: datetime, kind: str, count: int = 1, at: Optional[datetime] = None) -> float:
+        """Stored-score increment for count events of a kind ('view', 'favorite', 'review')"""
+        weight = current_app.config.get('TRENDING_WEIGHTS', {}).get(kind, 0)
+        elapsed = ((at or datetime.utcnow()) - epoch).total_seconds()
+        return weight * count * 2 ** (elapsed / self.half_life_seconds())
+    
+    def current_value(self, stored_score: Optional[float], epoch: datetime) -> float:
+        """Stored score decayed to now (comparable to a plain weighted event count)"""
+        elapsed = (datetime.utcnow() - epoch).total_seconds()
+        return round((stored_score or 0) * 2 ** (-elapsed / self.half_life_seconds()), 3)
+    
+    def record(self, place_id: int, kind: str, count: int = 1):
+        """
+        Add an event to a place's score in the current session transaction
+        
+        Not an edit of the place: updated_at and the places ETag stay as
+        they are.
+        """
+        connection = db.session.connection()
+        places = Place.__table__
+        connection.execute(
+            update(places).where(places.c.id == place_id).values(
+                trending_score=func.coalesce(places.c.trending_score, 0)
+                + self.increment(self.epoch(connection), kind, count),
+                updated_at=places.c.updated_at
+            )
+        )
+    
+    def top(self, category: Optional[str] = None, limit: int = 10, fields=None) -> List[Dict]:
+        """
+        Most trending active places, optionally within one category
+        
+        Served from (category, trending_score) / trending_score index scans
+        and cached for TRENDING_CACHE_SECONDS.
+        """
+        fields = fields or Place.CARD_FIELDS
+        key = (category, limit, fields)
+        cached = self._top_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        query = Place.query.filter_by(is_active=True)
+        if category:
+            query = query.filter_by(category=category)
+        
+        places = query.options(*Place.load_options(fields + ('trending_score',))).order_by(
+            Place.trending_score.desc(), Place.id.desc()
+        ).limit(limit).all()
+        
+        epoch = db.session.query(TrendingState.epoch).scalar() or datetime.utcnow()
+        result = []
+        for place in places:
+            data = place.to_dict(fields=fields)
+            data['trending_score'] = self.current_value(place.trending_score, epoch)
+            result.append(data)
+        
+        self._top_cache.set(key, result, ttl=current_app.config.get('TRENDING_CACHE_SECONDS', 300))
+        return result
+    
+    def rebuild(self) -> int:
+        """
+        Recompute scores from the events that are still on record (reviews,
+        at their creation time); views and favorites are not kept per event
+        and start over from zero. The epoch restarts at now.
+        
+        Returns:
+            Number of places with a non-zero score
+        """
+        epoch = datetime.utcnow()
+        scores = {}
+        rows = db.session.query(Review.place_id, Review.created_at).yield_per(1000)
+        for place_id, created_at in rows:
+            scores[place_id] = scores.get(place_id, 0) + self.increment(epoch, 'review', at=created_at)
+        
+        places = Place.__table__
+        with db.engine.begin() as connection:
+            TrendingState.move(connection, TrendingState.read(connection, lock=True), epoch)
+            connection.execute(update(places).values(trending_score=0, updated_at=places.c.updated_at))
+            if scores:
+                connection.execute(
+                    update(places).where(places.c.id == bindparam('b_place_id')).values(
+                        trending_score=bindparam('b_score'), updated_at=places.c.updated_at
+                    ),
+                    [{'b_place_id': place_id, 'b_score': score} for place_id, score in scores.items()]
+                )
+        
+        self._top_cache.clear()
+        return len(scores)
+
+
+# Singleton instance
+_trending_service = None
+
+def get_trending_service() -> TrendingService:
+    """
+    Get trending service instance
+    
+    Returns:
+        TrendingService singleton instance
+    """
+    global _trending_service
+    if _trending_service is None:
+        _trending_service = TrendingService()
+    return _trending_service
@@ -0,0 +1,134 @@
+from flask import current_app
+from sqlalchemy import update, bindparam, func
+from app.models.place import Place
+from app.services.trending_service import get_trending_service
+from app import db
+from typing import Dict
+import atexit
+import os
+import threading
+
+
+class ViewCounter:
+    """
+    Per-worker buffer for place view counts
+    
+    Detail GETs only bump an in-memory counter; a background thread flushes
+    the accumulated increments every VIEW_COUNT_FLUSH_INTERVAL seconds in a
+    single batched UPDATE ... SET view_count = view_count + n, which also
+    adds the views to the trending score.
+    """
+    
+    def __init__(self):
+        self._pending: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._app = None
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+    
+    def record(self, place_id: int):
+        """Count one view of a place"""
+        interval = current_app.config.get('VIEW_COUNT_FLUSH_INTERVAL', 30)
+        
+        with self._lock:
+            self._pending[place_id] = self._pending.get(place_id, 0) + 1
+        
+        if interval <= 0:
+            # Buffering disabled: write through
+            self.flush()
+        else:
+            self._ensure_worker(interval)
+    
+    def pending(self, place_id: int) -> int:
+        """Views recorded for a place but not yet flushed"""
+        with self._lock:
+            return self._pending.get(place_id, 0)
+    
+    def flush(self) -> int:
+        """
+        Write all buffered increments to the database
+        
+        Returns:
+            Number of places updated
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        
+        if not pending:
+            return 0
+        
+        places = Place.__table__
+        stmt = update(places).where(
+            places.c.id == bindparam('place_id')
+        ).values(
+            view_count=places.c.view_count + bindparam('increment'),
+            trending_score=func.coalesce(places.c.trending_score, 0) + bindparam('trend'),
+            # A view is not an edit: keep updated_at, and with it the
+            # table version / ETag, stable so conditional GETs keep hitting
+            updated_at=places.c.updated_at
+        )
+        
+        try:
+            with db.engine.begin() as connection:
+                trending = get_trending_service()
+                view_weight = trending.increment(trending.epoch(connection), 'view')
+                connection.execute(stmt, [
+                    {'place_id': place_id, 'increment': increment, 'trend': increment * view_weight}
+                    for place_id, increment in pending.items()
+                ])
+        except Exception as e:
+            # Put the increments back so they are retried on the next flush
+            with self._lock:
+                for place_id, increment in pending.items():
+                    self._pending[place_id] = self._pending.get(place_id, 0) + increment
+            current_app.logger.error(f"Error flushing view counts: {str(e)}")
+            return 0
+        
+        return len(pending)
+    
+    def _ensure_worker(self, interval: float):
+        """Start the flush thread on first use in this process (safe across fork)"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            
+            self._app = current_app._get_current_object()
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(interval,), name='view-counter-flush', daemon=True
+            )
+            self._thread.start()
+    
+    def _run(self, interval: float):
+        while not self._stop.wait(interval):
+            with self._app.app_context():
+                self.flush()
+    
+    def shutdown(self):
+        """Stop the flush thread and write out whatever is buffered"""
+        self._stop.set()
+        if self._app is not None and self._pid == os.getpid():
+            with self._app.app_context():
+                self.flush()
+
+
+# Singleton instance
+_view_counter = None
+
+def get_view_counter() -> ViewCounter:
+    """
+    Get view counter instance
+    
+    Returns:
+        ViewCounter singleton instance
+    """
+    global _view_counter
+    if _view_counter is None:
+        _view_counter = ViewCounter()
+        atexit.register(_view_counter.shutdown)
+    return _view_counter
@@ -0,0 +1,85 @@
+from flask import Response, current_app, stream_with_context
+import csv
+import io
+import json
+
+EXPORT_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def iter_export(query, serialize, fmt='json', root_key='items', batch_size=1000):
+    """
+    Yield an export document chunk by chunk
+    
+    Rows are fetched with yield_per, so only one batch of model instances is
+    alive at a time and the first chunk is sent before the query finishes.
+    
+    Args:
+        query: SQLAlchemy ORM query
+        serialize: Callable turning one instance into a dict
+        fmt: json ({root_key: [...]}), ndjson (one object per line) or csv
+        root_key: Top-level key of the json format
+        batch_size: Rows fetched per round trip
+    """
+    dumps = current_app.json.dumps
+    rows = query.yield_per(batch_size)
+    
+    if fmt == 'ndjson':
+        for row in rows:
+            yield dumps(serialize(row)) + '\n'
+    
+    elif fmt == 'csv':
+        buffer = io.StringIO()
+        writer = None
+        # BOM so Excel opens the Vietnamese text as UTF-8
+        yield '\ufeff'
+        for index, row in enumerate(rows, 1):
+            data = serialize(row)
+            if writer is None:
+                writer = csv.DictWriter(buffer, fieldnames=list(data), extrasaction='ignore')
+                writer.writeheader()
+            writer.writerow({key: _csv_value(value) for key, value in data.items()})
+            
+            if index % batch_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    
+    else:
+        yield '{' + dumps(root_key) + ': ['
+        separator = ''
+        for row in rows:
+            yield separator + dumps(serialize(row))
+            separator = ', '
+        yield ']}'
+
+
+def stream_export(query, serialize, fmt='json', root_key='items', filename='export', batch_size=1000):
+    """
+    Streaming download response for iter_export
+    
+    Unknown formats fall back to json.
+    """
+    if fmt not in EXPORT_FORMATS:
+        fmt = 'json'
+    
+    response = Response(
+        stream_with_context(iter_export(query, serialize, fmt, root_key, batch_size)),
+        mimetype=EXPORT_FORMATS[fmt]
+    )
+    if fmt != 'json':
+        extension = 'csv' if fmt == 'csv' else 'ndjson'
+        response.headers['Content-Disposition'] = f'attachment; filename={filename}.{extension}'
+    return response
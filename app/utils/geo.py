@@ -0,0 +1,138 @@
+import math
+import numpy as np
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE = 111320.0
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Precision stored on Place.geohash (~4.8m x 4.8m cells)
+GEOHASH_PRECISION = 9
+
+
+def geohash_encode(lat, lng, precision=GEOHASH_PRECISION):
+    """Encode a coordinate as a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    lng = ((lng + 180.0) % 360.0) - 180.0
+    
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits = bits << 1
+            rng[1] = mid
+        even = not even
+        
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    
+    return ''.join(chars)
+
+
+def geohash_cell_size(precision):
+    """(lat_degrees, lng_degrees) spanned by one cell at the given precision"""
+    total_bits = 5 * precision
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def geohash_bbox_cells(south, west, north, east, precision, max_cells=None):
+    """
+    Geohash cells of one precision covering a bounding box
+    
+    Returns None when the box needs more than max_cells cells.
+    """
+    south, north = max(south, -90.0), min(north, 90.0 - 1e-9)
+    lat_deg, lng_deg = geohash_cell_size(precision)
+    
+    rows = int(math.floor(north / lat_deg) - math.floor(south / lat_deg)) + 1
+    cols = int(math.floor(east / lng_deg) - math.floor(west / lng_deg)) + 1
+    if max_cells is not None and rows * cols > max_cells:
+        return None
+    
+    # Clamped edge rows/columns can repeat a cell; dict keeps the first of each
+    cells = dict.fromkeys(
+        geohash_encode(min(south + i * lat_deg, north), min(west + j * lng_deg, east), precision)
+        for i in range(rows)
+        for j in range(cols)
+    )
+    return list(cells)
+
+
+def geohash_cover(lat, lng, radius_m, max_cells=32, max_precision=GEOHASH_PRECISION):
+    """
+    Geohash cells covering the bounding box of a search circle
+    
+    Picks the finest precision whose cover needs at most max_cells cells, so
+    the candidate area stays within a small factor of the circle itself.
+    Returns an empty list when even one-character cells cannot cover it.
+    """
+    dlat = radius_m / METERS_PER_DEGREE
+    dlng = radius_m / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+    
+    if dlat >= 90 or dlng >= 180:
+        return []
+    
+    for precision in range(max_precision, 0, -1):
+        cells = geohash_bbox_cells(lat - dlat, lng - dlng, lat + dlat, lng + dlng,
+                                   precision, max_cells)
+        if cells is not None:
+            return cells
+    
+    return []
+
+
+def precision_for_zoom(zoom, max_precision, min_cell_px=64):
+    """
+    Finest geohash precision whose cells are at least min_cell_px wide at a
+    web-map zoom level (256px tiles)
+    """
+    degrees_per_px = 360.0 / (256 * 2 ** max(zoom, 0))
+    
+    for precision in range(max_precision, 0, -1):
+        _, lng_deg = geohash_cell_size(precision)
+        if lng_deg / degrees_per_px >= min_cell_px:
+            return precision
+        
+    return 1
+
+
+def haversine_np(lat, lng, lats, lngs):
+    """Great-circle distance in meters from one point to arrays of points"""
+    lat1 = np.radians(lat)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    dlat = lat2 - lat1
+    dlng = np.radians(np.asarray(lngs, dtype=np.float64) - lng)
+    
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def haversine_pairs(lats1, lngs1, lats2, lngs2):
+    """
+    Great-circle distance in meters between broadcastable arrays of points
+    
+    Equal-length inputs give element-wise distances; column vs row vectors
+    (lats1[:, None], lats2[None, :]) give a full matrix.
+    """
+    lat1 = np.radians(np.asarray(lats1, dtype=np.float64))
+    lat2 = np.radians(np.asarray(lats2, dtype=np.float64))
+    dlat = lat2 - lat1
+    dlng = np.radians(np.asarray(lngs2, dtype=np.float64) - np.asarray(lngs1, dtype=np.float64))
+    
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
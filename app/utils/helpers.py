@@ -16,25 +16,17 @@ def allowed_file(filename, allowed_extensions=None):
 
 
 def save_uploaded_file(file, folder='uploads'):
-    """Save uploaded file and return path"""
+    """
+    Save uploaded file and return its URL
+    
+    Files are content-addressed (see FileStorage), so folder is no longer
+    used: identical uploads share one stored copy wherever they come from.
+    """
     if not file or not allowed_file(file.filename):
         return None
     
-    # Generate unique filename
-    filename = secure_filename(file.filename)
-    name, ext = os.path.splitext(filename)
-    unique_filename = f"{name}_{uuid.uuid4().hex[:8]}{ext}"
-    
-    # Create folder if not exists
-    upload_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], folder)
-    os.makedirs(upload_folder, exist_ok=True)
-    
-    # Save file
-    filepath = os.path.join(upload_folder, unique_filename)
-    file.save(filepath)
-    
-    # Return relative path
-    return f"/static/uploads/{folder}/{unique_filename}"
+    from app.services.storage_service import get_file_storage
+    return get_file_storage().store(file)
 
 
 def format_currency(amount, currency='VND'):
@@ -63,6 +55,65 @@ def calculate_distance(lat1, lon1, lat2, lon2):
     return c * r
 
 
+def fold_diacritics(text):
+    """Lowercase text and strip Vietnamese diacritics ("Hà Nội" -> "ha noi")"""
+    import unicodedata
+    
+    if not text:
+        return ''
+    
+    text = text.replace('đ', 'd').replace('Đ', 'D')
+    decomposed = unicodedata.normalize('NFD', text)
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return stripped.lower()
+
+
+def normalize_address(address):
+    """
+    Cache key form of an address: diacritics folded, lowercase, punctuation
+    other than house-number separators (/ -) dropped, single spaces
+    ("12 Lê Lợi,  Quận 1" -> "12 le loi quan 1")
+    """
+    import re
+    
+    text = fold_diacritics(str(address or ''))
+    text = re.sub(r'[^\w/\-]+', ' ', text)
+    return ' '.join(text.split())
+
+
+def normalize_label(text):
+    """Normalize a tag/feature label: NFC, trimmed, lowercase, single spaces"""
+    import unicodedata
+    
+    if not text:
+        return ''
+    
+    text = unicodedata.normalize('NFC', str(text))
+    return ' '.join(text.split()).lower()
+
+
+def parse_labels(value):
+    """
+    Parse tags/features as stored on Place (JSON array) or sent by forms
+    (comma-separated) into a de-duplicated list of normalized labels
+    """
+    if not value:
+        return []
+    
+    if isinstance(value, str):
+        parsed = parse_json_safe(value)
+        items = parsed if isinstance(parsed, list) else value.split(',')
+    else:
+        items = value
+    
+    labels = []
+    for item in items:
+        label = normalize_label(item)
+        if label and len(label) <= 100 and label not in labels:
+            labels.append(label)
+    return labels
+
+
 def parse_json_safe(json_string, default=None):
     """Safely parse JSON string"""
     if not json_string:
@@ -107,6 +158,116 @@ def paginate_query(query, page=1, per_page=20):
     }
 
 
+def get_per_page(request, default=None):
+    """Read per_page from the query string, capped at MAX_PER_PAGE"""
+    if default is None:
+        default = current_app.config.get('ITEMS_PER_PAGE', 20)
+    
+    per_page = request.args.get('per_page', default, type=int)
+    max_per_page = current_app.config.get('MAX_PER_PAGE', 100)
+    
+    return max(1, min(per_page, max_per_page))
+
+
+def wants_cursor_pagination(request):
+    """Cursor mode is opt-in: ?pagination=cursor or a non-empty ?after= token"""
+    return request.args.get('pagination') == 'cursor' or bool(request.args.get('after'))
+
+
+def encode_cursor(sort_key, value, item_id):
+    """Encode a keyset position (sort key, value, id) as an opaque URL-safe token"""
+    import base64
+    
+    if isinstance(value, datetime):
+        value = {'dt': value.isoformat()}
+    
+    raw = json.dumps([sort_key, value, item_id], ensure_ascii=False, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, sort_key):
+    """
+    Decode a cursor produced by encode_cursor
+    
+    Raises ValueError if the token is malformed or was issued for another sort.
+    """
+    import base64
+    
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        key, value, item_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    
+    if key != sort_key or not isinstance(item_id, int):
+        raise ValueError('Cursor does not match sort order')
+    
+    if isinstance(value, dict) and 'dt' in value:
+        value = datetime.fromisoformat(value['dt'])
+    
+    return value, item_id
+
+
+def keyset_paginate(query, sort_key, sort_column, id_column, after=None,
+                    per_page=20, descending=True):
+    """
+    Paginate with a keyset cursor instead of COUNT(*) + OFFSET
+    
+    Rows are ordered by (sort_column, id_column); the cursor carries the last
+    row's position so every page is a single indexed range scan. NULL sort
+    values count as the smallest (after every value when descending, before
+    them when ascending), with id_column as the tiebreaker among them.
+    
+    Returns:
+        Dict with items, next_cursor and has_more
+    """
+    from sqlalchemy import and_, or_
+    
+    if after:
+        value, last_id = decode_cursor(after, sort_key)
+        if descending:
+            if value is None:
+                query = query.filter(sort_column.is_(None), id_column < last_id)
+            else:
+                query = query.filter(or_(
+                    sort_column < value,
+                    sort_column.is_(None),
+                    and_(sort_column == value, id_column < last_id)
+                ))
+        else:
+            if value is None:
+                query = query.filter(or_(
+                    sort_column.isnot(None),
+                    id_column > last_id
+                ))
+            else:
+                query = query.filter(or_(
+                    sort_column > value,
+                    and_(sort_column == value, id_column > last_id)
+                ))
+    
+    if descending:
+        query = query.order_by(None).order_by(sort_column.desc().nulls_last(), id_column.desc())
+    else:
+        query = query.order_by(None).order_by(sort_column.asc().nulls_first(), id_column.asc())
+    
+    rows = query.add_columns(sort_column, id_column).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor(sort_key, last[-2], last[-1])
+    
+    return {
+        'items': [row[0] for row in rows],
+        'next_cursor': next_cursor,
+        'has_more': has_more,
+        'per_page': per_page
+    }
+
+
 def format_datetime(dt, format='%Y-%m-%d %H:%M:%S'):
     """Format datetime object"""
     if not dt:
@@ -170,6 +331,54 @@ def sanitize_filename(filename):
     return filename
 
 
+class LRUCache:
+    """Small thread-safe in-process LRU cache with optional TTL (seconds)"""
+    
+    def __init__(self, max_size=256, ttl=None):
+        from collections import OrderedDict
+        import threading
+        
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, default=None):
+        import time
+        
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            
+            self._data.move_to_end(key)
+            return value
+    
+    def set(self, key, value, ttl=None):
+        import time
+        
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+    
+    def __len__(self):
+        return len(self._data)
+
+
 class JSONEncoder(json.JSONEncoder):
     """Custom JSON encoder for datetime objects"""
     
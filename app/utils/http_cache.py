@@ -0,0 +1,85 @@
+from functools import wraps
+from flask import request, make_response
+from app.models.table_version import TableVersion
+import hashlib
+
+
+def compute_etag(tables, *extra):
+    """
+    Build a strong ETag from table versions, the request path and query args
+    
+    Any write to one of the tables changes the tag, so a matching tag means
+    the response would be byte-for-byte identical.
+    """
+    versions = TableVersion.get_versions(tables) if tables else {}
+    
+    parts = [request.path]
+    parts.extend(f"{key}={value}" for key, value in sorted(request.args.items(multi=True)))
+    parts.extend(f"{name}:{versions[name][0]}" for name in sorted(versions))
+    parts.extend(str(value) for value in extra)
+    
+    etag = hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+    
+    last_modified = None
+    for _, updated_at in versions.values():
+        if updated_at and (last_modified is None or updated_at > last_modified):
+            last_modified = updated_at
+    
+    return etag, last_modified
+
+
+def is_not_modified(etag, last_modified=None):
+    """Evaluate If-None-Match (preferred) or If-Modified-Since against the current state"""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    
+    if last_modified and request.if_modified_since:
+        since = request.if_modified_since.replace(tzinfo=None)
+        return last_modified.replace(microsecond=0) <= since
+    
+    return False
+
+
+def with_cache_headers(response, etag, last_modified=None):
+    """Attach validators so clients and CDNs can revalidate cheaply"""
+    response = make_response(response)
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'public, no-cache'
+    return response
+
+
+def not_modified(etag, last_modified=None):
+    """Empty 304 response carrying the current validators"""
+    return with_cache_headers(('', 304), etag, last_modified)
+
+
+def etag_cached(*tables, vary=None):
+    """
+    Decorator for read-only JSON endpoints: answer 304 before running the view
+    
+    vary is an optional callable returning extra values the response depends
+    on besides the URL and table versions (e.g. the resolved time of open_at=now).
+    
+    Usage:
+        @etag_cached('places')
+        def get_places(): ...
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            extra = vary() if vary else ()
+            etag, last_modified = compute_etag(tables, *extra)
+            
+            if is_not_modified(etag, last_modified):
+                return not_modified(etag, last_modified)
+            
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            return with_cache_headers(response, etag, last_modified)
+        
+        return decorated_function
+    
+    return decorator
@@ -0,0 +1,234 @@
+from datetime import datetime, timedelta, timezone
+from app.utils.helpers import fold_diacritics
+import json
+import re
+
+MINUTES_PER_DAY = 24 * 60
+
+# Monday = 0 ... Sunday = 6 (datetime.weekday())
+_DAY_NAMES = {
+    'monday': 0, 'mon': 0, 't2': 0, 'thu 2': 0, 'thu hai': 0,
+    'tuesday': 1, 'tue': 1, 'tues': 1, 't3': 1, 'thu 3': 1, 'thu ba': 1,
+    'wednesday': 2, 'wed': 2, 't4': 2, 'thu 4': 2, 'thu tu': 2,
+    'thursday': 3, 'thu': 3, 'thur': 3, 'thurs': 3, 't5': 3, 'thu 5': 3, 'thu nam': 3,
+    'friday': 4, 'fri': 4, 't6': 4, 'thu 6': 4, 'thu sau': 4,
+    'saturday': 5, 'sat': 5, 't7': 5, 'thu 7': 5, 'thu bay': 5,
+    'sunday': 6, 'sun': 6, 'cn': 6, 'chu nhat': 6
+}
+_ALL_DAYS = ('daily', 'everyday', 'every day', 'all', '*', 'hang ngay', 'moi ngay', 'ca tuan')
+_DAY_GROUPS = {
+    'weekdays': range(0, 5), 'ngay thuong': range(0, 5),
+    'weekend': range(5, 7), 'weekends': range(5, 7), 'cuoi tuan': range(5, 7)
+}
+_CLOSED = ('closed', 'dong cua', 'nghi', 'off')
+_ALWAYS_OPEN = ('24/7', '24h', '24 gio', 'open 24 hours', 'mo ca ngay', 'ca ngay')
+
+_TIME = r'(\d{1,2})(?:\s*[:h.]\s*(\d{2})|\s*h)?\s*([ap]\.?m\.?|sa|ch)?'
+_RANGE_RE = re.compile(_TIME + r'\s*(?:-|–|—|to|den|toi)\s*' + _TIME)
+# "Monday: 8:00 AM – 10:00 PM" (Google weekday_text)
+_LINE_RE = re.compile(r'^\s*([^:]+?)\s*:\s*(.+)$')
+
+
+def _minutes(hour, minute, meridiem):
+    hour, minute = int(hour), int(minute or 0)
+    if meridiem:
+        meridiem = meridiem.replace('.', '')
+        if meridiem in ('pm', 'ch') and hour < 12:
+            hour += 12
+        elif meridiem in ('am', 'sa') and hour == 12:
+            hour = 0
+    if hour > 24 or minute > 59:
+        raise ValueError('invalid time')
+    return min(hour * 60 + minute, MINUTES_PER_DAY)
+
+
+def _parse_days(spec):
+    """'mon-fri', 't2 - t6', 'daily', 'saturday' -> list of weekday numbers"""
+    spec = fold_diacritics(str(spec)).strip()
+    if spec in _ALL_DAYS:
+        return list(range(7))
+    if spec in _DAY_GROUPS:
+        return list(_DAY_GROUPS[spec])
+    if spec in _DAY_NAMES:
+        return [_DAY_NAMES[spec]]
+    
+    parts = [part.strip() for part in re.split(r'\s*(?:-|–|—|den|toi)\s*', spec) if part.strip()]
+    if len(parts) == 2 and parts[0] in _DAY_NAMES and parts[1] in _DAY_NAMES:
+        start, end = _DAY_NAMES[parts[0]], _DAY_NAMES[parts[1]]
+        return [(start + offset) % 7 for offset in range((end - start) % 7 + 1)]
+    
+    days = []
+    for part in re.split(r'\s*[,;/&]\s*', spec):
+        if part in _DAY_NAMES:
+            days.append(_DAY_NAMES[part])
+        elif part:
+            raise ValueError(f'unknown day: {spec}')
+    return days
+
+
+def _parse_ranges(value):
+    """'08:00-12:00, 13:30-17:00' -> [(start, end)] in minutes; [] when closed"""
+    if isinstance(value, list):
+        ranges = []
+        for item in value:
+            ranges.extend(_parse_ranges(item))
+        return ranges
+    
+    text = fold_diacritics(str(value)).strip()
+    if not text or text in _CLOSED:
+        return []
+    if text in _ALWAYS_OPEN:
+        return [(0, MINUTES_PER_DAY)]
+    
+    ranges = []
+    for match in _RANGE_RE.finditer(text):
+        start = _minutes(*match.group(1, 2, 3))
+        end = _minutes(*match.group(4, 5, 6))
+        ranges.append((start, end))
+    
+    if not ranges:
+        raise ValueError(f'unknown hours: {value}')
+    return ranges
+
+
+def _add(intervals, day, start, end):
+    """Add one daily range; ranges past midnight continue on the next day"""
+    if start == end:
+        # "00:00-00:00" / "8:00-8:00": open around the clock
+        intervals.append((day, 0, MINUTES_PER_DAY))
+    elif end > start:
+        intervals.append((day, start, end))
+    else:
+        intervals.append((day, start, MINUTES_PER_DAY))
+        if end > 0:
+            intervals.append(((day + 1) % 7, 0, end))
+
+
+def _merge(intervals):
+    merged = []
+    for day, start, end in sorted(set(intervals)):
+        if merged and merged[-1][0] == day and start <= merged[-1][2]:
+            merged[-1] = (day, merged[-1][1], max(end, merged[-1][2]))
+        else:
+            merged.append((day, start, end))
+    return merged
+
+
+def parse_opening_hours(value):
+    """
+    Parse Place.opening_hours into weekly intervals
+    
+    Accepted shapes (as JSON text or already decoded):
+      {"mon-fri": "08:00-17:00", "sat": "08:00-12:00", "sun": "closed"}
+      {"daily": "06:00-22:00"} / {"t2": ["7h-11h", "13h-17h"], "cn": "nghỉ"}
+      {"periods": [{"open": {"day": 0, "time": "0800"}, "close": {...}}]}  (Google)
+      ["Monday: 8:00 AM – 10:00 PM", ...]                                   (Google)
+      "24/7" or "08:00-22:00" (every day)
+    
+    Returns:
+        Sorted list of (weekday, start_minute, end_minute), end exclusive,
+        Monday = 0; [] when nothing could be parsed
+    """
+    if value is None or value == '':
+        return []
+    
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            pass
+    
+    intervals = []
+    try:
+        if isinstance(value, dict) and 'periods' in value:
+            for period in value['periods']:
+                # Google days: Sunday = 0
+                open_day = (int(period['open']['day']) - 1) % 7
+                open_time = _minutes(period['open']['time'][:2], period['open']['time'][2:], None)
+                if 'close' not in period:
+                    return [(day, 0, MINUTES_PER_DAY) for day in range(7)]
+                close_day = (int(period['close']['day']) - 1) % 7
+                close_time = _minutes(period['close']['time'][:2], period['close']['time'][2:], None)
+                
+                span = ((close_day - open_day) % 7) * MINUTES_PER_DAY + close_time - open_time
+                day, start = open_day, open_time
+                while span > 0:
+                    end = min(start + span, MINUTES_PER_DAY)
+                    intervals.append((day, start, end))
+                    span -= end - start
+                    day, start = (day + 1) % 7, 0
+        
+        elif isinstance(value, dict):
+            for spec, hours in value.items():
+                for day in _parse_days(spec):
+                    for start, end in _parse_ranges(hours):
+                        _add(intervals, day, start, end)
+        
+        elif isinstance(value, list):
+            for line in value:
+                match = _LINE_RE.match(str(line))
+                if match:
+                    for day in _parse_days(match.group(1)):
+                        for start, end in _parse_ranges(match.group(2)):
+                            _add(intervals, day, start, end)
+        
+        else:
+            for start, end in _parse_ranges(value):
+                for day in range(7):
+                    _add(intervals, day, start, end)
+    
+    except (KeyError, TypeError, ValueError):
+        return []
+    
+    return _merge(intervals)
+
+
+def local_now(tz_name='Asia/Ho_Chi_Minh'):
+    """Current local time in the site timezone"""
+    try:
+        from zoneinfo import ZoneInfo
+        return datetime.now(ZoneInfo(tz_name))
+    except Exception:
+        # No tz database available: Vietnam has no DST
+        return datetime.now(timezone(timedelta(hours=7)))
+
+
+def parse_open_at(value, tz_name='Asia/Ho_Chi_Minh'):
+    """
+    Resolve an open_at value into (weekday, minute)
+    
+    Accepts "now", an ISO datetime ("2024-06-08T20:00"), "sat 20:00" /
+    "t7 20h" or a bare time ("20:00", today).
+    
+    Raises:
+        ValueError: Unrecognized value
+    """
+    text = fold_diacritics(str(value)).strip()
+    
+    if text == 'now':
+        now = local_now(tz_name)
+        return now.weekday(), now.hour * 60 + now.minute
+    
+    try:
+        moment = datetime.fromisoformat(str(value).strip())
+        return moment.weekday(), moment.hour * 60 + moment.minute
+    except ValueError:
+        pass
+    
+    match = re.match(r'^(?:(.+?)\s+)?' + _TIME + r'$', text)
+    if not match:
+        raise ValueError(f'invalid open_at: {value}')
+    
+    day_spec = match.group(1)
+    if day_spec:
+        days = _parse_days(day_spec)
+        if len(days) != 1:
+            raise ValueError(f'invalid open_at: {value}')
+        day = days[0]
+    else:
+        day = local_now(tz_name).weekday()
+    
+    minute = _minutes(*match.group(2, 3, 4))
+    if minute >= MINUTES_PER_DAY:
+        raise ValueError(f'invalid open_at: {value}')
+    return day, minute
@@ -0,0 +1,314 @@
+import time
+import numpy as np
+
+# Cost of one minute of lateness relative to one minute of travel
+LATE_PENALTY = 10.0
+
+# Longest segment moved by Or-opt
+OR_OPT_MAX_SEGMENT = 3
+
+# Constructions improved before perturbing, and kicks without improvement
+# after which the search stops
+MULTI_START = 4
+KICKS = 30
+
+_EPS = 1e-9
+
+
+def visit_start(arrival, intervals, service):
+    """
+    Earliest start of a visit arriving at `arrival` (minutes since midnight)
+    
+    Args:
+        arrival: Arrival minute
+        intervals: Sorted (start, end) opening ranges of the day, None when
+            the place has no known hours (always open); [] when closed all day
+        service: Visit length in minutes
+    
+    Returns:
+        (start minute, minutes late)
+    """
+    if intervals is None:
+        return arrival, 0.0
+    for start, end in intervals:
+        if arrival + service <= end or (arrival < start and start + service <= end):
+            return max(arrival, start), 0.0
+    if not intervals:
+        # Closed that day: a fixed penalty, whatever the order
+        return arrival, float(service)
+    return arrival, arrival + service - intervals[-1][1]
+
+
+class RouteSolver:
+    """
+    Visiting order for an open path over a travel-time matrix
+    
+    Nearest-neighbour construction followed by 2-opt and Or-opt local
+    search, then double-bridge perturbation, until nothing improves or the
+    time budget runs out. The cost
+    is total travel time plus LATE_PENALTY per minute a visit ends after
+    its opening hours. Travel deltas of a whole move neighbourhood are
+    computed in one NumPy pass (prefix sums keep asymmetric 2-opt O(1)
+    per move); the schedule is only simulated for moves whose travel
+    delta could still beat the current cost.
+    """
+    
+    def __init__(self, durations, service=None, windows=None, start_minute=8 * 60, has_start=False):
+        """
+        Args:
+            durations: (n, n) travel times in seconds
+            service: Visit minutes per node (0 for the start)
+            windows: Opening ranges per node for the day (see visit_start),
+                or None to ignore opening hours
+            start_minute: Departure time (minutes since midnight)
+            has_start: Node 0 is a fixed starting point, not a stop
+        """
+        self.d = np.asarray(durations, dtype=np.float64) / 60.0
+        self.n = len(self.d)
+        self.service = [float(value) for value in service] if service is not None else [0.0] * self.n
+        self.windows = windows
+        self.start_minute = float(start_minute)
+        self.has_start = has_start
+        self.first = 1 if has_start else 0
+        self._d_list = self.d.tolist()
+    
+    def evaluate(self, path):
+        """(cost, travel minutes, late minutes) of a full path"""
+        d = self._d_list
+        travel = 0.0
+        late = 0.0
+        t = self.start_minute
+        previous = None
+        for node in path:
+            if previous is not None:
+                leg = d[previous][node]
+                travel += leg
+                t += leg
+            if self.windows is not None:
+                begin, lateness = visit_start(t, self.windows[node], self.service[node])
+                late += lateness
+                t = begin
+            t += self.service[node]
+            previous = node
+        return travel + LATE_PENALTY * late, travel, late
+    
+    def schedule(self, path):
+        """Per node (arrival, start, departure) minutes along a path"""
+        d = self._d_list
+        t = self.start_minute
+        times = []
+        previous = None
+        for node in path:
+            if previous is not None:
+                t += d[previous][node]
+            arrival = t
+            if self.windows is not None:
+                t, _ = visit_start(t, self.windows[node], self.service[node])
+            times.append((arrival, t, t + self.service[node]))
+            t += self.service[node]
+            previous = node
+        return times
+    
+    def nearest_neighbour(self, first):
+        """Greedy path from `first`: next is the stop that can be started soonest"""
+        path = [first]
+        remaining = np.ones(self.n, dtype=bool)
+        remaining[first] = False
+        if self.has_start:
+            remaining[0] = False
+        
+        t = self.start_minute
+        if self.windows is not None:
+            t, _ = visit_start(t, self.windows[first], self.service[first])
+        t += self.service[first]
+        
+        while remaining.any():
+            candidates = np.flatnonzero(remaining)
+            arrivals = t + self.d[path[-1], candidates]
+            if self.windows is None:
+                best = int(candidates[np.argmin(arrivals)])
+                begin = float(arrivals.min())
+            else:
+                best, begin, best_key = None, None, None
+                for node, arrival in zip(candidates.tolist(), arrivals.tolist()):
+                    start, lateness = visit_start(arrival, self.windows[node], self.service[node])
+                    key = start + LATE_PENALTY * lateness
+                    if best_key is None or key < best_key:
+                        best, begin, best_key = node, start, key
+            path.append(best)
+            remaining[best] = False
+            t = begin + self.service[best]
+        return path
+    
+    def solve(self, time_budget=0.3, initial=None):
+        """
+        Best visiting order found within time_budget seconds
+        
+        Args:
+            time_budget: Seconds to spend
+            initial: Optional starting order (node indices, start excluded);
+                it is kept when nothing better is found
+        
+        Returns:
+            Dict with order (stops, start excluded), cost, travel and late
+            minutes, and whether the search converged before the deadline
+        """
+        deadline = time.perf_counter() + time_budget
+        stops = list(range(self.first, self.n))
+        prefix = [0] if self.has_start else []
+        if not stops:
+            return {'order': [], 'cost': 0.0, 'travel': 0.0, 'late': 0.0, 'converged': True}
+        
+        candidates = []
+        if initial is not None:
+            candidates.append(prefix + list(initial))
+        if self.has_start:
+            candidates.append(self.nearest_neighbour(0))
+        else:
+            # Every start is tried while the construction budget (a third) lasts
+            construction_deadline = time.perf_counter() + time_budget / 3
+            for first in stops:
+                candidates.append(self.nearest_neighbour(first))
+                if time.perf_counter() > construction_deadline:
+                    break
+        
+        candidates.sort(key=lambda path: self.evaluate(path)[0])
+        best, best_cost, converged = None, None, True
+        for start in candidates[:MULTI_START]:
+            path, done = self._improve(np.asarray(start, dtype=np.int64), deadline)
+            cost = self.evaluate(path.tolist())[0]
+            if best_cost is None or cost < best_cost - _EPS:
+                best, best_cost = path, cost
+            converged = converged and done
+            if not done:
+                break
+        
+        # Iterated local search: perturb the best path with double-bridge
+        # kicks (seeded, so results are repeatable) while budget is left
+        rng = np.random.default_rng(0)
+        stale = 0
+        while converged and stale < KICKS and self.n - self.first >= 8:
+            path, done = self._improve(self._double_bridge(best, rng), deadline)
+            cost = self.evaluate(path.tolist())[0]
+            if cost < best_cost - _EPS:
+                best, best_cost, stale = path, cost, 0
+            else:
+                stale += 1
+            if not done:
+                break
+        
+        cost, travel, late = self.evaluate(best.tolist())
+        return {
+            'order': best[self.first:].tolist(),
+            'cost': cost,
+            'travel': travel,
+            'late': late,
+            'converged': converged
+        }
+    
+    def _double_bridge(self, path, rng):
+        """Cut the stops into four runs A B C D and reconnect them as A C B D"""
+        stops = path[self.first:]
+        a, b, c = sorted(rng.choice(np.arange(1, len(stops)), size=3, replace=False))
+        return np.concatenate((path[:self.first], stops[:a], stops[b:c], stops[a:b], stops[c:]))
+    
+    def _improve(self, path, deadline):
+        """2-opt and Or-opt until a local optimum or the deadline"""
+        cost, travel, _ = self.evaluate(path.tolist())
+        while time.perf_counter() < deadline:
+            # Lateness is never negative, so only moves cutting travel below
+            # the current cost can improve it
+            moves = self._moves(path, cost - travel)
+            if self.windows is None:
+                if not moves:
+                    return path, True
+                delta, move = moves[0]
+                path, cost, travel = self._apply(path, move), cost + delta, travel + delta
+                continue
+            
+            for delta, move in moves:
+                if time.perf_counter() > deadline:
+                    return path, False
+                candidate = self._apply(path, move)
+                new_cost, new_travel, _ = self.evaluate(candidate.tolist())
+                if new_cost < cost - _EPS:
+                    path, cost, travel = candidate, new_cost, new_travel
+                    break
+            else:
+                return path, True
+        return path, False
+    
+    def _moves(self, path, slack):
+        """
+        Moves whose travel delta is below slack, best first
+        
+        Returns:
+            List of (delta, move); move is ('2opt', i, j) for reversing
+            path[i..j] or ('or', i, length, q) for moving path[i:i+length]
+            after the node now at position q (-1: to the front)
+        """
+        d = self.d
+        m = len(path)
+        moves = []
+        positions = np.arange(m)
+        
+        # 2-opt over every (i, j), i < j; prefix sums of both directions
+        # make each asymmetric reversal O(1)
+        forward = np.concatenate(([0.0], np.cumsum(d[path[:-1], path[1:]])))
+        backward = np.concatenate(([0.0], np.cumsum(d[path[1:], path[:-1]])))
+        i = positions[:, None]
+        j = positions[None, :]
+        before = path[np.maximum(i - 1, 0)]
+        after = path[np.minimum(j + 1, m - 1)]
+        has_before = i > 0
+        has_after = j < m - 1
+        old = (forward[j] - forward[i] + np.where(has_after, d[path[j], after], 0.0)
+               + np.where(has_before, d[before, path[i]], 0.0))
+        new = (backward[j] - backward[i] + np.where(has_after, d[path[i], after], 0.0)
+               + np.where(has_before, d[before, path[j]], 0.0))
+        deltas = np.where((i >= self.first) & (j > i), new - old, np.inf)
+        for a, b in zip(*np.nonzero(deltas < slack - _EPS)):
+            moves.append((float(deltas[a, b]), ('2opt', int(a), int(b))))
+        
+        # Or-opt: segment path[i:i+length] reinserted between path[q] and
+        # the node after it
+        q = positions[None, :]
+        following = path[np.minimum(q + 1, m - 1)]
+        for length in range(1, min(OR_OPT_MAX_SEGMENT, m - 1 - self.first) + 1):
+            starts = np.arange(self.first, m - length + 1)
+            i = starts[:, None]
+            head = path[starts][:, None]
+            tail = path[starts + length - 1][:, None]
+            before = path[np.maximum(starts - 1, 0)][:, None]
+            after = path[np.minimum(starts + length, m - 1)][:, None]
+            has_before = i > 0
+            has_after = i + length < m
+            removed = (np.where(has_before, d[before, head], 0.0) + np.where(has_after, d[tail, after], 0.0)
+                       - np.where(has_before & has_after, d[before, after], 0.0))
+            
+            has_next = q + 1 < m
+            added = d[path[q], head] + np.where(has_next, d[tail, following] - d[path[q], following], 0.0)
+            valid = (q >= self.first) & ((q < i - 1) | (q >= i + length))
+            deltas = np.where(valid, added - removed, np.inf)
+            for a, b in zip(*np.nonzero(deltas < slack - _EPS)):
+                moves.append((float(deltas[a, b]), ('or', int(starts[a]), length, int(b))))
+            
+            if self.first == 0:
+                front = np.where(starts > 0, d[path[starts + length - 1], path[0]] - removed[:, 0], np.inf)
+                for a in np.flatnonzero(front < slack - _EPS):
+                    moves.append((float(front[a]), ('or', int(starts[a]), length, -1)))
+        
+        moves.sort(key=lambda item: item[0])
+        return moves
+    
+    @staticmethod
+    def _apply(path, move):
+        if move[0] == '2opt':
+            _, i, j = move
+            return np.concatenate((path[:i], path[i:j + 1][::-1], path[j + 1:]))
+        
+        _, i, length, q = move
+        segment = path[i:i + length]
+        rest = np.concatenate((path[:i], path[i + length:]))
+        at = q + 1 if q < i else q + 1 - length
+        return np.concatenate((rest[:at], segment, rest[at:]))
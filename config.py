@@ -25,12 +25,46 @@ class Config:
     
     # Google Maps API
     GOOGLE_MAPS_API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY')
+    # Pooled keep-alive session: timeouts in seconds, retries use jittered exponential backoff
+    MAPS_POOL_SIZE = int(os.environ.get('MAPS_POOL_SIZE', 20))
+    MAPS_CONNECT_TIMEOUT = float(os.environ.get('MAPS_CONNECT_TIMEOUT', 3.05))
+    MAPS_READ_TIMEOUT = float(os.environ.get('MAPS_READ_TIMEOUT', 10))
+    MAPS_MAX_RETRIES = int(os.environ.get('MAPS_MAX_RETRIES', 2))
+    MAPS_BACKOFF_BASE = float(os.environ.get('MAPS_BACKOFF_BASE', 0.25))
+    MAPS_BACKOFF_MAX = float(os.environ.get('MAPS_BACKOFF_MAX', 4))
+    MAPS_CONCURRENCY = int(os.environ.get('MAPS_CONCURRENCY', 20))  # matrix tile requests in flight per process (capped at MAPS_POOL_SIZE)
+    DISTANCE_MATRIX_MAX_LOCATIONS = int(os.environ.get('DISTANCE_MATRIX_MAX_LOCATIONS', 100))  # per side, /api/maps/distance-matrix
+    # Geocode cache (in-process LRU + geocode_cache table); ZERO_RESULTS is cached for the negative TTL
+    GEOCODE_CACHE_SIZE = int(os.environ.get('GEOCODE_CACHE_SIZE', 10000))
+    GEOCODE_CACHE_TTL = int(os.environ.get('GEOCODE_CACHE_TTL', 30 * 86400))
+    GEOCODE_NEGATIVE_TTL = int(os.environ.get('GEOCODE_NEGATIVE_TTL', 86400))
+    GEOCODE_REVERSE_PRECISION = int(os.environ.get('GEOCODE_REVERSE_PRECISION', 4))  # decimals, ~11 m
+    # Directions / distance matrix leg cache: (origin cell, destination cell, mode, departure-hour bucket)
+    LEG_CACHE_SIZE = int(os.environ.get('LEG_CACHE_SIZE', 50000))
+    LEG_CACHE_TTL = int(os.environ.get('LEG_CACHE_TTL', 7 * 86400))
+    LEG_CELL_PRECISION = int(os.environ.get('LEG_CELL_PRECISION', 3))  # decimals, ~110 m
+    LEG_BUCKET_HOURS = int(os.environ.get('LEG_BUCKET_HOURS', 3))
+    # Offline travel-time estimator, refitted from cached legs (0 disables automatic refits)
+    TRAVEL_ESTIMATOR_RECALIBRATE_SECONDS = int(os.environ.get('TRAVEL_ESTIMATOR_RECALIBRATE_SECONDS', 6 * 3600))
+    # Local route optimizer (/api/maps/optimize-route): search time per request, default visit length
+    ROUTE_OPTIMIZER_TIME_BUDGET = float(os.environ.get('ROUTE_OPTIMIZER_TIME_BUDGET', 0.3))
+    DEFAULT_VISIT_MINUTES = int(os.environ.get('DEFAULT_VISIT_MINUTES', 60))
+    ROUTE_OPTIMIZER_MAX_STOPS = int(os.environ.get('ROUTE_OPTIMIZER_MAX_STOPS', 100))  # per request
+    ROUTE_OPTIMIZER_MAX_STOPS_PER_DAY = int(os.environ.get('ROUTE_OPTIMIZER_MAX_STOPS_PER_DAY', 30))  # itinerary days
     
     # File Upload
     UPLOAD_FOLDER = os.path.join(basedir, 'static', 'uploads')
     MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # 16MB
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
     
+    # Unreferenced uploads are kept this long before `flask gc-uploads` deletes them
+    UPLOAD_GC_GRACE_SECONDS = int(os.environ.get('UPLOAD_GC_GRACE_SECONDS', 86400))
+    
+    # Image derivatives: name -> max edge in px, rendered by a process pool (0 = inline)
+    IMAGE_DERIVATIVES = {'thumb': 160, 'card': 480, 'full': 1600}
+    IMAGE_QUALITY = 82
+    IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))
+    
     # Session
     PERMANENT_SESSION_LIFETIME = timedelta(
         seconds=int(os.environ.get('PERMANENT_SESSION_LIFETIME', 86400))
@@ -45,6 +79,25 @@ class Config:
     
     # Pagination
     ITEMS_PER_PAGE = 12
+    MAX_PER_PAGE = int(os.environ.get('MAX_PER_PAGE', 100))
+    
+    # View counts are buffered per worker and flushed every N seconds (0 = write through)
+    VIEW_COUNT_FLUSH_INTERVAL = int(os.environ.get('VIEW_COUNT_FLUSH_INTERVAL', 30))
+    
+    # Trending score: events lose half their weight every TRENDING_HALF_LIFE_HOURS
+    TRENDING_HALF_LIFE_HOURS = float(os.environ.get('TRENDING_HALF_LIFE_HOURS', 72))
+    TRENDING_WEIGHTS = {'view': 1.0, 'favorite': 3.0, 'review': 5.0}
+    TRENDING_CACHE_SECONDS = int(os.environ.get('TRENDING_CACHE_SECONDS', 300))
+    
+    # Site timezone, used to resolve open_at=now
+    TIMEZONE = os.environ.get('TIMEZONE', 'Asia/Ho_Chi_Minh')
+    
+    # Bulk import (flask import-places, /api/admin/import/places)
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 1000))
+    GEOCODE_CONCURRENCY = int(os.environ.get('GEOCODE_CONCURRENCY', 8))
+    
+    # Max number of tag buckets returned by /api/places/facets
+    FACET_TAG_LIMIT = 50
     
     # AI Settings
     AI_MAX_TOKENS = 2048
@@ -75,6 +128,8 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    VIEW_COUNT_FLUSH_INTERVAL = 0
+    IMAGE_WORKERS = 0
 
 
 config = {
@@ -0,0 +1,252 @@
+"""search, geo, rating and trending schema
+
+Brings a database created by the original schema up to date: new places
+columns and indexes, the derived lookup tables (tags, hours, clusters,
+votes, caches, stored files) and the FTS5 search table. Rating aggregates
+are recomputed from reviews here; data derived in Python (geohashes,
+search index, tag/hours tables, clusters) is filled afterwards by
+`flask backfill`.
+
+Every step skips objects that already exist, since `db.create_all()` at
+startup may have created the new tables before the upgrade runs.
+
+Revision ID: 3f2a9c1d7b40
+Revises:
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d7b40'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+SEARCH_TABLE = 'places_fts'
+
+
+def _inspector():
+    return sa.inspect(op.get_bind())
+
+
+def _has_table(name):
+    return _inspector().has_table(name)
+
+
+def _has_column(table, column):
+    return column in {c['name'] for c in _inspector().get_columns(table)}
+
+
+def _column_nullable(table, column):
+    return next(c['nullable'] for c in _inspector().get_columns(table) if c['name'] == column)
+
+
+def _create_index(name, table, columns, unique=False):
+    if name not in {i['name'] for i in _inspector().get_indexes(table)}:
+        op.create_index(name, table, columns, unique=unique)
+
+
+def _drop_index(name, table):
+    if name in {i['name'] for i in _inspector().get_indexes(table)}:
+        op.drop_index(name, table_name=table)
+
+
+def upgrade():
+    if not _has_table('table_versions'):
+        op.create_table('table_versions',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+        )
+    
+    if not _has_table('geocode_cache'):
+        op.create_table('geocode_cache',
+        sa.Column('key', sa.String(length=400), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('is_negative', sa.Boolean(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('key')
+        )
+    _create_index('ix_geocode_cache_expires_at', 'geocode_cache', ['expires_at'])
+    
+    if not _has_table('travel_legs'):
+        op.create_table('travel_legs',
+        sa.Column('origin', sa.String(length=300), nullable=False),
+        sa.Column('destination', sa.String(length=300), nullable=False),
+        sa.Column('mode', sa.String(length=20), nullable=False),
+        sa.Column('hour_bucket', sa.SmallInteger(), nullable=False),
+        sa.Column('waypoints', sa.String(length=1000), nullable=False),
+        sa.Column('status', sa.String(length=30), nullable=False),
+        sa.Column('distance_m', sa.Integer(), nullable=True),
+        sa.Column('duration_s', sa.Integer(), nullable=True),
+        sa.Column('distance_text', sa.String(length=50), nullable=True),
+        sa.Column('duration_text', sa.String(length=50), nullable=True),
+        sa.Column('route', sa.Text(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('origin', 'destination', 'mode', 'hour_bucket', 'waypoints')
+        )
+    _create_index('ix_travel_legs_expires_at', 'travel_legs', ['expires_at'])
+    
+    if not _has_table('stored_files'):
+        op.create_table('stored_files',
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('path', sa.String(length=300), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('sha256')
+        )
+    _create_index('ix_stored_files_ref_count', 'stored_files', ['ref_count'])
+    _create_index('ix_stored_files_updated_at', 'stored_files', ['updated_at'])
+    
+    # places: new columns (NOT NULL ones need a server default for existing rows)
+    if not _has_column('places', 'geohash'):
+        op.add_column('places', sa.Column('geohash', sa.String(length=12), nullable=True))
+    if not _has_column('places', 'image_variants'):
+        op.add_column('places', sa.Column('image_variants', sa.Text(), nullable=True))
+    if not _has_column('places', 'rating_sum'):
+        op.add_column('places', sa.Column('rating_sum', sa.Integer(), nullable=False, server_default='0'))
+    if not _has_column('places', 'trending_score'):
+        op.add_column('places', sa.Column('trending_score', sa.Float(), nullable=False, server_default='0'))
+    _create_index('ix_places_category_trending', 'places', ['category', 'trending_score'])
+    _create_index('ix_places_created_at', 'places', ['created_at'])
+    _create_index('ix_places_geohash', 'places', ['geohash'])
+    _create_index('ix_places_rating', 'places', ['rating'])
+    _create_index('ix_places_trending_score', 'places', ['trending_score'])
+    _create_index('ix_places_view_count', 'places', ['view_count'])
+    
+    if not _has_table('place_tags'):
+        op.create_table('place_tags',
+        sa.Column('place_id', sa.Integer(), nullable=False),
+        sa.Column('tag', sa.String(length=100), nullable=False),
+        sa.ForeignKeyConstraint(['place_id'], ['places.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('place_id', 'tag')
+        )
+    _create_index('ix_place_tags_tag_place', 'place_tags', ['tag', 'place_id'])
+    
+    if not _has_table('place_features'):
+        op.create_table('place_features',
+        sa.Column('place_id', sa.Integer(), nullable=False),
+        sa.Column('feature', sa.String(length=100), nullable=False),
+        sa.ForeignKeyConstraint(['place_id'], ['places.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('place_id', 'feature')
+        )
+    _create_index('ix_place_features_feature_place', 'place_features', ['feature', 'place_id'])
+    
+    if not _has_table('place_hours'):
+        op.create_table('place_hours',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('place_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.SmallInteger(), nullable=False),
+        sa.Column('start_minute', sa.SmallInteger(), nullable=False),
+        sa.Column('end_minute', sa.SmallInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['place_id'], ['places.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+        )
+    _create_index('ix_place_hours_day_start', 'place_hours', ['day', 'start_minute', 'end_minute', 'place_id'])
+    _create_index('ix_place_hours_place_id', 'place_hours', ['place_id'])
+    
+    if not _has_table('place_clusters'):
+        op.create_table('place_clusters',
+        sa.Column('cell', sa.String(length=12), nullable=False),
+        sa.Column('precision', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('lat_sum', sa.Float(), nullable=False),
+        sa.Column('lng_sum', sa.Float(), nullable=False),
+        sa.Column('top_place_id', sa.Integer(), nullable=True),
+        sa.Column('top_score', sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint('cell')
+        )
+    _create_index('ix_place_clusters_precision', 'place_clusters', ['precision'])
+    
+    # reviews: one review per user and place (keep the first of any
+    # duplicates, as add_review always has), non-null helpful counts
+    op.execute(
+        "DELETE FROM reviews WHERE id NOT IN "
+        "(SELECT MIN(id) FROM reviews GROUP BY place_id, user_id)"
+    )
+    op.execute("UPDATE reviews SET helpful_count = 0 WHERE helpful_count IS NULL")
+    if _column_nullable('reviews', 'helpful_count'):
+        with op.batch_alter_table('reviews') as batch_op:
+            batch_op.alter_column('helpful_count', existing_type=sa.Integer(), nullable=False)
+    _create_index('uq_reviews_place_user', 'reviews', ['place_id', 'user_id'], unique=True)
+    _create_index('ix_reviews_place_created', 'reviews', ['place_id', 'created_at', 'id'])
+    _create_index('ix_reviews_place_helpful', 'reviews', ['place_id', 'helpful_count', 'id'])
+    _create_index('ix_reviews_place_rating', 'reviews', ['place_id', 'rating', 'id'])
+    
+    if not _has_table('review_votes'):
+        op.create_table('review_votes',
+        sa.Column('review_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['review_id'], ['reviews.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('review_id', 'user_id')
+        )
+    
+    _create_index('ix_chat_sessions_updated_at', 'chat_sessions', ['updated_at'])
+    _create_index('ix_itineraries_user_id', 'itineraries', ['user_id'])
+    _create_index('ix_users_created_at', 'users', ['created_at'])
+    
+    # Rating aggregates: reviews now apply deltas to rating_sum, so it has to
+    # start out matching the reviews counted in review_count
+    op.execute(
+        "UPDATE places SET "
+        "rating_sum = COALESCE((SELECT SUM(r.rating) FROM reviews r WHERE r.place_id = places.id), 0), "
+        "review_count = (SELECT COUNT(*) FROM reviews r WHERE r.place_id = places.id)"
+    )
+    op.execute(
+        "UPDATE places SET rating = CASE WHEN review_count > 0 "
+        "THEN ROUND(CAST(rating_sum AS FLOAT) / review_count, 1) ELSE 0 END"
+    )
+    
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            "name, address, description, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+    
+    _drop_index('ix_users_created_at', 'users')
+    _drop_index('ix_itineraries_user_id', 'itineraries')
+    _drop_index('ix_chat_sessions_updated_at', 'chat_sessions')
+    
+    op.drop_table('review_votes')
+    _drop_index('ix_reviews_place_rating', 'reviews')
+    _drop_index('ix_reviews_place_helpful', 'reviews')
+    _drop_index('ix_reviews_place_created', 'reviews')
+    _drop_index('uq_reviews_place_user', 'reviews')
+    with op.batch_alter_table('reviews') as batch_op:
+        batch_op.alter_column('helpful_count', existing_type=sa.Integer(), nullable=True)
+    
+    op.drop_table('place_clusters')
+    op.drop_table('place_hours')
+    op.drop_table('place_features')
+    op.drop_table('place_tags')
+    
+    for name in ('ix_places_view_count', 'ix_places_trending_score', 'ix_places_rating',
+                 'ix_places_geohash', 'ix_places_created_at', 'ix_places_category_trending'):
+        _drop_index(name, 'places')
+    with op.batch_alter_table('places') as batch_op:
+        batch_op.drop_column('trending_score')
+        batch_op.drop_column('rating_sum')
+        batch_op.drop_column('image_variants')
+        batch_op.drop_column('geohash')
+    
+    op.drop_table('stored_files')
+    op.drop_table('travel_legs')
+    op.drop_table('geocode_cache')
+    op.drop_table('table_versions')
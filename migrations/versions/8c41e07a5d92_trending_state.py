@@ -0,0 +1,43 @@
+"""trending state
+
+Moves the trending epoch from a constant in code to a one-row table so
+TrendingService can rebase it. The row starts at the old constant, which
+is what any stored trending_score was computed against; the next score
+write rebases it to within REBASE_HALF_LIVES of now.
+
+Revision ID: 8c41e07a5d92
+Revises: 3f2a9c1d7b40
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c41e07a5d92'
+down_revision = '3f2a9c1d7b40'
+branch_labels = None
+depends_on = None
+
+
+LEGACY_EPOCH = datetime(2024, 1, 1)
+
+
+def upgrade():
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table('trending_state'):
+        op.create_table('trending_state',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('epoch', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+    
+    state = sa.table('trending_state', sa.column('id', sa.Integer), sa.column('epoch', sa.DateTime))
+    if bind.execute(sa.select(state.c.id)).first() is None:
+        op.bulk_insert(state, [{'id': 1, 'epoch': LEGACY_EPOCH}])
+
+
+def downgrade():
+    op.drop_table('trending_state')
@@ -5,8 +5,9 @@ Entry point for the application
 """
 
 import os
+import click
 from app import create_app, db
-from app.models import User, Place, Review, Itinerary, ChatSession
+from app.models import User, Place, Review, Itinerary, ChatSession, TableVersion, PlaceCluster, StoredFile
 
 # Create app instance
 app = create_app(os.getenv('FLASK_ENV', 'development'))
@@ -32,6 +33,20 @@ def init_db():
     print("Database initialized successfully!")
 
 
+@app.cli.command()
+def backfill():
+    """Fill data derived in Python after `flask db upgrade` (existing rows only)"""
+    from app.services.search_service import get_search_index
+    
+    geohashes = Place.ensure_geohashes()
+    indexed = get_search_index().rebuild()
+    Place.ensure_label_index()
+    Place.ensure_hours_index()
+    PlaceCluster.ensure()
+    print(f"✅ Geohashed {geohashes} places, indexed {indexed} places for search, "
+          f"tags, opening hours and map clusters are up to date")
+
+
 @app.cli.command()
 def seed_db():
     """Seed the database with sample data"""
@@ -138,9 +153,11 @@ def seed_db():
         }
     ]
     
+    existing = {slug for (slug,) in db.session.query(Place.slug).filter(
+        Place.slug.in_([place_data['slug'] for place_data in sample_places])
+    )}
     for place_data in sample_places:
-        existing = Place.query.filter_by(slug=place_data['slug']).first()
-        if not existing:
+        if place_data['slug'] not in existing:
             place = Place(**place_data)
             db.session.add(place)
             print(f"✓ Created place: {place_data['name']}")
@@ -149,6 +166,169 @@ def seed_db():
     print("\n✅ Database seeded successfully!")
 
 
+@app.cli.command()
+@click.argument('path')
+@click.option('--format', 'fmt', type=click.Choice(['ndjson', 'csv']), help='Default: from the file extension')
+@click.option('--checkpoint', help='Progress file; rerun with the same file to resume')
+@click.option('--batch-size', type=int, help='Rows per INSERT batch')
+@click.option('--concurrency', type=int, help='Parallel geocoding requests')
+def import_places(path, fmt, checkpoint, batch_size, concurrency):
+    """Bulk import places from an NDJSON or CSV file"""
+    from app.services.import_service import PlaceImporter, read_rows
+    
+    fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+    importer = PlaceImporter(batch_size=batch_size, concurrency=concurrency,
+                             checkpoint_path=checkpoint)
+    
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        stats = importer.run(read_rows(f, fmt))
+    
+    for error in stats['errors']:
+        print(f"  ✗ Row {error['row']}: {error['error']}")
+    print(f"✅ Imported {stats['inserted']} places "
+          f"({stats['geocoded']} geocoded, {stats['skipped']} skipped, {stats['resumed']} resumed)")
+
+
+@app.cli.command()
+def rebuild_search_index():
+    """Rebuild the full-text search index for places"""
+    from app.services.search_service import get_search_index
+    
+    count = get_search_index().rebuild()
+    print(f"✅ Indexed {count} places")
+
+
+@app.cli.command()
+def rebuild_tags():
+    """Rebuild normalized tag/feature tables from Place.tags / Place.features"""
+    count = Place.rebuild_label_index()
+    print(f"✅ Rebuilt tags and features for {count} places")
+
+
+@app.cli.command()
+def rebuild_hours():
+    """Rebuild the opening-hours interval table from Place.opening_hours"""
+    count = Place.rebuild_hours_index()
+    print(f"✅ Parsed opening hours for {count} places")
+
+
+@app.cli.command()
+def rebuild_clusters():
+    """Rebuild the pre-aggregated map clusters from places"""
+    count = PlaceCluster.rebuild()
+    print(f"✅ Rebuilt {count} map cluster cells")
+
+
+@app.cli.command()
+def rebuild_images():
+    """Render missing image derivatives for uploaded place images"""
+    from app.services.image_service import get_image_service
+    from app.services.storage_service import get_file_storage
+    
+    image_service = get_image_service()
+    app.config['IMAGE_WORKERS'] = 0
+    
+    rows = db.session.query(Place.id, Place.main_image).filter(
+        Place.main_image != None,
+        Place.image_variants == None
+    ).all()
+    
+    count = 0
+    failed = 0
+    for place_id, main_image in rows:
+        if not get_file_storage().path_for_url(main_image):
+            continue
+        # Errors are logged per image; one bad file does not stop the backfill
+        if image_service.schedule(place_id, main_image):
+            count += 1
+        else:
+            failed += 1
+            print(f"  ✗ Place {place_id}: could not render {main_image}")
+    print(f"✅ Rendered derivatives for {count} places ({failed} failed)")
+
+
+@app.cli.command()
+def gc_uploads():
+    """Recount upload references and delete files no place uses anymore"""
+    from app.services.storage_service import get_file_storage
+    
+    referenced = StoredFile.recount()
+    removed = get_file_storage().collect_garbage()
+    print(f"✅ {referenced} files referenced, {removed} unreferenced files removed")
+
+
+@app.cli.command()
+def rebuild_ratings():
+    """Recompute rating aggregates for all places from reviews"""
+    from sqlalchemy import func, update, bindparam
+    
+    places = Place.__table__
+    
+    # One GROUP BY pass over reviews
+    aggregates = db.session.query(
+        Review.place_id,
+        func.count(Review.id),
+        func.sum(Review.rating)
+    ).group_by(Review.place_id).all()
+    
+    db.session.execute(update(places).values(rating_sum=0, review_count=0, rating=0.0))
+    
+    if aggregates:
+        db.session.execute(
+            update(places).where(places.c.id == bindparam('b_place_id')).values(
+                rating_sum=bindparam('b_sum'),
+                review_count=bindparam('b_count'),
+                rating=bindparam('b_rating')
+            ),
+            [
+                {
+                    'b_place_id': place_id,
+                    'b_sum': total,
+                    'b_count': count,
+                    'b_rating': round(total / count, 1)
+                }
+                for place_id, count, total in aggregates
+            ]
+        )
+    
+    TableVersion.bump(db.session.connection(), 'places')
+    db.session.commit()
+    print(f"✅ Rebuilt rating aggregates for {len(aggregates)} places")
+
+
+@app.cli.command()
+def rebuild_trending():
+    """Recompute trending scores from reviews (view and favorite history is not kept)"""
+    from app.services.trending_service import get_trending_service
+    
+    count = get_trending_service().rebuild()
+    print(f"✅ Rebuilt trending scores for {count} places")
+
+
+@app.cli.command()
+def purge_geocode_cache():
+    """Delete expired geocode and travel leg cache entries"""
+    from app.models.geocode_cache import GeocodeCache
+    from app.models.travel_leg import TravelLeg
+    
+    removed = GeocodeCache.purge_expired()
+    legs = TravelLeg.purge_expired()
+    print(f"✅ Removed {removed} expired geocode and {legs} expired travel leg cache entries")
+
+
+@app.cli.command()
+def calibrate_travel_estimator():
+    """Refit the offline travel-time estimator from cached Google legs"""
+    from app.services.travel_estimator import get_travel_estimator
+    
+    estimator = get_travel_estimator()
+    counts = estimator.calibrate()
+    for mode, params in estimator.model().items():
+        speeds = ', '.join(f"{speed:g}" for speed in params['speeds_kmh'])
+        print(f"  {mode}: detour {params['detour']}, speeds [{speeds}] km/h, {counts.get(mode, 0)} samples")
+    print(f"✅ Calibrated {len(counts)} travel modes")
+
+
 @app.cli.command()
 def create_admin():
     """Create a new admin user"""